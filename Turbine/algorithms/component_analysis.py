@@ -0,0 +1,110 @@
+"""
+Run the analyses of a dataflow on each of its weakly connected components, on a process pool,
+and merge the results back into the dataflow.
+"""
+import logging
+from multiprocessing import Pool, cpu_count
+
+ANALYSES = ("repetition_vector", "initial_marking", "dead_lock", "period")
+
+
+def analyse_components(dataflow, analyses=ANALYSES, processes=None, solver_str="Auto"):
+    """Split the dataflow in its weakly connected components (see Dataflow.subgraph)
+    and run the analyses of each component in a worker process.
+
+    The repetition factors and the initial markings computed are set in the dataflow.
+
+    Parameters
+    ----------
+    :type analyses: iterable of str among "repetition_vector", "initial_marking", "dead_lock" and "period"
+    (they are run in this order).
+    :type processes: int, number of worker processes (default the number of cpu).
+    With one process or one component, the analyses are run in the current process.
+    :type solver_str: str, the solver of the initial marking (see Dataflow.compute_initial_marking).
+
+    :return : the list of the results of each component, a dict with the keys
+    "tasks" (the tasks of the component) and the name of each analysis:
+    "repetition_vector" dict task -> repetition factor, "initial_marking" dict arc -> initial marking,
+    "dead_lock" bool, "period" (period, start times of the tasks or of the phases of the tasks).
+    """
+    for analysis in analyses:
+        if analysis not in ANALYSES:
+            raise ValueError("Unknown analysis: " + str(analysis))
+    analyses = [analysis for analysis in ANALYSES if analysis in analyses]
+
+    jobs = []
+    components = []
+    for tasks in dataflow.get_connected_components():
+        subgraph, arc_map = dataflow.subgraph(tasks)
+        jobs.append((subgraph, analyses, solver_str))
+        components.append((tasks, arc_map))
+    logging.info("Analysing " + str(len(jobs)) + " components")
+
+    if processes is None:
+        processes = cpu_count()
+    if processes == 1 or len(jobs) <= 1:
+        sub_results = map(_analyse_component, jobs)
+    else:
+        pool = Pool(processes)
+        try:
+            sub_results = pool.map(_analyse_component, jobs, chunksize=max(1, len(jobs) / (4 * processes)))
+        finally:
+            pool.close()
+            pool.join()
+
+    results = []
+    for (tasks, arc_map), sub_result in zip(components, sub_results):
+        results.append(__merge(dataflow, tasks, arc_map, sub_result))
+    return results
+
+
+def _analyse_component(job):
+    """Worker: run the analyses on the subgraph of a component.
+    The results are given for the tasks and the arcs of the subgraph.
+    """
+    subgraph, analyses, solver_str = job
+    result = {}
+    if "repetition_vector" in analyses:
+        if subgraph.compute_repetition_vector() is False:
+            raise ValueError("The component of task " + str(subgraph.get_task_name(subgraph.get_task_list()[0])) +
+                             " is not consistent")
+        result["repetition_vector"] = dict((task, subgraph.get_repetition_factor(task))
+                                           for task in subgraph.get_task_list())
+    if "initial_marking" in analyses:
+        subgraph.compute_initial_marking(solver_str=solver_str)
+        result["initial_marking"] = dict((arc, subgraph.get_initial_marking(arc)) for arc in subgraph.get_arc_list())
+    if "dead_lock" in analyses:
+        result["dead_lock"] = subgraph.is_dead_lock
+    if "period" in analyses:
+        period, start_time = subgraph.get_period(start_time=True)
+        result["period"] = (period, start_time)
+    return result
+
+
+def __merge(dataflow, tasks, arc_map, sub_result):
+    """Set the results of a component in the dataflow and translate them to its tasks and arcs
+    (the task i of the subgraph is tasks[i], its arc a is arc_map[a]).
+    """
+    result = {"tasks": tasks}
+    if "repetition_vector" in sub_result:
+        result["repetition_vector"] = {}
+        for sub_task, repetition_factor in sub_result["repetition_vector"].iteritems():
+            dataflow.set_repetition_factor(tasks[sub_task], repetition_factor)
+            result["repetition_vector"][tasks[sub_task]] = repetition_factor
+    if "initial_marking" in sub_result:
+        result["initial_marking"] = {}
+        for sub_arc, initial_marking in sub_result["initial_marking"].iteritems():
+            dataflow.set_initial_marking(arc_map[sub_arc], initial_marking)
+            result["initial_marking"][arc_map[sub_arc]] = initial_marking
+    if "dead_lock" in sub_result:
+        result["dead_lock"] = sub_result["dead_lock"]
+    if "period" in sub_result:
+        period, sub_start_time = sub_result["period"]
+        start_time = {}
+        for key, value in sub_start_time.iteritems():
+            if isinstance(key, tuple):  # (task, phase)
+                start_time[(tasks[key[0]], key[1])] = value
+            else:
+                start_time[tasks[key]] = value
+        result["period"] = (period, start_time)
+    return result
@@ -0,0 +1,99 @@
+"""
+Record the firings and the buffer occupancy of a symbolic execution (see SymbolicExe.trace)
+and export them as a Chrome trace-event JSON file, which can be opened by Perfetto (ui.perfetto.dev)
+or chrome://tracing.
+
+Each task is a thread of the process "tasks" with a slice per firing, each buffer (arc) is a counter
+of the process "buffers". A dead lock is an instant event with the blocked tasks.
+"""
+import json
+import logging
+
+TASKS_PID = 0
+BUFFERS_PID = 1
+
+
+class ExecutionTrace:
+    """Recorder of the executions of SymbolicExe: se.trace = ExecutionTrace(); se.execute(); trace.write(filename).
+
+    The overhead is bounded by the sampling:
+    sample_steps: the markings of the buffers are sampled every sample_steps steps of the execution
+    (only the buffers whose marking changed since their last sample are recorded),
+    tasks, arcs: the tasks whose firings are recorded and the arcs which are sampled (all of them by default),
+    max_events: the recording stops after this number of events (the trace is then marked truncated),
+    time_scale: the duration of a time unit of the dataflow in the trace, in microseconds.
+    """
+
+    def __init__(self, sample_steps=100, tasks=None, arcs=None, max_events=1000000, time_scale=1.0):
+        self.sample_steps = max(1, int(sample_steps))
+        self.tasks = tasks
+        self.arcs = arcs
+        self.max_events = max_events
+        self.time_scale = time_scale
+        self.events = []
+        self.truncated = False
+        self.__task_names = []
+        self.__traced_tasks = []  # for each task index, True if its firings are recorded
+        self.__sampled_arcs = []  # the (arc index, counter name) sampled
+        self.__last_samples = {}  # arc index -> last marking recorded
+        self.__closing = False  # the events of the end of the execution are recorded even past max_events
+
+    # Called by SymbolicExe at the beginning of an execution of the snapshot frozen (see FrozenDataflow).
+    def begin(self, frozen):
+        del self.events[:]
+        self.truncated = False
+        self.__closing = False
+        self.__last_samples = {}
+        self.__task_names = [str(name) for name in frozen.task_names]
+        if self.tasks is None:
+            self.__traced_tasks = [True] * len(frozen.tasks)
+        else:
+            self.__traced_tasks = [task in self.tasks for task in frozen.tasks]
+        arcs = frozen.arcs if self.arcs is None else [arc for arc in frozen.arcs if arc in self.arcs]
+        self.__sampled_arcs = [(frozen.arc_index[arc], self.__task_names[frozen.task_index[arc[0]]] + " -> " +
+                                self.__task_names[frozen.task_index[arc[1]]] + " " + str(arc[2])) for arc in arcs]
+
+        self.events.append({"name": "process_name", "ph": "M", "pid": TASKS_PID, "args": {"name": "tasks"}})
+        self.events.append({"name": "process_name", "ph": "M", "pid": BUFFERS_PID, "args": {"name": "buffers"}})
+        for t, traced in enumerate(self.__traced_tasks):
+            if traced:
+                self.events.append({"name": "thread_name", "ph": "M", "pid": TASKS_PID, "tid": t,
+                                    "args": {"name": self.__task_names[t]}})
+
+    # Called by SymbolicExe for each firing of the task index t, phase as numbered by the dataflow.
+    def firing(self, time_tick, t, phase, duration):
+        if self.__traced_tasks[t] and self.__record():
+            self.events.append({"name": self.__task_names[t], "ph": "X", "pid": TASKS_PID, "tid": t,
+                                "ts": time_tick * self.time_scale, "dur": duration * self.time_scale,
+                                "args": {"phase": phase}})
+
+    # Called by SymbolicExe every sample_steps steps with the marking of each arc index.
+    def sample(self, time_tick, tokens):
+        for a, name in self.__sampled_arcs:
+            if self.__last_samples.get(a) != tokens[a] and self.__record():
+                self.__last_samples[a] = tokens[a]
+                self.events.append({"name": name, "ph": "C", "pid": BUFFERS_PID, "ts": time_tick * self.time_scale,
+                                    "args": {"tokens": tokens[a]}})
+
+    # Called by SymbolicExe when the execution dead locks, blocked is the list of the blocked task indexes.
+    def dead_lock(self, time_tick, tokens, blocked):
+        self.__closing = True
+        self.sample(time_tick, tokens)
+        self.events.append({"name": "dead lock", "ph": "i", "s": "g", "pid": TASKS_PID, "tid": 0,
+                            "ts": time_tick * self.time_scale,
+                            "args": {"blocked tasks": [self.__task_names[t] for t in blocked]}})
+
+    def __record(self):
+        if not self.__closing and self.max_events is not None and len(self.events) >= self.max_events:
+            if not self.truncated:
+                logging.warning("Execution trace truncated after " + str(self.max_events) + " events")
+                self.truncated = True
+            return False
+        return True
+
+    def write(self, filename):
+        """Write the trace as a Chrome trace-event JSON file.
+        """
+        with open(filename, "w") as open_file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms",
+                       "otherData": {"truncated": self.truncated}}, open_file)
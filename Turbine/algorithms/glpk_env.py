@@ -0,0 +1,31 @@
+"""
+The GLPK environment is shared by all the problems: glp_free_env() deletes every problem still allocated.
+The solvers free it by free_env(), which leaves it alone while problems are kept between two solves
+(see period_computation.PeriodAnalyzer). Without GLPK, free_env() does nothing.
+"""
+try:
+    from swiglpk import glp_free_env
+except ImportError:
+    try:
+        from glpk import glp_free_env
+    except ImportError:
+        glp_free_env = None  # GLPK is not installed: there is no environment to free
+
+_kept_problems = [0]  # number of the problems kept alive
+
+
+def keep_env():
+    """A problem is kept alive until release_env().
+    """
+    _kept_problems[0] += 1
+
+
+def release_env():
+    _kept_problems[0] -= 1
+
+
+def free_env():
+    """Free the GLPK environment if no problem is kept alive.
+    """
+    if _kept_problems[0] == 0 and glp_free_env is not None:
+        glp_free_env()
@@ -0,0 +1,448 @@
+"""
+Solvers of the linear programs (LP) and of the mixed integer linear programs (MIP) of Turbine.
+
+A LinearProgram describes the problem independently of the solver (its rows are built by
+lp_builder.SparseMatrixBuilder), a backend solves it:
+"GLPK": GLPK by swiglpk (the simplex for a LP, the branch and cut for a MIP),
+"HiGHS": HiGHS by SciPy (scipy.optimize.milp, SciPy >= 1.9, which needs Python 3: never available on Python 2),
+"Gurobi": Gurobi by gurobipy (it must be installed with its licence).
+
+get_backend(name) returns the backend of this name, "Auto" gives the fastest one installed (Gurobi, HiGHS then GLPK)
+and None gives GLPK if it is installed (the solutions are then the same as with the previous versions).
+"""
+import logging
+import os
+import sys
+from itertools import izip
+
+import numpy
+
+from Turbine.algorithms.glpk_env import free_env
+from Turbine.algorithms.lp_builder import SparseMatrixBuilder
+
+try:
+    import swiglpk as glpk
+except ImportError:
+    try:
+        import glpk
+    except ImportError:
+        glpk = None
+
+BACKENDS = ("GLPK", "HiGHS", "Gurobi")
+AUTO_ORDER = ("Gurobi", "HiGHS", "GLPK")  # the fastest first
+INFINITY = numpy.inf
+
+OPTIMAL = "optimal"
+INFEASIBLE = "infeasible"
+UNBOUNDED = "unbounded"
+UNDEFINED = "undefined"  # the solver failed or stopped before the optimum
+
+
+class LinearProgram:
+    """A LP: minimize (or maximize) sum(objective.col) subject to the rows of self.rows (see SparseMatrixBuilder)
+    and to the bounds of the columns.
+
+    The columns are numbered from 1 in the order of add_col.
+    The names of the columns and of the rows are only kept if names is True (to write the LP file).
+    dual: the backends which can choose solve the LP by the dual simplex.
+    """
+
+    def __init__(self, name, maximize=False, dual=False, names=False):
+        self.name = name
+        self.maximize = maximize
+        self.dual = dual
+        self.names = names
+        self.rows = SparseMatrixBuilder()
+        self.col_count = 0
+        self.__lower_bounds = []
+        self.__upper_bounds = []
+        self.__objective = []
+        self.__integer = []
+        self.__col_names = {}
+
+    def add_col(self, lower_bound=0.0, upper_bound=INFINITY, objective=0.0, integer=False, name=None):
+        """Add a column, integer columns are only integer when the problem is solved as a MIP.
+
+        :return : the column.
+        """
+        self.col_count += 1
+        self.__lower_bounds.append(lower_bound)
+        self.__upper_bounds.append(upper_bound)
+        self.__objective.append(objective)
+        self.__integer.append(integer)
+        if self.names and name is not None:
+            self.__col_names[self.col_count] = name
+        return self.col_count
+
+    def get_cols(self):
+        """:return : the arrays (lower bounds, upper bounds, objective coefficients, integer) of the columns.
+        """
+        return (numpy.array(self.__lower_bounds, dtype=numpy.float64),
+                numpy.array(self.__upper_bounds, dtype=numpy.float64),
+                numpy.array(self.__objective, dtype=numpy.float64), numpy.array(self.__integer, dtype=bool))
+
+    def get_col_names(self):
+        """:return : the dict column -> name of the columns which have a name.
+        """
+        return self.__col_names
+
+    def get_row_names(self):
+        """:return : the dict row -> name of the rows which have a name.
+        """
+        if not self.names:
+            return {}
+        return dict(self.rows.iter_names())
+
+
+class LPSolution:
+    """The solution of a LinearProgram: status is OPTIMAL, INFEASIBLE, UNBOUNDED or UNDEFINED,
+    the values of the columns are nan if the solver found no solution.
+    """
+
+    def __init__(self, status, objective, values):
+        self.status = status
+        self.objective = objective
+        self.values = values
+
+    def is_optimal(self):
+        return self.status == OPTIMAL
+
+    def get_value(self, col):
+        return float(self.values[col - 1])
+
+
+class GLPKBackend:
+    """GLPK by swiglpk: the simplex (presolved) for a LP, glp_intopt for a MIP.
+    """
+    name = "GLPK"
+    requirement = "swiglpk (or the glpk bindings)"
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+
+    @staticmethod
+    def is_available():
+        return glpk is not None
+
+    def solve(self, lp, mip=False, lp_filename=None):
+        prob = self.create_prob(lp)
+        try:
+            if lp_filename is not None:
+                self.write_prob(prob, lp_filename)
+            logging.info("solving problem ...")
+            if mip:
+                if not self.verbose:  # the presolver of glp_intopt does not follow msg_lev
+                    glpk.glp_term_out(glpk.GLP_OFF)
+                try:
+                    ret = glpk.glp_intopt(prob, self.get_mip_parameters())
+                finally:
+                    glpk.glp_term_out(glpk.GLP_ON)
+                logging.info("Solver return: " + str(ret))
+                status = glpk.glp_mip_status(prob)
+                get_value = glpk.glp_mip_col_val
+                objective = glpk.glp_mip_obj_val(prob)
+            else:
+                ret = glpk.glp_simplex(prob, self.get_parameters(lp))
+                logging.info("Solver return: " + str(ret))
+                status = glpk.glp_get_status(prob)
+                get_value = glpk.glp_get_col_prim
+                objective = glpk.glp_get_obj_val(prob)
+            values = numpy.array([get_value(prob, col) for col in xrange(1, lp.col_count + 1)])
+            return LPSolution(self.get_status(ret, status), objective, values)
+        finally:
+            glpk.glp_delete_prob(prob)
+            free_env()
+
+    def create_prob(self, lp):
+        """:return : a GLPK problem of the LinearProgram lp (it must be deleted by glp_delete_prob).
+        """
+        prob = glpk.glp_create_prob()
+        glpk.glp_set_prob_name(prob, lp.name)
+        glpk.glp_set_obj_dir(prob, glpk.GLP_MAX if lp.maximize else glpk.GLP_MIN)
+
+        lower_bounds, upper_bounds, objective, integer = lp.get_cols()
+        logging.info("Number of column: " + str(lp.col_count))
+        if lp.col_count > 0:
+            glpk.glp_add_cols(prob, lp.col_count)
+        col = 1
+        for lower_bound, upper_bound, coef, is_integer in izip(lower_bounds.tolist(), upper_bounds.tolist(),
+                                                                objective.tolist(), integer.tolist()):
+            if is_integer:
+                glpk.glp_set_col_kind(prob, col, glpk.GLP_IV)
+            glpk.glp_set_col_bnds(prob, col, *self.__get_bounds(lower_bound, upper_bound))
+            if coef != 0.0:
+                glpk.glp_set_obj_coef(prob, col, coef)
+            col += 1
+        for col, name in lp.get_col_names().iteritems():
+            glpk.glp_set_col_name(prob, col, name)
+
+        logging.info("Number of rows: " + str(lp.rows.row_count))
+        if lp.rows.row_count > 0:
+            glpk.glp_add_rows(prob, lp.rows.row_count)
+        lower_bounds, upper_bounds = lp.rows.get_bounds()
+        row = 1
+        for lower_bound, upper_bound in izip(lower_bounds.tolist(), upper_bounds.tolist()):
+            glpk.glp_set_row_bnds(prob, row, *self.__get_bounds(lower_bound, upper_bound))
+            row += 1
+        for row, name in lp.rows.iter_names():
+            glpk.glp_set_row_name(prob, row, name)
+
+        logging.info("loading matrix ...")
+        rows, cols, coefs = lp.rows.get_coo()
+        glpk.glp_load_matrix(prob, len(rows), self.__as_int_array(rows), self.__as_int_array(cols),
+                             self.__as_double_array(coefs))
+        return prob
+
+    def get_parameters(self, lp):
+        """:return : the parameters of the simplex for the LinearProgram lp.
+        """
+        param = glpk.glp_smcp()
+        glpk.glp_init_smcp(param)  # Do it before modify parameters
+        param.presolve = glpk.GLP_ON
+        param.msg_lev = glpk.GLP_MSG_ALL if self.verbose else glpk.GLP_MSG_OFF
+        if lp.dual:
+            param.meth = glpk.GLP_DUALP
+        param.out_frq = 2000  # consol print frequency
+        return param
+
+    def get_mip_parameters(self):
+        param = glpk.glp_iocp()
+        glpk.glp_init_iocp(param)
+        param.presolve = glpk.GLP_ON  # glp_intopt solves the LP relaxation itself
+        param.msg_lev = glpk.GLP_MSG_ALL if self.verbose else glpk.GLP_MSG_OFF
+        param.out_frq = 2000
+        return param
+
+    @staticmethod
+    def write_prob(prob, lp_filename):
+        problem_location = str(glpk.glp_write_lp(prob, None, lp_filename))
+        logging.info("Writing problem: " + str(problem_location))
+
+    @staticmethod
+    def get_status(ret, status):
+        if ret == glpk.GLP_ENOPFS:  # found by the presolver
+            return INFEASIBLE
+        if ret == glpk.GLP_ENODFS:
+            return UNBOUNDED
+        if ret != 0:
+            return UNDEFINED
+        if status == glpk.GLP_OPT:
+            return OPTIMAL
+        if status == glpk.GLP_NOFEAS:
+            return INFEASIBLE
+        if status == glpk.GLP_UNBND:
+            return UNBOUNDED
+        return UNDEFINED
+
+    # The GLPK type of bounds and the bounds of a row or a column.
+    @staticmethod
+    def __get_bounds(lower_bound, upper_bound):
+        if lower_bound == -INFINITY:
+            if upper_bound == INFINITY:
+                return glpk.GLP_FR, 0.0, 0.0
+            return glpk.GLP_UP, 0.0, upper_bound
+        if upper_bound == INFINITY:
+            return glpk.GLP_LO, lower_bound, 0.0
+        if lower_bound == upper_bound:
+            return glpk.GLP_FX, lower_bound, upper_bound
+        return glpk.GLP_DB, lower_bound, upper_bound
+
+    # The swig arrays of the values from the index 1 (as swiglpk.as_intArray, the glpk module has no such function).
+    @staticmethod
+    def __as_int_array(values):
+        if hasattr(glpk, "as_intArray"):
+            return glpk.as_intArray(values.tolist())
+        array = glpk.intArray(len(values) + 1)
+        for i, value in enumerate(values.tolist(), 1):
+            array[i] = value
+        return array
+
+    @staticmethod
+    def __as_double_array(values):
+        if hasattr(glpk, "as_doubleArray"):
+            return glpk.as_doubleArray(values.tolist())
+        array = glpk.doubleArray(len(values) + 1)
+        for i, value in enumerate(values.tolist(), 1):
+            array[i] = value
+        return array
+
+
+class HiGHSBackend:
+    """HiGHS by scipy.optimize.milp (SciPy >= 1.9), for the LPs and the MIPs.
+
+    SciPy 1.9 needs Python 3: on Python 2 this backend is never available
+    and get_backend("HiGHS") raises an ImportError.
+    SciPy cannot write a LP file: it is written by GLPK if it is installed.
+    """
+    name = "HiGHS"
+    requirement = "SciPy >= 1.9 (scipy.optimize.milp), which needs Python 3"
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+
+    @staticmethod
+    def is_available():
+        if sys.version_info[0] < 3:
+            return False
+        try:
+            from scipy.optimize import milp
+        except ImportError:
+            return False
+        return True
+
+    def solve(self, lp, mip=False, lp_filename=None):
+        from scipy.optimize import Bounds, LinearConstraint, milp
+        from scipy.sparse import coo_matrix
+
+        if lp_filename is not None:
+            if GLPKBackend.is_available():
+                prob = GLPKBackend(self.verbose).create_prob(lp)
+                GLPKBackend.write_prob(prob, lp_filename)
+                glpk.glp_delete_prob(prob)
+                free_env()
+            else:
+                logging.warning("The LP file is written by GLPK which is not installed: " + str(lp_filename))
+
+        lower_bounds, upper_bounds, objective, integer = lp.get_cols()
+        if lp.maximize:
+            objective = -objective
+        constraints = None
+        if lp.rows.row_count > 0:
+            rows, cols, coefs = lp.rows.get_coo()
+            matrix = coo_matrix((coefs, (rows - 1, cols - 1)), shape=(lp.rows.row_count, lp.col_count)).tocsr()
+            row_lower_bounds, row_upper_bounds = lp.rows.get_bounds()
+            constraints = LinearConstraint(matrix, row_lower_bounds, row_upper_bounds)
+        integrality = None
+        if mip:
+            integrality = integer.astype(numpy.uint8)
+
+        logging.info("solving problem ...")
+        res = milp(objective, integrality=integrality, bounds=Bounds(lower_bounds, upper_bounds),
+                   constraints=constraints, options={"disp": self.verbose, "presolve": True})
+        logging.info("Solver return: " + str(res.status) + " " + str(res.message))
+
+        status = {0: OPTIMAL, 2: INFEASIBLE, 3: UNBOUNDED}.get(res.status, UNDEFINED)
+        if res.x is None:
+            return LPSolution(status, numpy.nan, numpy.full(lp.col_count, numpy.nan))
+        value = res.fun
+        if lp.maximize:
+            value = -value
+        return LPSolution(status, value, numpy.asarray(res.x))
+
+
+class GurobiBackend:
+    """Gurobi by gurobipy, for the LPs and the MIPs.
+    """
+    name = "Gurobi"
+    requirement = "gurobipy and a Gurobi licence"
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+
+    @staticmethod
+    def is_available():
+        try:
+            import gurobipy
+        except ImportError:
+            return False
+        return True
+
+    def solve(self, lp, mip=False, lp_filename=None):
+        from gurobipy import GRB, LinExpr, Model
+
+        model = Model(lp.name)
+        # Gurobi parameters:
+        if not self.verbose:
+            model.params.OutputFlag = 0
+            try:
+                os.remove("gurobi.log")
+            except OSError:
+                pass
+        model.params.Threads = 2
+        if mip:
+            model.params.IntFeasTol = 0.000001
+        elif lp.dual:
+            model.params.Method = 1
+        model.ModelSense = GRB.MAXIMIZE if lp.maximize else GRB.MINIMIZE
+
+        lower_bounds, upper_bounds, objective, integer = lp.get_cols()
+        col_names = lp.get_col_names()
+        variables = []
+        for col, (lower_bound, upper_bound, coef, is_integer) in enumerate(
+                izip(lower_bounds.tolist(), upper_bounds.tolist(), objective.tolist(), integer.tolist()), 1):
+            variables.append(model.addVar(lb=max(lower_bound, -GRB.INFINITY), ub=min(upper_bound, GRB.INFINITY),
+                                          obj=coef, vtype=GRB.INTEGER if mip and is_integer else GRB.CONTINUOUS,
+                                          name=col_names.get(col, "")))
+        model.update()
+
+        rows, cols, coefs = lp.rows.get_coo()  # sorted by row
+        row_starts = numpy.searchsorted(rows, numpy.arange(1, lp.rows.row_count + 2)).tolist()
+        cols = cols.tolist()
+        coefs = coefs.tolist()
+        row_names = lp.get_row_names()
+        row_lower_bounds, row_upper_bounds = lp.rows.get_bounds()
+        for row, (lower_bound, upper_bound) in enumerate(izip(row_lower_bounds.tolist(),
+                                                              row_upper_bounds.tolist()), 1):
+            start, end = row_starts[row - 1], row_starts[row]
+            expr = LinExpr(coefs[start:end], [variables[col - 1] for col in cols[start:end]])
+            name = row_names.get(row, "")
+            if lower_bound == upper_bound:
+                model.addConstr(expr, GRB.EQUAL, lower_bound, name)
+            elif upper_bound == INFINITY:
+                if lower_bound != -INFINITY:
+                    model.addConstr(expr, GRB.GREATER_EQUAL, lower_bound, name)
+            elif lower_bound == -INFINITY:
+                model.addConstr(expr, GRB.LESS_EQUAL, upper_bound, name)
+            else:
+                model.addRange(expr, lower_bound, upper_bound, name)
+        model.update()
+
+        if lp_filename is not None:
+            problem_location = str(model.write(lp_filename))
+            logging.info("Writing problem: " + str(problem_location))
+
+        logging.info("solving problem ...")
+        model.optimize()
+        logging.info("Solver return: " + str(model.status))
+
+        if model.status == GRB.OPTIMAL:
+            status = OPTIMAL
+        elif model.status == GRB.INFEASIBLE:
+            status = INFEASIBLE
+        elif model.status == GRB.UNBOUNDED:
+            status = UNBOUNDED
+        else:
+            status = UNDEFINED
+        if model.SolCount == 0:
+            return LPSolution(status, numpy.nan, numpy.full(lp.col_count, numpy.nan))
+        return LPSolution(status, model.ObjVal, numpy.array([variable.X for variable in variables]))
+
+
+_BACKEND_CLASSES = {"GLPK": GLPKBackend, "HiGHS": HiGHSBackend, "Gurobi": GurobiBackend}
+
+
+def get_available_backends():
+    """:return : the names of the backends installed.
+    """
+    return tuple(name for name in BACKENDS if _BACKEND_CLASSES[name].is_available())
+
+
+def get_backend(name=None, verbose=False):
+    """Return the backend of this name: "GLPK", "HiGHS", "Gurobi", "Auto" for the fastest installed (Gurobi, HiGHS
+    then GLPK) or None for GLPK if it is installed (else as "Auto").
+
+    :type verbose: bool, if True the solver will talk.
+    """
+    if name is None:
+        name = "GLPK" if GLPKBackend.is_available() else "Auto"
+    if name == "Auto":
+        for backend_name in AUTO_ORDER:
+            if _BACKEND_CLASSES[backend_name].is_available():
+                return _BACKEND_CLASSES[backend_name](verbose)
+        raise ImportError("No LP solver installed: install swiglpk, SciPy >= 1.9 or gurobipy")
+    if name not in _BACKEND_CLASSES:
+        raise ValueError("Unknown LP backend: " + str(name) + " (must be one of " + str(BACKENDS) + " or Auto)")
+    if not _BACKEND_CLASSES[name].is_available():
+        raise ImportError("The LP backend " + name + " is not available: it needs " +
+                          _BACKEND_CLASSES[name].requirement)
+    return _BACKEND_CLASSES[name](verbose)
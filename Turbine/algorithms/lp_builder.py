@@ -0,0 +1,86 @@
+"""
+Sparse builder of the constraint matrix of the LPs (see SolverSC1, SolverSC1Kc, SolverSC2 and ComputePeriod).
+
+The rows are added by blocks of rows which have the same number of entries: the columns and the coefficients
+of a block are arrays of shape (row count, entries per row) computed with numpy. The matrix is kept as COO
+triplets which are handed to the solver in one call (see lp_backend).
+The names of the rows are only kept if they are given (the solvers give them only to write the LP file).
+"""
+import numpy
+
+
+class SparseMatrixBuilder:
+    """COO builder of the rows lower bound <= sum(coef.col) <= upper bound of a LP:
+    builder.add_rows(...) for each block of rows, then the backend reads get_coo() and get_bounds().
+
+    The rows and the columns are numbered from 1 as in GLPK, the infinite bounds are -numpy.inf and numpy.inf.
+    The entries whose coefficient is 0 are not stored.
+    """
+
+    def __init__(self):
+        self.row_count = 0
+        self.__rows = []  # the arrays of the row of each entry of the blocks
+        self.__cols = []
+        self.__coefs = []
+        self.__lower_bounds = []  # the arrays of the bounds of the rows of the blocks
+        self.__upper_bounds = []
+        self.__names = []  # (first row of a block, names of its rows)
+
+    def add_rows(self, cols, coefs, lower_bounds, upper_bounds=numpy.inf, names=None):
+        """Add a block of rows.
+
+        :param cols: the columns of the entries of each row, array-like of shape (row count, entries per row).
+        :param coefs: the coefficients of the entries (same shape as cols, or broadcast to it).
+        :param lower_bounds: the lower bound of each row (or a scalar), same for upper_bounds.
+        :param names: the names of the rows or None.
+        :return : the first row of the block.
+        """
+        cols = numpy.asarray(cols, dtype=numpy.int_)
+        if cols.ndim == 1:
+            cols = cols.reshape((len(cols), 1))
+        coefs = numpy.broadcast_to(numpy.asarray(coefs, dtype=numpy.float64), cols.shape)
+        row_count = cols.shape[0]
+        first_row = self.row_count + 1
+        if row_count == 0:
+            return first_row
+
+        rows = numpy.repeat(numpy.arange(first_row, first_row + row_count, dtype=numpy.int_), cols.shape[1])
+        coefs = coefs.ravel()
+        nonzero = coefs != 0.0
+        self.__rows.append(rows[nonzero])
+        self.__cols.append(cols.ravel()[nonzero])
+        self.__coefs.append(coefs[nonzero])
+
+        self.__lower_bounds.append(numpy.broadcast_to(numpy.asarray(lower_bounds, dtype=numpy.float64),
+                                                      (row_count,)))
+        self.__upper_bounds.append(numpy.broadcast_to(numpy.asarray(upper_bounds, dtype=numpy.float64),
+                                                      (row_count,)))
+        if names is not None:
+            self.__names.append((first_row, names))
+        self.row_count += row_count
+        return first_row
+
+    def get_entry_count(self):
+        return sum(len(rows) for rows in self.__rows)
+
+    def get_coo(self):
+        """:return : the arrays (rows, cols, coefs) of the entries of the matrix, sorted by row.
+        """
+        if not self.__rows:
+            return (numpy.zeros(0, dtype=numpy.int_), numpy.zeros(0, dtype=numpy.int_),
+                    numpy.zeros(0, dtype=numpy.float64))
+        return numpy.concatenate(self.__rows), numpy.concatenate(self.__cols), numpy.concatenate(self.__coefs)
+
+    def get_bounds(self):
+        """:return : the arrays (lower bounds, upper bounds) of the rows.
+        """
+        if not self.__lower_bounds:
+            return numpy.zeros(0, dtype=numpy.float64), numpy.zeros(0, dtype=numpy.float64)
+        return numpy.concatenate(self.__lower_bounds), numpy.concatenate(self.__upper_bounds)
+
+    def iter_names(self):
+        """Generate the (row, name) of the rows which have a name.
+        """
+        for first_row, names in self.__names:
+            for row, name in enumerate(names, first_row):
+                yield row, name
@@ -1,4 +1,4 @@
-from fractions import Fraction
+from fractions import Fraction, gcd
 from math import ceil
 from numpy.random.mtrand import randint
 from Turbine.calc.lcm import lcm
@@ -105,7 +105,11 @@ def get_rdm_un_normalized_vector(dataflow, max_num=10):
     coef = {}
     for arc in dataflow.get_arc_list():
         random_num = randint(1, max_num)
-        coef[arc] = Fraction(numerator=random_num, denominator=dataflow.get_gcd(arc))
+        # The gcd of a CSDF arc only divides its consumption rates
+        step = dataflow.get_gcd(arc)
+        if dataflow.is_csdf:
+            step = reduce(gcd, dataflow.get_prod_rate_list(arc), step)
+        coef[arc] = Fraction(numerator=random_num, denominator=step)
     return coef
 
 
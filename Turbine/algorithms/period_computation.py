@@ -1,60 +1,141 @@
 """
 Created on Jul 8, 2014
 """
-from fractions import gcd
 import logging
+from collections import deque
+from itertools import izip
+from math import ceil
 
-try:
-    from swiglpk import *
-except ImportError:
-    from glpk import *
+import numpy
+
+from Turbine.algorithms.glpk_env import free_env, keep_env, release_env
+from Turbine.algorithms.lp_backend import GLPKBackend, LinearProgram, get_backend, glpk
+
+
+METHODS = ("LP", "MCR")
+EPSILON = 1e-9  # relative tolerance of the comparisons of the maximum cycle ratio
 
 
 class ComputePeriod:
     """
     Compute the period of the 1-periodic schedule for a SDF graph.
+
+    The constraints s(target) - s(source) >= l + coef.K between the start times s of the tasks (or of the phases)
+    are solved by one of the methods:
+    "LP": the linear program min K solved by the LP backend lp_backend (see lp_backend.get_backend, GLPK by default),
+    "MCR": the maximum cycle ratio of the constraint graph (Howard policy iteration): K is the max of
+    sum(l) / sum(-coef) over its cycles, no LP is built. If a cycle of the constraint graph has sum(-coef) <= 0
+    (the ratio is not defined) or the policy iteration does not converge, the LP is solved instead.
+    The two methods may give different periods: the MCR is exact while GLPK can stop at a suboptimal basis when the
+    coefficients of the LP are badly scaled (e.g. the benchmark CSDF_16, whose coefficients of K range from 1e-7
+    to 1e9: 19722578.8 by the LP, 19558224.0 by the MCR). check_schedule tests the start times of both.
+
+    A persistent ComputePeriod keeps its LP and the basis of the last solve: compute_period can be called again
+    after update_initial_marking, which only changes the coefficients of K of the rows of the arc (the rows of
+    the pairs of phases that the marking deactivates are made free, the ones it activates are added)
+    and starts the dual simplex from the last basis (see PeriodAnalyzer). The LP is freed by delete().
+    A persistent ComputePeriod solves its LP by GLPK.
     """
 
-    def __init__(self, dataflow, verbose=False, lp_filename=None):
+    def __init__(self, dataflow, verbose=False, lp_filename=None, method="LP", persistent=False, lp_backend=None):
         logging.basicConfig(level=logging.ERROR)
         if verbose:
             logging.basicConfig(level=logging.DEBUG)
         if not dataflow.is_normalized:
             raise ValueError("The dataflow must be normalized !")
+        if method not in METHODS:
+            raise ValueError("Unknown method: " + str(method) + " (must be one of " + str(METHODS) + ")")
 
         self.dataflow = dataflow
         self.verbose = verbose
         self.lp_filename = lp_filename
+        self.method = method
+        self.max_iterations = 10000  # of the policy iteration (MCR)
+        self.persistent = persistent
+        self.lp_backend = lp_backend
+        self.backend = None  # the MCR needs a LP backend only if the maximum cycle ratio is not found
+        if method == "LP" or persistent:
+            self.backend = get_backend(lp_backend, verbose)
+        if persistent and not isinstance(self.backend, GLPKBackend):
+            raise ValueError("A persistent ComputePeriod needs the GLPK backend")
 
         self.K = 0  # Non Normalised period
         self.col_start = {}  # dict use for storing task's variable column
+        self.lp = None
+        self.prob = None  # the GLPK problem of a persistent ComputePeriod
+        self.arc_rows = {}  # arc -> (source, target) -> row of its constraints, if persistent
 
     def compute_period(self):
-        self.__init_prob()  # Modify parameters
-        self.__create_col()  # Add Col on prob
-        self.__create_row()  # Add Row (constraint) on prob
-        ret = self.__solve_prob()  # Launch the solver and set preload of the graph
-        glp_delete_prob(self.prob)
-        glp_free_env()
-        del self.prob  # Del prob
-        return ret
+        if self.method == "MCR":
+            ret = self.__compute_cycle_ratio()
+            if ret is not None:
+                return ret
+            logging.info("Maximum cycle ratio not found, solving the LP")
+            if self.backend is None:
+                self.backend = get_backend(self.lp_backend, self.verbose)
+        if self.prob is None:
+            self.__init_prob()  # Modify parameters
+            self.__create_col()  # Add Col on prob
+            self.__create_row()  # Add Row (constraint) on prob
+        if self.persistent:
+            return self.__solve_persistent_prob()
+        try:
+            return self.__solve_prob()  # Launch the solver and set preload of the graph
+        finally:
+            self.lp = None
+
+    def delete(self):
+        """Free the LP (of a persistent ComputePeriod).
+        """
+        if self.prob is None:
+            return
+        glpk.glp_delete_prob(self.prob)
+        self.prob = None  # Del prob
+        if self.persistent:
+            release_env()
+        free_env()
+
+    def check_schedule(self, period, start_time, tolerance=1e-6):
+        """Return True if the start times start_time (as returned by compute_period) satisfy the constraints of
+        the schedule of period period, up to the relative tolerance tolerance.
+        """
+        f_task = self.dataflow.get_task_list()[0]
+        k = float(period) / (self.dataflow.get_repetition_factor(f_task) * self.__get_rate(f_task))
+        for source, target, coef, duration, _ in self.__constraints():
+            bound = duration + coef * k
+            scale = max(1.0, abs(bound), abs(start_time[source]), abs(start_time[target]))
+            if start_time[target] - start_time[source] < bound - tolerance * scale:
+                return False
+        return True
+
+    def update_initial_marking(self, arc, initial_marking):
+        """Set the initial marking of an arc of the dataflow and update the rows of its constraints
+        in the LP kept by a persistent ComputePeriod.
+        """
+        self.dataflow.set_initial_marking(arc, initial_marking)
+        if self.prob is None:
+            return
+        rows = self.arc_rows[arc]
+        ind = glpk.intArray(4)
+        val = glpk.doubleArray(4)
+        inactive_rows = dict(rows)
+        for source, target, coef, duration in self.__arc_constraints(arc):
+            row = inactive_rows.pop((source, target), None)
+            if row is None:
+                row = glpk.glp_add_rows(self.prob, 1)  # a basic row: the basis stays valid
+                rows[(source, target)] = row
+                if self.lp_filename is not None:
+                    self.__set_row_name(row, source, target)
+            ind[1], ind[2], ind[3] = self.col_start[target], self.col_start[source], self.K
+            val[1], val[2], val[3] = 1.0, -1.0, float(-coef)
+            glpk.glp_set_mat_row(self.prob, row, 3, ind, val)
+            glpk.glp_set_row_bnds(self.prob, row, glpk.GLP_LO, duration, 0.0)
+        for row in inactive_rows.itervalues():
+            glpk.glp_set_row_bnds(self.prob, row, glpk.GLP_FR, 0.0, 0.0)
 
     def __init_prob(self):  # Modify parameters
         logging.info("Computing period and start time")
-        self.prob = glp_create_prob()
-        glp_set_prob_name(self.prob, "period N start time")
-        glp_set_obj_dir(self.prob, GLP_MIN)
-
-        # GLPK parameters:
-        self.glpkParam = glp_smcp()
-        glp_init_smcp(self.glpkParam)  # Do it before modify parameters
-
-        self.glpkParam.presolve = GLP_ON
-        self.glpkParam.msg_lev = GLP_MSG_ALL
-        if not self.verbose:
-            self.glpkParam.msg_lev = GLP_MSG_OFF
-        self.glpkParam.meth = GLP_DUALP
-        self.glpkParam.out_frq = 2000  # consol print frequency
+        self.lp = LinearProgram("period N start time", dual=True, names=self.lp_filename is not None)
 
     def __create_col(self):  # Add Col on prob
         # Counting column
@@ -68,254 +149,449 @@ class ComputePeriod:
         logging.info("Number of column: " + str(col_count))
 
         # Create column
-        glp_add_cols(self.prob, col_count)
-        col = 1
-        self.__add_col_k(col, "N")
-        col += 1
+        self.__add_col_k()
 
         # Create start column
         for task in self.dataflow.get_task_list():
             if self.dataflow.is_sdf:
-                self.__add_col_start(col, "T" + str(task), task)
-                col += 1
+                self.__add_col_start(task)
             elif self.dataflow.is_csdf:
                 for i in xrange(self.dataflow.get_phase_count(task)):
-                    self.__add_col_start(col, "T" + str(task) + "|" + str(i), (task, i))
-                    col += 1
+                    self.__add_col_start((task, i))
 
     def __create_row(self):  # Add Row (constraint) on prob
-        # Counting row
-        row_count = 0
-        non_overlap = 0
-        non_mono_phase = 0
+        builder = self.lp.rows
         if self.dataflow.is_sdf:
-            row_count = self.dataflow.get_arc_count()
-            re_entrant_arc = 0
-            for arc in self.dataflow.get_arc_list():
-                if self.dataflow.is_arc_reentrant(arc):
-                    re_entrant_arc += 1
-            row_count -= re_entrant_arc
+            self.__add_sdf_rows(builder)
         elif self.dataflow.is_csdf:
+            pruned_count = 0
             for arc in self.dataflow.get_arc_list():
-                source = self.dataflow.get_source(arc)
-                target = self.dataflow.get_target(arc)
-                for i in xrange(self.dataflow.get_phase_count(source)):
-                    for j in xrange(self.dataflow.get_phase_count(target)):
-                        if not self.dataflow.is_arc_reentrant(arc) or (not i == j and i < j):
-                            if self.__compute_amin(arc, i, j) <= self.__compute_amax(arc, i, j):
-                                row_count += 1
+                pruned_count += self.__add_arc_rows(builder, arc)
+            logging.info("Number of pairs of phases pruned: " + str(pruned_count))
             for task in self.dataflow.get_task_list():
                 if self.dataflow.get_phase_count(task) > 1:
-                    non_mono_phase += 1
-                    non_overlap += self.dataflow.get_phase_count(task)
+                    self.__add_non_overlap_rows(builder, task)
 
         # Create row
-        logging.info("Number of rows: " + str(row_count + non_overlap))
-        glp_add_rows(self.prob, row_count + non_overlap)
+        logging.info("Number of rows: " + str(builder.row_count))
+        logging.info("Var array size: " + str(builder.get_entry_count() + 1))
 
-        self.var_array_size = row_count * 3 + non_overlap * 2 + 1
-        if self.dataflow.is_csdf:
-            self.var_array_size += non_mono_phase
-        logging.info("Var array size: " + str(self.var_array_size))
-        self.var_row = intArray(self.var_array_size)
-        self.var_col = intArray(self.var_array_size)
-        self.var_coef = doubleArray(self.var_array_size)
-
-        # Fill row
-        self.k = 1
-        row = 1
+    # Generate the constraints s(target) - s(source) >= duration + coef.K of the schedule
+    # as (source, target, coef, duration, non_overlap) where source and target are tasks for a SDF
+    # and (task, phase) for a CSDF.
+    def __constraints(self):
+        for arc in self.dataflow.get_arc_list():
+            for source, target, coef, duration in self.__arc_constraints(arc):
+                yield source, target, coef, duration, False
+        for constraint in self.__non_overlap_constraints():
+            yield constraint
+
+    # Generate the constraints of an arc as (source, target, coef, duration) for the pairs of phases whose
+    # constraint is active (amax >= amin, this depends on the initial marking).
+    def __arc_constraints(self, arc):
         #####################################################################################
         # Constraint s(tj) - s(ti)     >= l(ti) + N(Zj - M0(p) - gcdij)                     # SDF
         # Constraint s(tjkj) - s(tiki) >= l(tik) + N(C(tjkj) - Ppr(tiki) - M0(a) - gcdij)   # CSDF
         #            if amax >= amin                                                        #
         #####################################################################################
-        for arc in self.dataflow.get_arc_list():
-            source = self.dataflow.get_source(arc)
-            target = self.dataflow.get_target(arc)
-            m0 = self.dataflow.get_initial_marking(arc)
+        source = self.dataflow.get_source(arc)
+        target = self.dataflow.get_target(arc)
 
-            if self.dataflow.is_sdf:
-                if not self.dataflow.is_arc_reentrant(arc):
-                    gcd_v = self.dataflow.get_gcd(arc)
-                    lti = self.dataflow.get_task_duration(source)
-                    zj = self.dataflow.get_cons_rate(arc)
-                    n_coef = zj - m0 - gcd_v
-                    self.__add_main_row(row, source, target, n_coef, lti)
-                    row += 1
-            elif self.dataflow.is_csdf:
-                for i in xrange(self.dataflow.get_phase_count(source)):
-                    ltik = self.dataflow.get_phase_duration_list(source)[i]
-                    for j in xrange(self.dataflow.get_phase_count(target)):
-                        amax = self.__compute_amax(arc, i, j)
-                        if self.__compute_amin(arc, i, j) <= amax:
-                            if not self.dataflow.is_arc_reentrant(arc) or (not i == j and i < j):
-                                self.__add_main_row(row, (source, i), (target, j), amax, ltik)
-                                row += 1
+        if self.dataflow.is_sdf:
+            if not self.dataflow.is_arc_reentrant(arc):
+                m0 = self.dataflow.get_initial_marking(arc)
+                gcd_v = self.dataflow.get_gcd(arc)
+                lti = self.dataflow.get_task_duration(source)
+                zj = self.dataflow.get_cons_rate(arc)
+                yield source, target, zj - m0 - gcd_v, lti
+        elif self.dataflow.is_csdf:
+            source_phases, target_phases, amax, _ = self.__compute_active_pairs(arc)
+            durations = self.dataflow.get_phase_duration_list(source)
+            for i, j, coef in izip(source_phases.tolist(), target_phases.tolist(), amax.tolist()):
+                yield (source, i), (target, j), coef, durations[i]
 
+    def __non_overlap_constraints(self):
         #####################################################################################
         # Constraints of non overlapping                                                    # CSDF
         #####################################################################################
         if self.dataflow.is_csdf:
             for task in self.dataflow.get_task_list():
-                if self.dataflow.get_phase_count(task) > 1:
-                    self.__add_non_overlap_row(row, task, self.dataflow.get_phase_count(task) - 1, 0)
-                    row += 1
-                    for phase in xrange(self.dataflow.get_phase_count(task) - 1):
-                        self.__add_non_overlap_row(row, task, phase, phase + 1)
-                        row += 1
+                phase_count = self.dataflow.get_phase_count(task)
+                if phase_count > 1:
+                    durations = self.dataflow.get_phase_duration_list(task)
+                    yield (task, phase_count - 1), (task, 0), -self.__get_rate(task), durations[-1], True
+                    for phase in xrange(phase_count - 1):
+                        yield (task, phase), (task, phase + 1), 0, durations[phase], True
+
+    # Find the smallest K of the constraints by the maximum cycle ratio of the constraint graph:
+    # an arc source -> target of length duration and transit time -coef per constraint,
+    # plus an origin (s >= 0) whose loop has the ratio kmin.
+    # Howard policy iteration: each node keeps the constraint of one predecessor (the policy), the values of the
+    # policy (the ratio of the cycle above each node and the start times for this ratio) are computed,
+    # then the nodes take the constraints which increase their ratio, or else their start time.
+    # Return (period, start time) as __solve_prob or None if the ratio is not defined.
+    def __compute_cycle_ratio(self):
+        logging.info("Computing period and start time by the maximum cycle ratio")
+        index = {None: 0}  # node -> index, None is the origin
+        nodes = [None]
+        for task in self.dataflow.get_task_list():
+            if self.dataflow.is_sdf:
+                index[task] = len(nodes)
+                nodes.append(task)
+            elif self.dataflow.is_csdf:
+                for phase in xrange(self.dataflow.get_phase_count(task)):
+                    index[(task, phase)] = len(nodes)
+                    nodes.append((task, phase))
+        node_count = len(nodes)
+
+        # The arcs of the constraint graph: the loop of the origin then an arc from the origin to each node.
+        sources, targets, lengths, transits = [0], [0], [self.__get_kmin()], [1]
+        for v in xrange(1, node_count):
+            sources.append(0)
+            targets.append(v)
+            lengths.append(0.0)
+            transits.append(0)
+        for source, target, coef, duration, _ in self.__constraints():
+            sources.append(index[source])
+            targets.append(index[target])
+            lengths.append(float(duration))
+            transits.append(-coef)
+        arc_count = len(sources)
+        logging.info("Constraint graph: " + str(node_count) + " nodes, " + str(arc_count) + " arcs")
+
+        policy = range(node_count)  # the arc of the predecessor of each node (from the origin first)
+        ratio = [0.0] * node_count
+        value = [0.0] * node_count
+        for iteration in xrange(self.max_iterations):
+            # 1 - Value determination: each node follows its predecessors up to a cycle or to a node done
+            done = [False] * node_count
+            for start in xrange(node_count):
+                path = []
+                on_path = {}
+                v = start
+                while not done[v] and v not in on_path:
+                    on_path[v] = len(path)
+                    path.append(v)
+                    v = sources[policy[v]]
+                if not done[v]:  # a new cycle of the policy from v
+                    cycle = path[on_path[v]:]
+                    transit = sum(transits[policy[u]] for u in cycle)
+                    if transit <= 0:
+                        logging.info("Cycle of transit time " + str(transit) + " in the constraint graph")
+                        return None
+                    ratio[v] = sum(lengths[policy[u]] for u in cycle) / transit
+                    done[v] = True
+                for u in reversed(path):
+                    if not done[u]:
+                        a = policy[u]
+                        ratio[u] = ratio[sources[a]]
+                        value[u] = value[sources[a]] + lengths[a] - ratio[u] * transits[a]
+                        done[u] = True
+
+            # 2 - Policy improvement: a greater ratio first, then a later start time
+            changed = False
+            for a in xrange(arc_count):
+                if ratio[sources[a]] > ratio[targets[a]] * (1 + EPSILON) + EPSILON:
+                    ratio[targets[a]] = ratio[sources[a]]
+                    policy[targets[a]] = a
+                    changed = True
+            if not changed:
+                for a in xrange(arc_count):
+                    source, target = sources[a], targets[a]
+                    if abs(ratio[source] - ratio[target]) <= EPSILON * (1 + abs(ratio[target])):
+                        candidate = value[source] + lengths[a] - ratio[target] * transits[a]
+                        if candidate > value[target] + EPSILON * (1 + abs(value[target])):
+                            value[target] = candidate
+                            policy[target] = a
+                            changed = True
+            if not changed:
+                break
+        else:
+            logging.info("The policy iteration did not converge in " + str(self.max_iterations) + " iterations")
+            return None
+        logging.info("Policy iteration converged in " + str(iteration + 1) + " iterations")
+
+        # The start times of the greatest ratio: longest paths from the values of the policy.
+        k = max(ratio)
+        weights = [lengths[a] - k * transits[a] for a in xrange(arc_count)]
+        out_arcs = [[] for _ in xrange(node_count)]
+        for a in xrange(arc_count):
+            out_arcs[sources[a]].append(a)
+        queue = deque(xrange(node_count))
+        queued = [True] * node_count
+        relaxations = 0
+        while queue:
+            u = queue.popleft()
+            queued[u] = False
+            for a in out_arcs[u]:
+                target = targets[a]
+                candidate = value[u] + weights[a]
+                if candidate > value[target] + EPSILON * (1 + abs(value[target])):
+                    value[target] = candidate
+                    relaxations += 1
+                    if relaxations > node_count * arc_count:
+                        logging.info("Positive cycle for the period " + str(k))
+                        return None
+                    if not queued[target]:
+                        queued[target] = True
+                        queue.append(target)
 
-    def __solve_prob(self):  # Launch the solver and set preload of the graph
-        logging.info("loading matrix ...")
-        glp_load_matrix(self.prob, self.var_array_size - 1, self.var_row, self.var_col, self.var_coef)
+        start_time = {}
+        for v in xrange(1, node_count):
+            start_time[nodes[v]] = value[v] - value[0]
+        return self.__get_normalized_period(k), start_time
 
+    def __solve_prob(self):  # Launch the solver and set preload of the graph
+        solution = self.backend.solve(self.lp, lp_filename=self.lp_filename)
+        if not solution.is_optimal():
+            raise RuntimeError("solver did not found solution")
+        return self.__get_solution(solution.get_value)
+
+    # Solve the GLPK problem kept by a persistent ComputePeriod (it is created by the first solve).
+    def __solve_persistent_prob(self):
+        if self.prob is None:
+            self.prob = self.backend.create_prob(self.lp)
+            keep_env()
+            self.glpkParam = self.backend.get_parameters(self.lp)
+            self.lp = None
         if self.lp_filename is not None:
-            problem_location = str(glp_write_lp(self.prob, None, self.lp_filename))
-            logging.info("Writing problem: " + str(problem_location))
+            self.backend.write_prob(self.prob, self.lp_filename)
 
         logging.info("solving problem ...")
-        ret = glp_simplex(self.prob, self.glpkParam)
+        ret = glpk.glp_simplex(self.prob, self.glpkParam)
+        if ret != 0 and self.glpkParam.presolve == glpk.GLP_OFF:  # the last basis is singular for the new rows
+            logging.info("Solving the LP again from the standard basis")
+            self.glpkParam.presolve = glpk.GLP_ON
+            ret = glpk.glp_simplex(self.prob, self.glpkParam)
+        # the presolver does not start from the basis of the last solve, the next solves do
+        self.glpkParam.presolve = glpk.GLP_OFF
         logging.info("Solver return: " + str(ret))
-        if not ret == 0:
+        if not ret == 0 or glpk.glp_get_status(self.prob) != glpk.GLP_OPT:
             raise RuntimeError("solver did not found solution")
+        return self.__get_solution(lambda col: glpk.glp_get_col_prim(self.prob, col))
 
-        # Start date for each task
-        f_task = self.dataflow.get_task_list()[0]
-        rep_v = self.dataflow.get_repetition_factor(f_task)
-        try:
-            if self.dataflow.is_sdf:
-                z = self.dataflow.get_prod_rate(self.dataflow.get_arc_list(source=f_task)[0])
-            else:
-                z = sum(self.dataflow.get_prod_rate_list(self.dataflow.get_arc_list(source=f_task)[0]))
-        except IndexError:
-            if self.dataflow.is_sdf:
-                z = self.dataflow.get_cons_rate(self.dataflow.get_arc_list(target=f_task)[0])
-            else:
-                z = sum(self.dataflow.get_cons_rate_list(self.dataflow.get_arc_list(target=f_task)[0]))
-
-        n = glp_get_col_prim(self.prob, self.K) * rep_v * z
+    # Return the period and the start date for each task from the values of the columns.
+    def __get_solution(self, get_value):
+        n = self.__get_normalized_period(get_value(self.K))
         start_time = {}
         for task in self.dataflow.get_task_list():
             if self.dataflow.is_sdf:
-                start_time[task] = glp_get_col_prim(self.prob, self.col_start[task])
+                start_time[task] = get_value(self.col_start[task])
             if self.dataflow.is_csdf:
                 for phase in xrange(self.dataflow.get_phase_count(task)):
-                    value = glp_get_col_prim(self.prob, self.col_start[(task, phase)])
-                    start_time[(task, phase)] = value
+                    start_time[(task, phase)] = get_value(self.col_start[(task, phase)])
         return n, start_time
 
-    def __add_col_k(self, col, name):
-        kmin = 0.0
+    # The period of the first task for the non normalised period K.
+    def __get_normalized_period(self, k):
+        f_task = self.dataflow.get_task_list()[0]
+        return k * self.dataflow.get_repetition_factor(f_task) * self.__get_rate(f_task)
 
+    # The normalized rate of a task: the rate of its first output arc (or input arc).
+    def __get_rate(self, task):
+        try:
+            if self.dataflow.is_sdf:
+                return self.dataflow.get_prod_rate(self.dataflow.get_arc_list(source=task)[0])
+            return self.dataflow.get_prod_rate_sum(self.dataflow.get_arc_list(source=task)[0])
+        except IndexError:
+            if self.dataflow.is_sdf:
+                return self.dataflow.get_cons_rate(self.dataflow.get_arc_list(target=task)[0])
+            return self.dataflow.get_cons_rate_sum(self.dataflow.get_arc_list(target=task)[0])
+
+    # The lower bound of K: an execution of each task (phase) lasts at most K.z(task).
+    def __get_kmin(self):
+        kmin = 0.0
         for task in self.dataflow.get_task_list():
+            z = self.__get_rate(task)
             if self.dataflow.is_sdf:
-                l = self.dataflow.get_task_duration(task)
-                try:
-                    z = self.dataflow.get_prod_rate(self.dataflow.get_arc_list(source=task)[0])
-                except IndexError:
-                    z = self.dataflow.get_cons_rate(self.dataflow.get_arc_list(target=task)[0])
-                kmin = max(kmin, float(l) / float(z))
+                kmin = max(kmin, float(self.dataflow.get_task_duration(task)) / float(z))
             else:
-                try:
-                    z = sum(self.dataflow.get_prod_rate_list(self.dataflow.get_arc_list(source=task)[0]))
-                except IndexError:
-                    z = sum(self.dataflow.get_cons_rate_list(self.dataflow.get_arc_list(target=task)[0]))
                 for duration in self.dataflow.get_phase_duration_list(task):
                     kmin = max(kmin, float(duration) / float(z))
+        return kmin
 
-        glp_set_col_name(self.prob, col, name)
-        glp_set_col_bnds(self.prob, col, GLP_LO, kmin, 0.0)
-        glp_set_obj_coef(self.prob, col, 1.0)
-        self.K = col
+    def __add_col_k(self):
+        self.K = self.lp.add_col(lower_bound=self.__get_kmin(), objective=1.0, name="N")
 
     # Add a variable start
-    def __add_col_start(self, col, name, task):
-        glp_set_col_name(self.prob, col, name)
-        glp_set_col_bnds(self.prob, col, GLP_LO, 0.0, 0.0)
-        self.col_start[task] = col
-
-    # Add a constraint:
-    def __add_main_row(self, row, source, target, n_coef, lti):
-        self.var_row[self.k] = row
-        self.var_col[self.k] = self.col_start[target]
-        self.var_coef[self.k] = 1.0
-        self.k += 1
-
-        self.var_row[self.k] = row
-        self.var_col[self.k] = self.col_start[source]
-        self.var_coef[self.k] = -1.0
-        self.k += 1
-
-        self.var_row[self.k] = row
-        self.var_col[self.k] = self.K
-        self.var_coef[self.k] = float(-n_coef)
-        self.k += 1
-
-        glp_set_row_bnds(self.prob, row, GLP_LO, lti, 0.0)
+    def __add_col_start(self, task):
         if self.dataflow.is_sdf:
-            glp_set_row_name(self.prob, row, "c" + "_T" + str(source) + "" + "_T" + str(target))
-        if self.dataflow.is_csdf:
-            ts, ps = source
-            tt, pt = target
-            glp_set_row_name(self.prob, row, "c" + "_T" + str(ts) + "|" + str(ps) + "" + "_T" + str(tt) + "|" + str(pt))
+            name = "T" + str(task)
+        else:
+            name = "T" + str(task[0]) + "|" + str(task[1])
+        self.col_start[task] = self.lp.add_col(name=name)
+
+    # Add the rows s(tj) - s(ti) - N(Zj - M0(p) - gcdij) >= l(ti) of the arcs of a SDF.
+    def __add_sdf_rows(self, builder):
+        cols = []
+        coefs = []
+        durations = []
+        for arc in self.dataflow.get_arc_list():
+            rows = self.arc_rows[arc] = {}
+            for source, target, coef, duration in self.__arc_constraints(arc):
+                cols.append((self.col_start[target], self.col_start[source], self.K))
+                coefs.append((1.0, -1.0, float(-coef)))
+                durations.append(duration)
+                rows[(source, target)] = len(durations)
+        names = None
+        if self.lp_filename is not None:
+            names = ["c" + "_T" + str(source) + "" + "_T" + str(target)
+                     for arc in self.dataflow.get_arc_list() for source, target in self.arc_rows[arc]]
+        builder.add_rows(numpy.array(cols, dtype=numpy.int_).reshape((-1, 3)), numpy.array(coefs).reshape((-1, 3)),
+                         durations, names=names)
+
+    # Add the rows s(tjkj) - s(tiki) - N(amax) >= l(tik) of the pairs of phases of an arc whose constraint is active,
+    # in the order of the pairs. Return the number of pairs pruned (inactive).
+    def __add_arc_rows(self, builder, arc):
+        source = self.dataflow.get_source(arc)
+        target = self.dataflow.get_target(arc)
+        source_phases, target_phases, amax, pair_count = self.__compute_active_pairs(arc)
+
+        cols = numpy.empty((len(source_phases), 3), dtype=numpy.int_)
+        cols[:, 0] = self.col_start[(target, 0)] + target_phases
+        cols[:, 1] = self.col_start[(source, 0)] + source_phases
+        cols[:, 2] = self.K
+        coefs = numpy.empty((len(source_phases), 3))
+        coefs[:, 0] = 1.0
+        coefs[:, 1] = -1.0
+        coefs[:, 2] = -amax
+        durations = numpy.asarray(self.dataflow.get_phase_duration_list(source), dtype=numpy.float64)[source_phases]
+
+        names = None
+        pairs = None
+        if self.lp_filename is not None or self.persistent:
+            pairs = [((source, i), (target, j)) for i, j in izip(source_phases.tolist(), target_phases.tolist())]
+        if self.lp_filename is not None:
+            names = ["c" + "_T" + str(source) + "|" + str(i) + "" + "_T" + str(target) + "|" + str(j)
+                     for (_, i), (_, j) in pairs]
+        first_row = builder.add_rows(cols, coefs, durations, names=names)
+        if self.persistent:
+            self.arc_rows[arc] = dict((pair, row) for row, pair in enumerate(pairs, first_row))
+        return pair_count - len(source_phases)
 
     # Constraint only for CSDF, the start of a phase is only after the first phase finished is job !
-    def __add_non_overlap_row(self, row, task, phase_bef, phase):
-        self.var_row[self.k] = row
-        self.var_col[self.k] = self.col_start[(task, phase)]
-        self.var_coef[self.k] = 1.0
-        self.k += 1
-
-        self.var_row[self.k] = row
-        self.var_col[self.k] = self.col_start[(task, phase_bef)]
-        self.var_coef[self.k] = -1.0
-        self.k += 1
-
-        if phase == 0:
-            try:
-                if self.dataflow.is_sdf:
-                    z = self.dataflow.get_prod_rate(self.dataflow.get_arc_list(source=task)[0])
-                else:
-                    z = sum(self.dataflow.get_prod_rate_list(self.dataflow.get_arc_list(source=task)[0]))
-            except IndexError:
-                if self.dataflow.is_sdf:
-                    z = self.dataflow.get_cons_rate(self.dataflow.get_arc_list(target=task)[0])
-                else:
-                    z = sum(self.dataflow.get_cons_rate_list(self.dataflow.get_arc_list(target=task)[0]))
-            self.var_row[self.k] = row
-            self.var_col[self.k] = self.K
-            self.var_coef[self.k] = z
-            self.k += 1
-
-        ltprk = self.dataflow.get_phase_duration_list(task)[phase_bef]
-        glp_set_row_bnds(self.prob, row, GLP_LO, ltprk, 0.0)
-        glp_set_row_name(self.prob, row, "c" + "_T" + str(task) + "|" + str(phase_bef) + "|" + str(phase))
-
-    def __compute_amin(self, arc, s_phase, t_phase):  # Only for CSDF
-        s1 = sum(self.dataflow.get_prod_rate_list(arc))
-        s2 = sum(self.dataflow.get_cons_rate_list(arc))
-        gcd_v = gcd(s1, s2)
-
-        m0 = self.dataflow.get_initial_marking(arc)
-        ha = max(0, self.dataflow.get_prod_rate_list(arc)[s_phase] - self.dataflow.get_cons_rate_list(arc)[t_phase])
-
-        pjk = sum(self.dataflow.get_prod_rate_list(arc)[:s_phase + 1])
-        cjk = sum(self.dataflow.get_cons_rate_list(arc)[:t_phase + 1])
-
-        amin = ha + cjk - pjk - m0
-        if not amin % gcd_v == 0:
-            amin += (gcd_v - abs(amin % gcd_v))
-        return amin
-
-    def __compute_amax(self, arc, s_phase, t_phase):  # Only for CSDF
-        s1 = sum(self.dataflow.get_prod_rate_list(arc))
-        s2 = sum(self.dataflow.get_cons_rate_list(arc))
-        gcd_v = gcd(s1, s2)
+    # The rows of a task: s(tk0) - s(tkn-1) + N.z(tk) >= l(tkn-1) then s(tkp+1) - s(tkp) >= l(tkp).
+    def __add_non_overlap_rows(self, builder, task):
+        phase_count = self.dataflow.get_phase_count(task)
+        durations = self.dataflow.get_phase_duration_list(task)
+        phases = numpy.arange(phase_count)
+        phases_bef = numpy.roll(phases, 1)
+
+        col_start = self.col_start[(task, 0)]
+        cols = numpy.empty((phase_count, 3), dtype=numpy.int_)
+        cols[:, 0] = col_start + phases
+        cols[:, 1] = col_start + phases_bef
+        cols[:, 2] = self.K
+        coefs = numpy.zeros((phase_count, 3))
+        coefs[:, 0] = 1.0
+        coefs[:, 1] = -1.0
+        coefs[0, 2] = self.__get_rate(task)
+
+        names = None
+        if self.lp_filename is not None:
+            names = ["c" + "_T" + str(task) + "|" + str(phase_bef) + "|" + str(phase)
+                     for phase_bef, phase in izip(phases_bef.tolist(), phases.tolist())]
+        builder.add_rows(cols, coefs, [durations[-1]] + list(durations[:-1]), names=names)
 
+    def __set_row_name(self, row, source, target):
+        if self.dataflow.is_sdf:
+            glpk.glp_set_row_name(self.prob, row, "c" + "_T" + str(source) + "" + "_T" + str(target))
+        if self.dataflow.is_csdf:
+            ts, ps = source
+            tt, pt = target
+            glpk.glp_set_row_name(self.prob, row,
+                                  "c" + "_T" + str(ts) + "|" + str(ps) + "" + "_T" + str(tt) + "|" + str(pt))
+
+    # The pairs of phases (i, j) of an arc (only for CSDF) whose constraint s(tj) - s(ti) >= l(ti) + N.amax[i, j] is
+    # active (amin[i, j] <= amax[i, j] where amin and amax are rounded up (resp. down) to the gcd), as the arrays
+    # (source phases, target phases, amax) sorted by pair, and the number of candidate pairs
+    # (only the pairs i < j of a reentrant arc).
+    # A pair is active iff a token y = a + M0 + Ppr(i) (a multiple of the gcd) is consumed by the phase j:
+    # max(Cpr(j), C(j) - P(i) + Ppr(i)) <= y < C(j). For a source phase, the tokens y have the same remainder
+    # modulo the gcd and each one is consumed by one phase j (found in the cumulative consumptions), so when the
+    # gcd is large there are fewer tokens y than pairs and only the pairs of these tokens are checked.
+    def __compute_active_pairs(self, arc):
+        prod_prefix = numpy.array(self.dataflow.get_prod_rate_prefix_sum(arc))
+        cons_prefix = numpy.array(self.dataflow.get_cons_rate_prefix_sum(arc))
+        gcd_v = self.dataflow.get_rate_sum_gcd(arc)
         m0 = self.dataflow.get_initial_marking(arc)
+        source_count = len(prod_prefix) - 1
+        target_count = len(cons_prefix) - 1
+        token_count = (cons_prefix[-1] + gcd_v - 1) // gcd_v  # tokens y of a source phase
+
+        if token_count < target_count:
+            tokens = (m0 + prod_prefix[:-1, numpy.newaxis]) % gcd_v + gcd_v * numpy.arange(token_count)
+            target_phases = numpy.searchsorted(cons_prefix[1:], tokens, side="right")  # target_count: no phase
+            # the tokens of a phase j are consecutive, if one of them is in the bounds so is the last one
+            active = target_phases < target_count
+            active[:, :-1] &= target_phases[:, :-1] != target_phases[:, 1:]
+            rates = prod_prefix[1:] - prod_prefix[:-1]
+            consumed = cons_prefix[numpy.minimum(target_phases + 1, target_count)]
+            active &= consumed - rates[:, numpy.newaxis] <= tokens
+            source_phases = numpy.nonzero(active)[0]
+            target_phases = target_phases[active]
+        else:
+            pprjk = prod_prefix[:-1, numpy.newaxis]
+            pjk = prod_prefix[1:, numpy.newaxis]
+            cprjk = cons_prefix[numpy.newaxis, :-1]
+            cjk = cons_prefix[numpy.newaxis, 1:]
+            ha = numpy.maximum(0, (pjk - pprjk) - (cjk - cprjk))
+            amin = ha + cjk - pjk - m0
+            remainder = amin % gcd_v
+            amin += numpy.where(remainder != 0, gcd_v - remainder, 0)
+            amax = cjk - pprjk - m0 - 1
+            amax -= amax % gcd_v
+            source_phases, target_phases = numpy.nonzero(amin <= amax)
+
+        pair_count = source_count * target_count
+        if self.dataflow.is_arc_reentrant(arc):
+            pair_count = source_count * (source_count - 1) // 2
+            upper = source_phases < target_phases
+            source_phases, target_phases = source_phases[upper], target_phases[upper]
+        amax = cons_prefix[target_phases + 1] - prod_prefix[source_phases] - m0 - 1
+        amax -= amax % gcd_v
+        return source_phases, target_phases, amax, pair_count
+
+
+class PeriodAnalyzer:
+    """
+    Compute the period of the 1-periodic schedule of a dataflow again and again while its initial markings change
+    (e.g. to size its buffers): the dataflow is normalized once and the LP is kept with the basis of its last solve
+    (see ComputePeriod persistent), each computation only updates the rows of the arcs whose initial marking
+    changed and starts the dual simplex from the last basis.
 
-        pprjk = sum(self.dataflow.get_prod_rate_list(arc)[:s_phase])
-        cjk = sum(self.dataflow.get_cons_rate_list(arc)[:t_phase + 1])
+    The tasks, the arcs, the rates and the durations of the dataflow must not change.
+    The LP is freed by close().
+    """
 
-        amax = cjk - pprjk - m0 - 1
-        amax -= abs(amax % gcd_v)
-        return amax
+    def __init__(self, dataflow, verbose=False):
+        self.dataflow = dataflow
+        normalized_dataflow = dataflow.copy()
+        coef_vector = normalized_dataflow.normalized()  # the coefficients to un-normalize it, None if it is normalized
+        self.__coefs = {}
+        if coef_vector is not None:
+            for arc, coef in coef_vector.iteritems():
+                self.__coefs[arc] = 1 / coef
+        self.__markings = dict((arc, dataflow.get_initial_marking(arc)) for arc in dataflow.get_arc_list())
+        self.__period = ComputePeriod(normalized_dataflow.freeze(), verbose=verbose, persistent=True)
+
+    def get_period(self, start_time=False):
+        """Return the period of the dataflow with its current initial markings
+        (and the start times of the tasks or of the phases if start_time is True, as CSDF.get_period).
+        """
+        for arc in self.dataflow.get_arc_list():
+            marking = self.dataflow.get_initial_marking(arc)
+            if marking != self.__markings[arc]:
+                self.__markings[arc] = marking
+                if arc in self.__coefs:  # as normalized_dataflow
+                    marking = int(ceil(marking * self.__coefs[arc]))
+                self.__period.update_initial_marking(arc, marking)
+        ret = self.__period.compute_period()
+        if start_time:
+            return ret
+        return ret[0]
+
+    def close(self):
+        """Free the LP.
+        """
+        self.__period.delete()
@@ -1,171 +1,199 @@
-from fractions import Fraction
-import sys
+from collections import deque
 
 from Turbine.calc.lcm import *
 
-sys.setrecursionlimit(10000)  # 10000 is an example, try with different values
+# The fractions of the search are reduced only when their denominator exceeds this value,
+# so that their products stay machine integers
+_REDUCTION_THRESHOLD = 1 << 31
 
 
-def compute_rep_vect(dataflow):
-    fractions = {}
-    for v in dataflow.get_task_list():
-        fractions[v] = Fraction(0, 1)
-
-    rate_period = 1
-
-    for c in dataflow.get_arc_list():
-        if dataflow.is_csdf:
-            rate_period = lcm(rate_period, dataflow.get_phase_count(dataflow.get_source(c)))
-            rate_period = lcm(rate_period, dataflow.get_phase_count(dataflow.get_target(c)))
-
-    if rate_period <= 0:
-        raise ValueError
+class InconsistentDataflowError(ValueError):
+    """The rates of the dataflow admit no repetition vector.
+    cycle is the list of arcs (taken in any direction) whose rates are not balanced.
+    """
 
-    for v in dataflow.get_task_list():
-        if fractions[v] == Fraction(0, 1):
-            fractions[v] = Fraction(1, 1)
-            if not __calc_fractions_connected_actors(dataflow, fractions, v, rate_period):
-                return False
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super(InconsistentDataflowError, self).__init__("The dataflow is not consistent, unbalanced cycle: " +
+                                                        str(cycle))
 
-    repetition_vector = __calc_repetition_vector(dataflow, fractions, rate_period)
 
-    gcd_v = repetition_vector[dataflow.get_task_list()[0]]
-    if dataflow.is_csdf:
-        gcd_v = gcd_v / dataflow.get_phase_count(dataflow.get_task_list()[0])
+def compute_rep_vect(dataflow):
+    """Compute and set the repetition factor of every task.
 
-    for v in dataflow.get_task_list():
-        if dataflow.is_sdf:
-            gcd_v = gcd(gcd_v, repetition_vector[v])
-        if dataflow.is_csdf:
-            gcd_v = gcd(gcd_v, repetition_vector[v] / dataflow.get_phase_count(v))
+    :return : the list of repetition factors (in the order of get_task_list())
+    or False if the graph is not consistent.
+    """
+    try:
+        repetition_vector = __solve(dataflow)
+    except InconsistentDataflowError:
+        return False
 
     rep_fact_list = []
     for v in dataflow.get_task_list():
-        if dataflow.is_sdf:
-            rep_fact = repetition_vector[v] / gcd_v
-        if dataflow.is_csdf:
-            rep_fact = repetition_vector[v] / (dataflow.get_phase_count(v) * gcd_v)
-        dataflow.set_repetition_factor(v, rep_fact)
-        rep_fact_list.append(rep_fact)
+        dataflow.set_repetition_factor(v, repetition_vector[v])
+        rep_fact_list.append(repetition_vector[v])
     return rep_fact_list
 
 
 def check_repetition_vector(dataflow):
-    fractions = {}
-    for v in dataflow.get_task_list():
-        fractions[v] = Fraction(0, 1)
-
-    rate_period = 1
-
-    for c in dataflow.get_arc_list():
-        if dataflow.is_csdf:
-            rate_period = lcm(rate_period, dataflow.get_phase_count(dataflow.get_source(c)))
-            rate_period = lcm(rate_period, dataflow.get_phase_count(dataflow.get_target(c)))
-
-    if rate_period <= 0:
-        raise ValueError
-
-    for v in dataflow.get_task_list():
-        if fractions[v] == Fraction(0, 1):
-            fractions[v] = Fraction(1, 1)
-            if not __calc_fractions_connected_actors(dataflow, fractions, v, rate_period):
-                return False
-
-    repetition_vector = __calc_repetition_vector(dataflow, fractions, rate_period)
-
-    legcd = repetition_vector[dataflow.get_task_list()[0]] / dataflow.get_phase_count(dataflow.get_task_list()[0])
-
-    for v in dataflow.get_task_list():
-        legcd = gcd(legcd, repetition_vector[v] / dataflow.get_phase_count(v))
+    """Print, for every task, the computed repetition factor against the one of the graph.
+    """
+    try:
+        repetition_vector = __solve(dataflow)
+    except InconsistentDataflowError:
+        return False
 
     for v in dataflow.get_task_list():
-        print"%s \t: %d\tx %d \t = %d VS %d" % (dataflow.get_task_name(v),
-                                                repetition_vector[v] / dataflow.get_phase_count(v),
-                                                dataflow.get_phase_count(v), repetition_vector[v],
+        phase_count = 1
+        if dataflow.is_csdf:
+            phase_count = dataflow.get_phase_count(v)
+        print"%s \t: %d\tx %d \t = %d VS %d" % (dataflow.get_task_name(v), repetition_vector[v], phase_count,
+                                                repetition_vector[v] * phase_count,
                                                 dataflow.get_repetition_factor(v)),
-        if (dataflow.get_repetition_factor(v)) != repetition_vector[v] / (dataflow.get_phase_count(v) * legcd):
+        if dataflow.get_repetition_factor(v) != repetition_vector[v]:
             print "error"
         else:
             print "ok"
     return True
 
 
-def __calc_fractions_connected_actors(dataflow, fractions, a, rate_period):
-    """This class is used to compute repetition vector of a graph.
-    """
-
-    fraction_a = fractions[a]
-
-    if fraction_a == Fraction(0, 1):
-        return False
-
-    for c in dataflow.get_arc_list(source=a) + dataflow.get_arc_list(target=a):
-        src = dataflow.get_source(c)
-        dest = dataflow.get_target(c)
-        if src == a:
-            b = dest
-        else:
-            b = src
-
-        if dataflow.is_sdf:
-            rate_a = dataflow.get_prod_rate(c) * rate_period
-            rate_b = dataflow.get_cons_rate(c) * rate_period
-        if dataflow.is_csdf:
-            rate_a = sum(dataflow.get_prod_rate_list(c)) * (rate_period / dataflow.get_phase_count(src))
-            rate_b = sum(dataflow.get_cons_rate_list(c)) * (rate_period / dataflow.get_phase_count(dest))
-
-        if dest == a:
-            tmp = rate_b
-            rate_b = rate_a
-            rate_a = tmp
-        if rate_a == 0 or rate_b == 0:
-            print "rateA == 0 || rateB == 0"
-            return False
+def compute_component_rep_vect(dataflow, task):
+    """Compute the repetition factors of the connected component of a task (the graph is not modified).
 
-        ratio_ab = Fraction(rate_a, rate_b)
-        fraction_b = fraction_a * ratio_ab
+    :return : a dict task -> repetition factor for every task of the component (their gcd is 1).
+    :raise InconsistentDataflowError: with the first unbalanced cycle found.
+    """
+    numerators = {}
+    denominators = {}
+    __solve_component(dataflow, task, numerators, denominators)
+    return __to_integers(numerators, denominators)
 
-        known_fraction_b = fractions[b]
 
-        if known_fraction_b != Fraction(0, 1) and fraction_b != known_fraction_b:
-            return False
+def __solve(dataflow):
+    """:return : a dict task -> repetition factor, the gcd of all repetition factors is 1.
+    The first task of each connected component starts with one execution of each phase (as the
+    first versions of this module did), so that the factors of the components share a common scale.
+    """
+    numerators = {}
+    denominators = {}
+    for v in dataflow.get_task_list():
+        if v not in numerators:
+            __solve_component(dataflow, v, numerators, denominators)
+    return __to_integers(numerators, denominators)
 
-        elif known_fraction_b == Fraction(0, 1):
 
-            fractions[b] = fraction_b
-            __calc_fractions_connected_actors(dataflow, fractions, b, rate_period)
-            if fractions[b] == Fraction(0, 1):
-                return False
+def __solve_component(dataflow, task, numerators, denominators):
+    """Breadth first search from task: every task b reached is given the repetition factor
+    numerators[b] / denominators[b] relatively to the one of task (1 / phase count of task).
+    The fractions are reduced only when their denominator exceeds _REDUCTION_THRESHOLD.
 
-    return True
+    :raise InconsistentDataflowError: with the first unbalanced cycle found.
+    """
+    numerators[task] = 1
+    denominators[task] = 1
+    if dataflow.is_csdf:
+        denominators[task] = dataflow.get_phase_count(task)
+    parent_arc = {task: None}
+    queue = deque([task])
+    while queue:
+        a = queue.popleft()
+        num_a = numerators[a]
+        den_a = denominators[a]
+        for c, a_is_source in __adjacent_arcs(dataflow, a):
+            if dataflow.is_sdf:
+                prod = dataflow.get_prod_rate(c)
+                cons = dataflow.get_cons_rate(c)
+            else:
+                prod = dataflow.get_prod_rate_sum(c)
+                cons = dataflow.get_cons_rate_sum(c)
+            if prod == 0 or cons == 0:
+                raise InconsistentDataflowError([c])
+
+            # Balance equation: repetition_factor(source) * prod == repetition_factor(target) * cons
+            if a_is_source:
+                b = dataflow.get_target(c)
+                num_b = num_a * prod
+                den_b = den_a * cons
+            else:
+                b = dataflow.get_source(c)
+                num_b = num_a * cons
+                den_b = den_a * prod
+
+            if b not in numerators:
+                if den_b > _REDUCTION_THRESHOLD:
+                    gcd_b = gcd(num_b, den_b)
+                    num_b /= gcd_b
+                    den_b /= gcd_b
+                numerators[b] = num_b
+                denominators[b] = den_b
+                parent_arc[b] = c
+                queue.append(b)
+            elif num_b * denominators[b] != numerators[b] * den_b:
+                raise InconsistentDataflowError(__unbalanced_cycle(parent_arc, a, b, c))
+
+
+def __adjacent_arcs(dataflow, task):
+    """Generate (arc, True) for the output arcs of the task then (arc, False) for its input arcs
+    (a reentrant arc is given once in each direction).
+    """
+    for arc in dataflow.get_arc_list(source=task):
+        yield arc, True
+    for arc in dataflow.get_arc_list(target=task):
+        yield arc, False
 
 
-def __calc_repetition_vector(g, fractions, rate_period):
-    repetition_vector = {}
+def __to_integers(numerators, denominators):
+    """:return : the dict task -> smallest integer proportional to numerators[task] / denominators[task].
+    """
     l = 1
+    for den in denominators.itervalues():
+        if l % den != 0:
+            l = lcm(l, den)
+    repetition_vector = {}
+    legcd = 0
+    for v, num in numerators.iteritems():
+        repetition_vector[v] = num * (l / denominators[v])
+        if legcd != 1:
+            legcd = gcd(legcd, repetition_vector[v])
+    for v in repetition_vector:
+        repetition_vector[v] = int(repetition_vector[v] / legcd)  # int when it fits in a machine integer
+    return repetition_vector
 
-    for v in g.get_task_list():
-        l = lcm(l, fractions[v].denominator)
-
-    if l == 0:
-        print("Zero vector ?")
-        raise ValueError
-
-    for v in g.get_task_list():
-        repetition_vector[v] = (fractions[v].numerator * l) / fractions[v].denominator
-
-    legcd = repetition_vector[g.get_task_list()[0]]
-
-    for v in g.get_task_list():
-        legcd = gcd(legcd, repetition_vector[v])
-
-    if legcd <= 0:
-        raise ValueError
-
-    for v in g.get_task_list():
-        repetition_vector[v] = repetition_vector[v] / legcd
-
-    for v in g.get_task_list():
-        repetition_vector[v] = repetition_vector[v] * rate_period
 
-    return repetition_vector
+def __unbalanced_cycle(parent_arc, a, b, arc):
+    """:return : the cycle closed by the arc between a and b in the search tree (parent_arc),
+    as the list of its arcs from the common ancestor of a and b.
+    """
+    path_a = __tree_path(parent_arc, a)
+    path_b = __tree_path(parent_arc, b)
+    tasks_b = set(task for task, _ in path_b)
+    ancestor_arcs = []
+    for task, tree_arc in path_a:
+        if task in tasks_b:
+            ancestor = task
+            break
+        ancestor_arcs.append(tree_arc)
+    cycle = list(reversed(ancestor_arcs))
+    cycle.append(arc)
+    for task, tree_arc in path_b:
+        if task == ancestor:
+            break
+        cycle.append(tree_arc)
+    return cycle
+
+
+def __tree_path(parent_arc, task):
+    """:return : the list of (task, arc to its parent) from task to the root of the search tree.
+    """
+    path = []
+    while task is not None:
+        arc = parent_arc[task]
+        path.append((task, arc))
+        if arc is None:
+            task = None
+        elif arc[1] == task:
+            task = arc[0]
+        else:
+            task = arc[1]
+    return path
@@ -1,21 +1,27 @@
 import logging
 
-try:
-    from swiglpk import *
-except ImportError:
-    from glpk import *
+import numpy
+
+from Turbine.algorithms.lp_backend import INFINITY, LinearProgram, get_backend
 
 
 class SolverSC1Kc:
     """Solve the initial marking under maximal period constraint. The period constraint is an upper bound.
     
     Small value of the period may not work.
+    The LP is solved by the backend lp_backend (see lp_backend.get_backend), if mip is True the markings are
+    integer.
+    If bound_pairs is True the constraints of the pairs of phases of an arc are replaced by bounds when there are
+    fewer rows (see SolverSC1).
     """
 
-    def __init__(self, dataflow, period, verbose, lp_filename):
+    def __init__(self, dataflow, period, verbose, lp_filename, lp_backend=None, mip=False, bound_pairs=False):
         self.dataflow = dataflow
         self.verbose = verbose
         self.lp_filename = lp_filename
+        self.backend = get_backend(lp_backend, verbose)
+        self.mip = mip
+        self.bound_pairs = bound_pairs
 
         f_task = self.dataflow.get_task_list()[0]
         rep_v = self.dataflow.get_repetition_factor(f_task)
@@ -29,37 +35,23 @@ class SolverSC1Kc:
                 z = self.dataflow.get_cons_rate(self.dataflow.get_arc_list(target=f_task)[0])
             else:
                 z = sum(self.dataflow.get_cons_rate_list(self.dataflow.get_arc_list(target=f_task)[0]))
-        self.K = period / z / rep_v
+        self.K = float(period) / z / rep_v
         self.colV = {}  # dict use for storing gamma's variable column
         self.col_m0 = {}  # dict use for storing bds's variable column
         self.col_fm0 = {}  # dict use for storing FM0's variable column
+        self.col_bounds = {}  # arc -> columns (prod bound, cons bound) of the arcs whose pairs of phases are bounded
 
     def compute_initial_marking(self):
         self.__init_prob()  # Modify parameters
         self.__create_col()  # Add Col on prob
         self.__create_row()  # Add Row (constraint) on prob
         self.__solve_prob()  # Launch the solver and set preload of the graph
-        glp_delete_prob(self.prob)
-        glp_free_env()
-        del self.prob  # Del prob
+        del self.lp  # Del prob
         return self.Z  # Return the total amount find by the solver
 
     def __init_prob(self):  # Modify parameters
         logging.info("Generating initial marking problem")
-        self.prob = glp_create_prob()
-        glp_set_prob_name(self.prob, "min_preload")
-        glp_set_obj_dir(self.prob, GLP_MIN)
-
-        # GLPK parameters:
-        self.glpk_param = glp_smcp()
-        glp_init_smcp(self.glpk_param)  # Do it before modify parameters
-
-        self.glpk_param.presolve = GLP_ON
-        self.glpk_param.msg_lev = GLP_MSG_ALL
-        if not self.verbose:
-            self.glpk_param.msg_lev = GLP_MSG_OFF
-        self.glpk_param.meth = GLP_DUALP
-        self.glpk_param.out_frq = 2000  # consol print frequency
+        self.lp = LinearProgram("min_preload", dual=True, names=self.lp_filename is not None)
 
     def __create_col(self):  # Add Col on prob
         # Counting column
@@ -75,19 +67,13 @@ class SolverSC1Kc:
         col_count = tot_phase_count + self.dataflow.get_arc_count() * 2
         logging.info("Number of column: " + str(col_count))
 
-        # Create column
-        glp_add_cols(self.prob, col_count)
-
-        col = 1
         # Create column bds (M0)
         for arc in self.dataflow.get_arc_list():
-            self.__add_col_m0(col, "M0" + str(arc), arc)
-            col += 1
+            self.__add_col_m0("M0" + str(arc), arc)
 
         # Create column bds (FM0)
         for arc in self.dataflow.get_arc_list():
-            self.__add_col_fm0(col, "FM0" + str(arc), arc)
-            col += 1
+            self.__add_col_fm0("FM0" + str(arc), arc)
 
         # Create column lambda (v)
         for task in self.dataflow.get_task_list():
@@ -99,123 +85,59 @@ class SolverSC1Kc:
             if self.dataflow.is_pcg:
                 phase_count += self.dataflow.get_ini_phase_count(task)
             for i in xrange(phase_count):
-                self.__add_col_v(col, str(task) + "/" + str(i))
-                col += 1
+                self.__add_col_v(str(task) + "/" + str(i))
 
-    def __create_row(self):  # Add Row (constraint) on prob
-        # Counting row
-        f_row_count = self.dataflow.get_arc_count()
-        for arc in self.dataflow.get_arc_list():
-            if self.dataflow.is_arc_reentrant(arc):
-                f_row_count -= 1
-
-        row_count = 0
+        # Create column of the cumulative bounds (see __add_arc_rows)
         for arc in self.dataflow.get_arc_list():
-            source = self.dataflow.get_source(arc)
-            target = self.dataflow.get_target(arc)
-            if not self.dataflow.is_arc_reentrant(arc):
-                if self.dataflow.is_sdf:
-                    row_count += 1
-                if self.dataflow.is_csdf and not self.dataflow.is_pcg:
-                    row_count += self.dataflow.get_phase_count(source) * self.dataflow.get_phase_count(target)
-                if self.dataflow.is_pcg:
-                    source_phase_count = self.dataflow.get_phase_count(source) \
-                        + self.dataflow.get_ini_phase_count(source)
-                    target_phase_count = self.dataflow.get_phase_count(target) \
-                        + self.dataflow.get_ini_phase_count(target)
-                    row_count += source_phase_count * target_phase_count
+            if not self.dataflow.is_arc_reentrant(arc) and self.__is_arc_bounded(arc):
+                self.__add_col_bounds(arc)
 
-        # Create row
-        logging.info("Number of rows: " + str(row_count + f_row_count))
-        glp_add_rows(self.prob, row_count + f_row_count)
-
-        self.var_array_size = row_count * 3 + f_row_count * 2 + 1
-        logging.info("Var array size: " + str(self.var_array_size))
-        self.var_row = intArray(self.var_array_size)
-        self.var_col = intArray(self.var_array_size)
-        self.var_coef = doubleArray(self.var_array_size)
-
-        # BEGIN FILL ROW
-        self.k = 1
-        row = 1
+    def __create_row(self):  # Add Row (constraint) on prob
+        builder = self.lp.rows
         ########################################################################
         #                       Constraint FM0*step - M0 = 0                   #
         ########################################################################
-        for arc in self.dataflow.get_arc_list():
-            if not self.dataflow.is_arc_reentrant(arc):
-                step = self.dataflow.get_gcd(arc)
-                self.__add_frow(row, arc, step)
-                row += 1
+        arcs = [arc for arc in self.dataflow.get_arc_list() if not self.dataflow.is_arc_reentrant(arc)]
+        names = None
+        if self.lp_filename is not None:
+            names = ["step" + str(arc) for arc in arcs]
+        builder.add_rows([(self.col_fm0[arc], self.col_m0[arc]) for arc in arcs],
+                         [(float(self.dataflow.get_gcd(arc)), -1.0) for arc in arcs],
+                         0.0, 0.0, names=names)
 
         ########################################################################
         #                       Constraint u-u'+M0 >= W1+1                     #
         ########################################################################
-        for arc in self.dataflow.get_arc_list():
-            source = self.dataflow.get_source(arc)
-            target = self.dataflow.get_target(arc)
-            if not self.dataflow.is_arc_reentrant(arc):
-                range_source = self.__get_range_phases(source)
-                range_target = self.__get_range_phases(target)
-                prod_list = self.__get_prod_rate_list(arc)
-                cons_list = self.__get_cons_rate_list(arc)
-                if self.dataflow.is_pcg:
-                    threshold_list = self.__get_threshold_list(arc)
-                step = self.dataflow.get_gcd(arc)
+        pruned_count = 0
+        for arc in arcs:
+            pruned_count += self.__add_arc_rows(builder, arc)
 
-                pred_prod = 0
-                for source_phase in xrange(range_source):  # source/prod/out
-                    if source_phase > 0:
-                        pred_prod += prod_list[source_phase - 1]
-
-                    pred_cons = 0
-                    cons = 0
-                    for target_phase in xrange(range_target):  # target/cons/in
-                        cons += cons_list[target_phase]
-                        if target_phase > 0:
-                            pred_cons += cons_list[target_phase - 1]
-
-                        w = cons - pred_prod - step
-                        if self.dataflow.is_pcg:
-                            w += pred_cons + threshold_list[target_phase] - cons
-                        w *= self.K
-                        if self.dataflow.is_sdf:
-                            w += self.dataflow.get_task_duration(source)
-                        elif self.dataflow.is_csdf:
-                            w += self.dataflow.get_phase_duration_list(source)[source_phase]
-                        str_v1 = str(source) + "/" + str(source_phase)
-                        str_v2 = str(target) + "/" + str(target_phase)
-
-                        self.__add_row(row, str_v1, str_v2, arc, w)
-                        row += 1
-                        # END FILL ROW
+        # Create row
+        logging.info("Number of rows: " + str(builder.row_count))
+        logging.info("Number of rows of pairs of phases pruned: " + str(pruned_count))
+        logging.info("Var array size: " + str(builder.get_entry_count() + 1))
 
     def __solve_prob(self):  # Launch the solver and set preload/initial marking of the graph
-        logging.info("loading matrix ...")
-        glp_load_matrix(self.prob, self.var_array_size - 1, self.var_row, self.var_col, self.var_coef)
-
-        if self.lp_filename is not None:
-            problem_location = str(glp_write_lp(self.prob, None, self.lp_filename))
-            logging.info("Writing problem: " + str(problem_location))
-
-        logging.info("solving problem ...")
-        ret = glp_simplex(self.prob, self.glpk_param)
-        logging.info("Solver return: " + str(ret))
+        solution = self.backend.solve(self.lp, mip=self.mip, lp_filename=self.lp_filename)
+        logging.info("Solution " + solution.status + " (" + self.backend.name + ")")
+        if not solution.is_optimal():
+            raise RuntimeError("solver did not found solution")
 
         if logging.getLogger().getEffectiveLevel() == logging.DEBUG:
             for arc in self.dataflow.get_arc_list():
-                logging.debug(str(arc) + " M0: " + str(glp_get_col_prim(self.prob, self.col_m0[arc])) + " FM0: " +
-                              str(glp_get_col_prim(self.prob, self.col_fm0[arc])))
+                logging.debug(str(arc) + " M0: " + str(solution.get_value(self.col_m0[arc])) + " FM0: " +
+                              str(solution.get_value(self.col_fm0[arc])))
             for arc in self.dataflow.get_arc_list():
                 source = self.dataflow.get_source(arc)
                 target = self.dataflow.get_target(arc)
                 for phase_s in xrange(self.__get_range_phases(source)):
                     for phase_t in xrange(self.__get_range_phases(target)):
                         logging.debug(str(arc) + " V" + str(source) + "/" + str(phase_s) + ": " +
-                                      str(glp_get_col_prim(self.prob, self.colV[str(source) + "/" + str(phase_s)])) +
+                                      str(solution.get_value(self.colV[str(source) + "/" + str(phase_s)])) +
                                       " V" + str(target) + "/" + str(phase_t) + ": " +
-                                      str(glp_get_col_prim(self.prob, self.colV[str(target) + "/" + str(phase_t)])))
+                                      str(solution.get_value(self.colV[str(target) + "/" + str(phase_t)])))
 
-        self.Z = glp_get_obj_val(self.prob)
+        self.Z = solution.objective
 
         opt_buffer = True
         buf_rev_tot = 0
@@ -223,8 +145,10 @@ class SolverSC1Kc:
         # Revision of the final bds (in case of non integer variable)
         for arc in self.dataflow.get_arc_list():
             if not self.dataflow.is_arc_reentrant(arc):
-                buf = glp_get_col_prim(self.prob, self.col_m0[arc])
-                fm0 = glp_get_col_prim(self.prob, self.col_fm0[arc])
+                buf = solution.get_value(self.col_m0[arc])
+                fm0 = solution.get_value(self.col_fm0[arc])
+                if self.mip:
+                    buf, fm0 = round(buf), round(fm0)
                 step = self.dataflow.get_gcd(arc)
 
                 if fm0 % 1 == 0:
@@ -243,62 +167,95 @@ class SolverSC1Kc:
             logging.info("Solution SC1 Not Optimal:-(")
 
     # Add a variable lamda
-    def __add_col_v(self, col, name):
-        glp_set_col_name(self.prob, col, name)
-        glp_set_col_bnds(self.prob, col, GLP_FR, 0, 0)
-        glp_set_obj_coef(self.prob, col, 0.0)
-        self.colV[name] = col
+    def __add_col_v(self, name):
+        self.colV[name] = self.lp.add_col(lower_bound=-INFINITY, name=name)
 
     # Add a variable M0
-    def __add_col_m0(self, col, name, arc):
-        glp_set_col_name(self.prob, col, name)
-        glp_set_col_bnds(self.prob, col, GLP_LO, 0, 0)
-        glp_set_obj_coef(self.prob, col, 1.0)
-        self.col_m0[arc] = col
+    def __add_col_m0(self, name, arc):
+        self.col_m0[arc] = self.lp.add_col(objective=1.0, integer=self.mip, name=name)
 
     # Add a variable FM0
-    def __add_col_fm0(self, col, name, arc):
-        glp_set_col_kind(self.prob, col, GLP_IV)
-        glp_set_col_name(self.prob, col, name)
-        glp_set_col_bnds(self.prob, col, GLP_LO, 0, 0)
-        glp_set_obj_coef(self.prob, col, 0.0)
-        self.col_fm0[arc] = col
-
-    # Add a constraint: lambda1 - lambda2 + M0 > W1
-    def __add_row(self, row, str_v1, str_v2, arc, w):
-        if self.dataflow.get_source(arc) != self.dataflow.get_target(arc):
-            self.var_row[self.k] = row
-            self.var_col[self.k] = self.colV[str_v1]
-            self.var_coef[self.k] = 1.0
-            self.k += 1
-
-            self.var_row[self.k] = row
-            self.var_col[self.k] = self.colV[str_v2]
-            self.var_coef[self.k] = -1.0
-            self.k += 1
-
-        self.var_row[self.k] = row
-        self.var_col[self.k] = self.col_m0[arc]
-        self.var_coef[self.k] = self.K
-        self.k += 1
-
-        glp_set_row_bnds(self.prob, row, GLP_LO, w + 1.0, 0.0)  # W1+1 cause there is no strict bound with GLPK
-        glp_set_row_name(self.prob, row, "r_" + str(row))
-
-    # Add a constraint: FM0*step = M0
-    def __add_frow(self, row, arc, step):
-        self.var_row[self.k] = row
-        self.var_col[self.k] = self.col_fm0[arc]
-        self.var_coef[self.k] = float(step)
-        self.k += 1
-
-        self.var_row[self.k] = row
-        self.var_col[self.k] = self.col_m0[arc]
-        self.var_coef[self.k] = -1.0
-        self.k += 1
-
-        glp_set_row_bnds(self.prob, row, GLP_FX, 0.0, 0.0)
-        glp_set_row_name(self.prob, row, "step" + str(arc))
+    def __add_col_fm0(self, name, arc):
+        self.col_fm0[arc] = self.lp.add_col(integer=True, name=name)
+
+    # Add the bounds of the sums lambda + K.Ppr - l of the source phases and lambda + K.C of the target phases of an arc
+    def __add_col_bounds(self, arc):
+        self.col_bounds[arc] = (self.lp.add_col(lower_bound=-INFINITY, name="PMIN" + str(arc)),
+                                self.lp.add_col(lower_bound=-INFINITY, name="CMAX" + str(arc)))
+
+    # True if the constraints of the pairs of phases of an arc are replaced by bounds (see __add_arc_rows):
+    # when bound_pairs is True and there are fewer rows.
+    def __is_arc_bounded(self, arc):
+        if not self.bound_pairs:
+            return False
+        range_source = self.__get_range_phases(self.dataflow.get_source(arc))
+        range_target = self.__get_range_phases(self.dataflow.get_target(arc))
+        return range_source * range_target > range_source + range_target + 1
+
+    # Add the constraints lambda1 - lambda2 + K.M0 > W1 of the pairs of phases of an arc (source phase, target phase):
+    # W1 = K(C(target phase) - Ppr(source phase) - step) + l(source phase)
+    # (with threshold: K(Cpr(target phase) + threshold(target phase) - Ppr(source phase) - step) + l(source phase)).
+    # W1 is a difference of a term of the target phase and a term of the source phase, so if the arc is bounded
+    # the constraints of the pairs are added with the bound columns PMIN <= lambda1 + K.Ppr(source phase) - l,
+    # CMAX >= lambda2 + K.C(target phase), PMIN - CMAX + K.M0 > -K.step: the feasible markings and the optimum are
+    # the same with a row per phase instead of a row per pair of phases (see SolverSC1).
+    # Return the number of rows pruned.
+    def __add_arc_rows(self, builder, arc):
+        source = self.dataflow.get_source(arc)
+        target = self.dataflow.get_target(arc)
+        range_source = self.__get_range_phases(source)
+        range_target = self.__get_range_phases(target)
+        prod_prefix = numpy.cumsum([0] + self.__get_prod_rate_list(arc))
+        cons_prefix = numpy.cumsum([0] + self.__get_cons_rate_list(arc))
+
+        if self.dataflow.is_pcg:
+            cons_w = cons_prefix[:-1] + numpy.array(self.__get_threshold_list(arc))
+        else:
+            cons_w = cons_prefix[1:]
+        durations = 0
+        if self.dataflow.is_sdf:
+            durations = self.dataflow.get_task_duration(source)
+        elif self.dataflow.is_csdf:
+            durations = numpy.array(self.__get_phase_duration_list(source))
+        col_source = self.colV[str(source) + "/0"]
+        col_target = self.colV[str(target) + "/0"]
+
+        if arc in self.col_bounds:
+            col_prod, col_cons = self.col_bounds[arc]
+            names_prod = names_cons = names_arc = None
+            if self.lp_filename is not None:
+                names = ["r_" + str(row) for row in xrange(builder.row_count + 1,
+                                                           builder.row_count + range_source + range_target + 2)]
+                names_prod, names_cons, names_arc = names[:range_source], names[range_source:-1], names[-1:]
+            builder.add_rows([(col_source + i, col_prod) for i in xrange(range_source)], (1.0, -1.0),
+                             durations - prod_prefix[:range_source] * self.K, names=names_prod)
+            builder.add_rows([(col_cons, col_target + j) for j in xrange(range_target)], (1.0, -1.0),
+                             cons_w[:range_target] * self.K, names=names_cons)
+            # W1+1 cause there is no strict bound with GLPK
+            builder.add_rows([(col_prod, col_cons, self.col_m0[arc])], (1.0, -1.0, self.K),
+                             -self.dataflow.get_gcd(arc) * self.K + 1.0, names=names_arc)
+            return range_source * range_target - range_source - range_target - 1
+
+        w = cons_w[numpy.newaxis, :range_target] - prod_prefix[:range_source, numpy.newaxis]
+        w -= self.dataflow.get_gcd(arc)
+        w = w * self.K
+        if self.dataflow.is_sdf:
+            w += durations
+        elif self.dataflow.is_csdf:
+            w += durations[:, numpy.newaxis]
+
+        source_phases, target_phases = numpy.indices((range_source, range_target))
+        cols = numpy.empty((range_source * range_target, 3), dtype=numpy.int_)
+        cols[:, 0] = col_source + source_phases.ravel()
+        cols[:, 1] = col_target + target_phases.ravel()
+        cols[:, 2] = self.col_m0[arc]
+
+        names = None
+        if self.lp_filename is not None:
+            names = ["r_" + str(row) for row in xrange(builder.row_count + 1, builder.row_count + len(cols) + 1)]
+        # W1+1 cause there is no strict bound with GLPK
+        builder.add_rows(cols, (1.0, -1.0, self.K), w.ravel() + 1.0, names=names)
+        return 0
 
     def __get_range_phases(self, task):
         if self.dataflow.is_sdf:
@@ -308,6 +265,12 @@ class SolverSC1Kc:
             range_task += self.dataflow.get_ini_phase_count(task)
         return range_task
 
+    def __get_phase_duration_list(self, task):
+        duration_list = self.dataflow.get_phase_duration_list(task)
+        if self.dataflow.is_pcg:
+            duration_list = self.dataflow.get_ini_phase_duration_list(task) + duration_list
+        return duration_list
+
     def __get_prod_rate_list(self, arc):
         prod_list = None
         if self.dataflow.is_sdf:
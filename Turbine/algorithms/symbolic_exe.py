@@ -1,295 +1,937 @@
+import cPickle
+import heapq
 import logging
+import os
 import time
+from fractions import Fraction
+from itertools import izip
 
 
 class SymbolicExe:
     """
     This class execute the As Soon As Possible Schedule (ASAP) to detect dead-lock.
     It also return the schedule (dict composed of list of start time for each task).
+
+    The execution is event driven: the end times of the running tasks are kept in a heap
+    (with the tasks which end at each time) and, at each step, only the tasks whose input arcs
+    received tokens (or whose phase changed) are tested again.
+
+    The dataflow is compiled once (see __compile) in flat integer tables indexed by the task and arc indexes
+    of its snapshot (FrozenDataflow), the execution only reads these tables.
+
+    A SDF task with an integral duration which has the tokens of many executions starts them in a batch
+    (see batch_min): the start times, the tokens and the dead lock counters are the same as when its
+    executions are started one by one, but only the ends which let a consumer start are steps.
+
+    The arcs can be given a capacity (FIFO of fixed size): a task only starts when the bounded output arcs
+    have room for its production, the room taken is freed by the ends of the consumer. This is the execution
+    of the graph with a back pressure arc for each bounded arc, without adding these arcs.
     """
 
-    def __init__(self, dataflow):
+    def __init__(self, dataflow, capacities=None):
         # Max ratio between Rt execution between two task for the transient phase.
         # This is for detecting dead lock when only a single part of the graph is executed.
         # If only one task is not executed once on another is executed self.__RT_MAX_RATIO.Rt time
         # (Rt is its the repetition factor) then a dead lock is deduced.
         self.__RT_MAX_RATIO = 100000000
+        # A SDF task which can start at least this number of executions in a row starts them at once
+        # (smaller batches cost more than the steps they save).
+        self.batch_min = 64
+        # Stop the execution (without start times) as soon as it reaches a state it has already reached:
+        # the execution repeats from there, the dataflow is live if every task fires in one period.
+        self.detect_regime = False
 
         self.dataflow = dataflow  # The dataflow
+        self.capacities = capacities or {}  # arc -> capacity of the bounded arcs (max number of tokens)
         self.start_time = {}  # The start time of tasks of the asap scheduling
         self.time_tick = 0  # The current time (start at 0)
-        self.currently_executed = []  # True if the task at the rank t is executed false otherwise
-        self.tick_left = {}  # If a task is executed this is the time left until it end its execution
+        self.currently_executed = set()  # The indexes of the tasks currently executed
+        self.end_events = []  # Heap of the end times of the tasks currently executed
+        self.end_tasks = {}  # The indexes of the tasks currently executed which end at each end time
+        self.frozen = None  # The snapshot of the dataflow compiled
+        self.tokens = []  # The current marking of each arc index
+        self.space = []  # The free room of each bounded arc index (capacity - tokens - production of the source)
+        self.phases = []  # The current phase of each task index (initialization phases first for a PCG)
+        self.result = None  # The result of the last execution: 0 if it succeed, -1 if it dead locks
+        self.trace = None  # The recorder of the executions (see execution_trace.ExecutionTrace)
+        self.steps = 0  # The number of steps of the last execution
+        self.saved_steps = 0  # The estimated number of steps that the detection of the periodic regime saved
 
     def get_start_time(self, nb_ite=1):
         return self.execute(get_start_time=True, nb_ite=nb_ite)
 
     # Execute the symbolic execution until the number of iteration reach self.ite
-    def execute(self, get_start_time=False, nb_ite=1):
-        self.__raz()
-        # First we test case of obvious dead lock
-        if self.dataflow.is_cyclic and self.dataflow.get_tot_initial_marking() == 0:
-            return -1
-
+    # If checkpoint is a file name, the state of the execution is saved in this file every checkpoint_interval
+    # seconds, so that an interrupted execution can be continued by resume.
+    def execute(self, get_start_time=False, nb_ite=1, checkpoint=None, checkpoint_interval=600):
+        return self.__execute(get_start_time, nb_ite, None, checkpoint, checkpoint_interval)
+
+    # Continue the execution saved in the file checkpoint (by execute) from its last snapshot,
+    # the snapshot keeps being saved in this file. Return the same result as the interrupted execute.
+    # Raise ValueError if the snapshot was not taken on this dataflow.
+    def resume(self, checkpoint, checkpoint_interval=600):
+        with open(checkpoint, "rb") as open_file:
+            state = cPickle.load(open_file)
+        return self.__execute(state["get_start_time"], state["nb_ite"], state, checkpoint, checkpoint_interval)
+
+    def __execute(self, get_start_time, nb_ite, state, checkpoint, checkpoint_interval):
         # start time of tasks/phase : (key = task, [start_time1, start_time2,...]) for SDF
         #                             (key = (task, phase), [start_time1, start_time2,...]) for CSDF or PCG
-        num_task_exe = [0] * self.dataflow.get_task_count()  # execution number of the task during current step
-        executed_task = [False] * self.dataflow.get_task_count()  # if the task can be executed
+        firings = self.__run(nb_ite, get_start_time, state, checkpoint, checkpoint_interval)
+        for time_tick, t, phase in firings:
+            if self.dataflow.is_sdf:
+                self.start_time[self.frozen.tasks[t]].append(time_tick)
+            if self.dataflow.is_csdf:
+                self.start_time[(self.frozen.tasks[t], phase - self.__first_phases[t])].append(time_tick)
+        if self.result == -1:
+            return -1
+        if get_start_time:
+            return self.start_time
+        return 0  # Exe successful
+
+    # Generate the firings of the same execution as they start, in the order of their start times:
+    # (start time, task, phase, iteration) where phase is 0 for a SDF (the phase of a CSDF, negative for
+    # the initialization phases of a PCG, as in the keys of get_start_time) and iteration is the number
+    # of the graph iteration of the firing (its number of previous firings of this phase // repetition factor).
+    # Nothing is kept: long schedules can be consumed (e.g. by file_parser.start_time_writer) in constant memory.
+    # When the generator is exhausted, self.result is 0 if the execution succeed and -1 if it dead locks.
+    def iter_start_time(self, nb_ite=1):
+        firings = None
+        for time_tick, t, phase in self.__run(nb_ite, True):
+            if firings is None:  # the tables are compiled by the first step of the execution
+                tasks, first_phases, phase_offsets = self.frozen.tasks, self.__first_phases, self.__phase_offsets
+                rep_fact = [self.frozen.get_repetition_factor(task) for task in tasks]
+                firings = [0] * len(self.__durations)  # number of firings of each phase of each task
+            index = phase_offsets[t] + phase
+            yield time_tick, tasks[t], phase - first_phases[t], firings[index] / rep_fact[t]
+            firings[index] += 1
+
+    # Run the symbolic execution, generate (start time, task index, phase) for each firing if record is True,
+    # set self.result to 0 if it succeed and to -1 if it dead locks.
+    # The execution starts from the snapshot state if it is given (see __save_state).
+    def __run(self, nb_ite, record, state=None, checkpoint=None, checkpoint_interval=600):
+        self.__raz()
+        self.result = -1
+        self.steps = self.saved_steps = 0
+        trace = self.trace
+        if trace is not None:
+            trace.begin(self.frozen)
+        if state is not None:
+            if state["graph"] != self.__fingerprint():
+                raise ValueError("The checkpoint was not saved for the dataflow " + str(self.dataflow.get_name()))
+            self.time_tick, self.arcExe = state["time_tick"], state["arcExe"]
+            self.tokens, self.phases, self.space = state["tokens"], state["phases"], state["space"]
+            self.currently_executed.update(state["currently_executed"])
+            self.end_events.extend(state["end_events"])
+            self.end_tasks.update(state["end_tasks"])
+            if record:
+                self.start_time = state["start_time"]
+        # First we test case of obvious dead lock
+        elif self.dataflow.is_cyclic and self.dataflow.get_tot_initial_marking() == 0:
+            if trace is not None:
+                trace.dead_lock(self.time_tick, self.tokens, range(len(self.frozen.tasks)))
+            return
+
+        tasks = self.frozen.tasks
+        task_count = len(tasks)
+        tokens = self.tokens
+        phases = self.phases
+        in_offsets, in_arcs = self.__in_offsets, self.__in_arcs
+        out_offsets, out_arcs = self.__out_offsets, self.__out_arcs
+        arc_source, arc_target = self.frozen.arc_source, self.frozen.arc_target
+        cons_offsets, cons, needs = self.__cons_offsets, self.__cons, self.__needs
+        prod_offsets, prods = self.__prod_offsets, self.__prods
+        phase_offsets, durations = self.__phase_offsets, self.__durations
+        first_phases, phase_ends = self.__first_phases, self.__phase_ends
+        end_events = self.end_events
+        end_tasks = self.end_tasks
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        currently_executed = self.currently_executed
+        space = self.space
+        bounded_in_offsets, bounded_in_arcs = self.__bounded_in_offsets, self.__bounded_in_arcs
+        bounded_out_offsets, bounded_out_arcs = self.__bounded_out_offsets, self.__bounded_out_arcs
+
+        num_task_exe = [0] * task_count  # execution number of the task during current step
+        rep_fact = [self.frozen.get_repetition_factor(task) for task in tasks]
+        # number of execution of the task needed by the step one
+        step_one_exe = [phase_ends[t] - phase_offsets[t] for t in xrange(task_count)]
+        phase_count = [float(phase_ends[t] - phase_offsets[t] - first_phases[t]) for t in xrange(task_count)]
+        step_two_exe = [float(rep_fact[t]) * nb_ite for t in xrange(task_count)]  # number of iterations of step two
+
+        # Number of tasks for each value of num_task_exe[t] / rep_fact[t], for the dead lock ratio.
+        rt_exe_count = {0: task_count}
+        # [number of task which has enough execution for the current step, min and max of the rt_exe_count keys]
+        progress = [0, 0, 0]
+
+        def count_executions(t, count):  # The task t starts count more executions
+            rt_exe = num_task_exe[t] / rep_fact[t]
+            num_task_exe[t] += count  # Increase the number of exe of this task
+            if step_two:
+                if float(num_task_exe[t]) / phase_count[t] == step_two_exe[t]:
+                    progress[0] += 1
+            elif num_task_exe[t] - count < step_one_exe[t] <= num_task_exe[t]:
+                progress[0] += 1
+            if num_task_exe[t] / rep_fact[t] != rt_exe:
+                rt_exe_count[rt_exe] -= 1
+                rt_exe = num_task_exe[t] / rep_fact[t]
+                rt_exe_count[rt_exe] = rt_exe_count.get(rt_exe, 0) + 1
+                progress[2] = max(progress[2], rt_exe)
+                while not rt_exe_count.get(progress[1]):
+                    progress[1] += 1
+
+        # A SDF task which has the tokens of k executions starts them all at once (a batch):
+        # its next executions start at the end of the previous ones without being tested again.
+        # Only the ends which allow a consumer to start are steps of the execution (see wake).
+        batching = self.dataflow.is_sdf and not self.__bounded_arcs  # the batches do not wait for room
+        batches = {}  # task index -> [first start, duration, number of executions, started, ended]
+        wake_tasks = {}  # time -> the tasks which are tested again at this time
+        check_times = set()  # the last starts of the batches, the end of the execution may be reached there
+        event_times = set()  # the times in end_events
+        start_heap, start_buckets = [], {}  # heap of the next start times of the batches, time -> task indexes
+        end_heap, end_buckets = [], {}  # heap of the next end times of the batches, time -> task indexes
+
+        def push_event(event_time):
+            if event_time not in event_times:
+                event_times.add(event_time)
+                heapq.heappush(end_events, event_time)
+
+        def wake(a):  # Test the target of the arc a again when the batch of its source fills it
+            first, duration, count, _, ended = batches[arc_source[a]]
+            missing = needs[cons_offsets[a] + phases[arc_target[a]]] - tokens[a]
+            produced = prods[prod_offsets[a]]
+            if missing > 0 and produced > 0:
+                end = ended + (missing + produced - 1) // produced
+                if end < count:  # the last end of the batch is an end event
+                    wake_time = first + end * duration
+                    wake_tasks.setdefault(wake_time, []).append(arc_target[a])
+                    push_event(wake_time)
+
+        def schedule(heap, buckets, event_time, t):  # Add the task t in the bucket of the time event_time
+            if event_time in buckets:
+                buckets[event_time].append(t)
+            else:
+                buckets[event_time] = [t]
+                heapq.heappush(heap, event_time)
+
+        def start_batches(until, strict):  # Start the executions of the batches which start before until
+            started_ranges = []  # (first start, duration, first execution, last execution, task index) if record
+            while start_heap and (start_heap[0] < until or not strict and start_heap[0] == until):
+                start = heapq.heappop(start_heap)
+                for t in start_buckets.pop(start):
+                    batch = batches.get(t)
+                    if batch is None or batch[3] >= batch[2] or batch[0] + batch[3] * batch[1] != start:
+                        continue  # outdated
+                    first, duration, count, started, _ = batch
+                    last = int((until - first) // duration)
+                    if strict and first + last * duration == until:
+                        last -= 1
+                    last = min(last, count - 1)
+                    if record:
+                        started_ranges.append((first, duration, started, last, t))
+                    if trace is not None:
+                        for j in xrange(started, last + 1):
+                            trace.firing(first + j * duration, t, 0, duration)
+                    count_executions(t, last + 1 - started)
+                    batch[3] = last + 1
+                    if last + 1 < count:
+                        schedule(start_heap, start_buckets, first + (last + 1) * duration, t)
+            return started_ranges
+
+        def end_batches(until):  # End the executions of the batches which end before until
+            while end_heap and end_heap[0] <= until:
+                end = heapq.heappop(end_heap)
+                for t in end_buckets.pop(end):
+                    batch = batches.get(t)
+                    if batch is None or batch[4] >= batch[2] or batch[0] + (batch[4] + 1) * batch[1] != end:
+                        continue  # outdated
+                    first, duration, count, _, ended = batch
+                    last = min(int((until - first) // duration), count)
+                    for a in out_arcs[out_offsets[t]:out_offsets[t + 1]]:
+                        tokens[a] += prods[prod_offsets[a]] * (last - ended)
+                    self.arcExe += (out_offsets[t + 1] - out_offsets[t]) * (last - ended)
+                    batch[4] = last
+                    if last < count:
+                        schedule(end_heap, end_buckets, first + (last + 1) * duration, t)
+
+        def batch_size(t, size):  # Number of executions that the task t can start now, at most size
+            # the batch does not reach the dead lock ratio nor the end of the step two
+            size = min(size, (self.__RT_MAX_RATIO + 1) * max(progress[1], 1) * rep_fact[t] - 1 - num_task_exe[t])
+            if step_two:
+                if step_two_exe[t] != int(step_two_exe[t]):
+                    return 0
+                size = min(size, int(step_two_exe[t]) - num_task_exe[t])
+            if size + 1 < self.batch_min:
+                return 0
+            return size
+
+        def cut_batch(t, size):  # The batch of the task t starts at most size more executions
+            first, duration, count, started, _ = batches[t]
+            if count - started <= size:
+                return
+            for a in in_arcs[in_offsets[t]:in_offsets[t + 1]]:
+                tokens[a] += cons[cons_offsets[a]] * (count - started - size)
+            end_tasks[first + count * duration].remove(t)
+            check_times.discard(first + (count - 1) * duration)
+            count = started + size
+            end_tasks.setdefault(first + count * duration, []).append(t)
+            push_event(first + count * duration)
+            if count > started:
+                check_times.add(first + (count - 1) * duration)
+                push_event(first + (count - 1) * duration)
+            batches[t][2] = count
+
+        # (phases, running tasks) -> [(tokens, room, step, num_task_exe)] of the states of the execution after
+        # the starts of the task 0 in its first periodic phase (see get_throughput), while no task is stopped
+        # by the step two. A state which covers a previous one (as many tokens and room, the same phases and
+        # running tasks) can repeat the executions between them forever: if every task fired, it is live.
+        # If it is the same state and some tasks did not fire, they never fire again.
+        regimes = {} if self.detect_regime and not record and task_count else None
+        ref_phase = first_phases[0] if task_count else 0
+
+        candidates = set(xrange(task_count))  # the tasks which may have become executable
         debut = time.time()
         terminate = False  # Symbolic exe succeed ?
         step_two = False  # Engage step Two ?
         i = 0
-        for task in self.dataflow.get_task_list():
-            num_task_exe[task] = 0
+        if state is not None:
+            (num_task_exe, rt_exe_count, progress, candidates, step_two, i, batches, wake_tasks, check_times,
+             event_times, start_heap, start_buckets, end_heap, end_buckets) = state["execution"]
+        next_checkpoint = time.time() + checkpoint_interval
         # ~ print "PHASE ONE"
         while not terminate:
-            min_rt_exe = num_task_exe[0] / self.dataflow.get_repetition_factor(0)
-            max_rt_exe = num_task_exe[0] / self.dataflow.get_repetition_factor(0)
-            for task in self.dataflow.get_task_list():  # zero executed task
-                executed_task[task] = False
-                min_rt_exe = min(min_rt_exe, int(num_task_exe[task] / self.dataflow.get_repetition_factor(task)))
-                max_rt_exe = max(max_rt_exe, int(num_task_exe[task] / self.dataflow.get_repetition_factor(task)))
+            if checkpoint is not None and time.time() >= next_checkpoint:
+                self.__save_state(checkpoint, nb_ite, record, (
+                    num_task_exe, rt_exe_count, progress, candidates, step_two, i, batches, wake_tasks, check_times,
+                    event_times, start_heap, start_buckets, end_heap, end_buckets))
+                next_checkpoint = time.time() + checkpoint_interval
+            if start_heap:
+                for firing in self.__batch_firings(start_batches(self.time_tick, True)):
+                    yield firing
             # cf the comment on self.__RT_MAX_RATIO to understand what's going on here.
-
-            if min_rt_exe == 0:
-                min_rt_exe = 1
-            if max_rt_exe / min_rt_exe > self.__RT_MAX_RATIO:
+            if progress[2] / max(progress[1], 1) > self.__RT_MAX_RATIO:
                 logging.info("Infinite loop detected, some part of the graph is dead lock !")
-                return -1
+                self.steps = i
+                if trace is not None:  # the tasks which are late
+                    trace.dead_lock(self.time_tick, tokens, [t for t in xrange(task_count)
+                                                             if num_task_exe[t] / rep_fact[t] == progress[1]])
+                return
+            if start_heap:
+                for firing in self.__batch_firings(start_batches(self.time_tick, False)):
+                    yield firing
+
             # 1 - Choose which task can be execute
-            task_execute = len(self.currently_executed)
+            task_execute = len(currently_executed)
             logging.debug("iteration: " + str(i))
-            for task in self.dataflow.get_task_list():
-                if task not in self.currently_executed and self.__is_executable(task):
-                    executed_task[task] = True
-
-                    # If we are in step Two
-                    if self.dataflow.is_sdf:
-                        phase_count = 1
+            executed_task = []
+            for t in sorted(candidates):
+                if t in currently_executed:
+                    continue
+                phase = phases[t]
+                for a in in_arcs[in_offsets[t]:in_offsets[t + 1]]:
+                    if tokens[a] < needs[cons_offsets[a] + phase]:
+                        if arc_source[a] in batches:
+                            wake(a)
+                        break
+                else:
+                    for a in bounded_out_arcs[bounded_out_offsets[t]:bounded_out_offsets[t + 1]]:
+                        if space[a] < prods[prod_offsets[a] + phase]:
+                            break  # its consumer frees room at its end
                     else:
-                        phase_count = float(self.dataflow.get_phase_count(task))
-
-                    rep_fact = float(self.dataflow.get_repetition_factor(task))
-                    if step_two and float(num_task_exe[task]) / phase_count == rep_fact * nb_ite:
-                        # If the task has been executed enought then don't execute it
-                        executed_task[task] = False
-                        task_execute -= 1
-                    if logging.getLogger().getEffectiveLevel() == logging.DEBUG:
-                        logging.debug("execute task: " + str(task))
-                        for arc in self.dataflow.get_arc_list(target=task):
-                            logging.debug("\tInput arc: " + str(arc) + " M0=" + str(self.M0[arc]))
-                    task_execute += 1
-
-            # print task_execute
+                        # If we are in step Two and the task has been executed enought then don't execute it
+                        if not step_two or float(num_task_exe[t]) / phase_count[t] != step_two_exe[t]:
+                            executed_task.append(t)
+                        if debug:
+                            logging.debug("execute task: " + str(tasks[t]))
+                            for a in in_arcs[in_offsets[t]:in_offsets[t + 1]]:
+                                logging.debug("\tInput arc: " + str(self.frozen.arcs[a]) + " M0=" + str(tokens[a]))
+            candidates = set()
+            task_execute += len(executed_task)
+
             # 2 - Execute tasks selected
-            for task in self.dataflow.get_task_list():
-                if executed_task[task]:  # If the task is selected
-                    if get_start_time:
-                        if self.dataflow.is_sdf:
-                            self.start_time[task].append(self.time_tick)
-                        if self.dataflow.is_csdf:
-                            self.start_time[(task, self.currentPhase[task])].append(self.time_tick)
-                    num_task_exe[task] += 1  # Increase the number of exe of this task
-                    if self.__task_start_exe(task) == -1:  # If the execution went wrong stop the process
+            for t in executed_task:
+                phase = phases[t]
+                if record:
+                    yield self.time_tick, t, phase
+                rt_exe = num_task_exe[t] / rep_fact[t]
+                num_task_exe[t] += 1  # Increase the number of exe of this task
+                if step_two:
+                    if float(num_task_exe[t]) / phase_count[t] == step_two_exe[t]:
+                        progress[0] += 1
+                elif num_task_exe[t] == step_one_exe[t]:
+                    progress[0] += 1
+                if num_task_exe[t] / rep_fact[t] != rt_exe:
+                    rt_exe_count[rt_exe] -= 1
+                    rt_exe += 1
+                    rt_exe_count[rt_exe] = rt_exe_count.get(rt_exe, 0) + 1
+                    progress[2] = max(progress[2], rt_exe)
+                    while not rt_exe_count.get(progress[1]):
+                        progress[1] += 1
+                duration = durations[phase_offsets[t] + phase]
+                if trace is not None:
+                    trace.firing(self.time_tick, t, phase - first_phases[t], duration)
+                batch = batching and 0 < duration == int(duration)
+                size = self.__RT_MAX_RATIO  # number of the next executions which have their tokens
+                # Start the execution of the task: delete preload from input arcs
+                for a in in_arcs[in_offsets[t]:in_offsets[t + 1]]:
+                    tokens[a] -= cons[cons_offsets[a] + phase]
+                    if tokens[a] < 0:  # If the execution went wrong stop the process
                         logging.error("Negative bds, this should never occur...")
-                        return -1
-                    self.currently_executed.append(task)
-                    self.tick_left[task] = self.__get_duration(task)
-
-            # This part compute the amount of time tick to remove to every current execution.
-            increment = 0
-            # Compute the minimum time tick increment for the execution.
-            if self.tick_left:
-                increment = min(self.tick_left.items(), key=lambda x: x[1])[1]
-            # Temp list to del task with time tick left at 0
-            del_temp = []
-            for task in self.currently_executed:
-                self.tick_left[task] -= increment  # Remove the time tick of the time tick left until the task exe end.
-                if self.tick_left[task] == 0:  # Time tick down to zero, the execution of this task end here.
-                    self.__task_end_exe(task)
-                    del_temp.append(task)
-            # Del task with time tick left at 0
-            for task in del_temp:
-                del self.tick_left[task]
-                self.currently_executed.remove(task)
-            self.time_tick += increment  # Increment the total time tick
-
-            # Should we go to step Two ?
-            if not step_two:
-                num_exe = 0  # Number of task which has enough execution
-                for task in self.dataflow.get_task_list():
-                    if self.dataflow.is_sdf:
-                        max_exe = 1
-                    if self.dataflow.is_csdf:
-                        max_exe = self.dataflow.get_phase_count(task)
-                    if self.dataflow.is_pcg:
-                        max_exe += self.dataflow.get_ini_phase_count(task)
-                    if num_task_exe[task] >= max_exe:
-                        num_exe += 1
-                if num_exe == self.dataflow.get_task_count():
-                    logging.debug("number of exe: " + str(num_task_exe))
-                    for task in self.dataflow.get_task_list():
-                        num_task_exe[task] = 0
-                    step_two = True
-                    logging.debug("PHASE TWO ENGAGE !!! fasten your seatbelt.")
-
-            # Step Two over ?
-            if step_two:
-                num_exe = 0  # Number of task which has enought execution
-                for task in self.dataflow.get_task_list():
-                    # If the number of execution of the task is more or equal to its repetition factor
-                    if self.dataflow.is_sdf:
-                        phase_count = 1.0
-                    else:
-                        phase_count = float(self.dataflow.get_phase_count(task))
-                    rep_fact = float(self.dataflow.get_repetition_factor(task))
-                    if float(num_task_exe[task]) / phase_count == rep_fact * nb_ite:
-                        num_exe += 1
-                # If all task have been executed enought the symbolic exe is successful
-                if num_exe == self.dataflow.get_task_count():
+                        if trace is not None:
+                            trace.dead_lock(self.time_tick, tokens, [t])
+                        return
+                    if batch and tokens[a] < size * cons[cons_offsets[a]]:
+                        size = tokens[a] / cons[cons_offsets[a]]
+                self.arcExe += in_offsets[t + 1] - in_offsets[t]
+                for a in bounded_out_arcs[bounded_out_offsets[t]:bounded_out_offsets[t + 1]]:
+                    space[a] -= prods[prod_offsets[a] + phase]
+                currently_executed.add(t)
+                count = 1
+                if batch and size + 1 >= self.batch_min:
+                    count = batch_size(t, size) + 1
+                if count > 1:
+                    for a in in_arcs[in_offsets[t]:in_offsets[t + 1]]:
+                        tokens[a] -= cons[cons_offsets[a]] * (count - 1)
+                    self.arcExe += (in_offsets[t + 1] - in_offsets[t]) * (count - 1)
+                    batches[t] = [self.time_tick, duration, count, 1, 0]
+                    schedule(start_heap, start_buckets, self.time_tick + duration, t)
+                    schedule(end_heap, end_buckets, self.time_tick + duration, t)
+                    check_times.add(self.time_tick + (count - 1) * duration)
+                    push_event(self.time_tick + (count - 1) * duration)
+                    for a in out_arcs[out_offsets[t]:out_offsets[t + 1]]:
+                        if arc_target[a] not in currently_executed:
+                            wake(a)
+                end_time = self.time_tick + count * duration
+                if end_time in end_tasks:
+                    end_tasks[end_time].append(t)
+                else:
+                    end_tasks[end_time] = [t]
+                    push_event(end_time)
+
+            # Periodic regime ? The batches keep tokens ahead of their executions, their states are not compared.
+            if regimes is not None and phases[0] == ref_phase and 0 in executed_task and not batches \
+                    and not wake_tasks and not check_times and (not step_two or progress[0] == 0):
+                marking, room, phase_state, running = self.__state()
+                previous = regimes.setdefault((phase_state, running), [])
+                for old_marking, old_room, start_step, start_counts in previous:
+                    if self.__covers(marking, old_marking) and self.__covers(room, old_room):
+                        fired = [num_task_exe[t] - start_counts[t] for t in xrange(task_count)]
+                        if min(fired) > 0 or (marking == old_marking and room == old_room):
+                            break
+                else:
+                    previous.append((marking, room, i, list(num_task_exe)))
+                    fired = None
+                if fired is not None:
+                    period_steps = i - start_step
+                    if min(fired) == 0:  # the same state again: these tasks never fire again
+                        late = [t for t in xrange(task_count) if fired[t] == 0]
+                        logging.info("Periodic regime without " + str(len(late)) + " tasks, the graph is dead lock !")
+                        speed = max(float(fired[t]) / rep_fact[t] for t in xrange(task_count))
+                        ratio_left = self.__RT_MAX_RATIO * max(progress[1], 1) - progress[2] + 1
+                        self.steps = i + 1
+                        self.saved_steps = int(-(-ratio_left // speed)) * period_steps
+                        if trace is not None:
+                            trace.dead_lock(self.time_tick, tokens, late)
+                        return
+                    periods = 0  # number of periods until the end of the step two
+                    for t in xrange(task_count):
+                        left = step_two_exe[t] * phase_count[t] - num_task_exe[t]
+                        if not step_two:
+                            left = step_two_exe[t] * phase_count[t] + max(step_one_exe[t] - num_task_exe[t], 0)
+                        periods = max(periods, int(-(-left // fired[t])))
+                    logging.info("Periodic regime of " + str(period_steps) + " steps reached at the iteration " +
+                                 str(i) + ", the graph is live")
+                    self.saved_steps = periods * period_steps
                     terminate = True
 
+            # Should we go to step Two ? (the ends below do not change the numbers of executions)
+            if not step_two and progress[0] == task_count:
+                logging.debug("number of exe: " + str(num_task_exe))
+                progress[0] = 0
+                for t in xrange(task_count):
+                    num_task_exe[t] = 0
+                    if 0.0 == step_two_exe[t]:
+                        progress[0] += 1
+                rt_exe_count = {0: task_count}
+                progress[1] = progress[2] = 0
+                step_two = True
+                if regimes is not None:  # the numbers of executions start again from 0
+                    regimes.clear()
+                for t in batches.keys():  # the executions of the batches which start from now are in step two
+                    size = (self.__RT_MAX_RATIO + 1) * rep_fact[t] - 1
+                    if step_two_exe[t] == int(step_two_exe[t]):
+                        size = min(size, int(step_two_exe[t]))
+                    cut_batch(t, size)
+                logging.debug("PHASE TWO ENGAGE !!! fasten your seatbelt.")
+
+            # End the executions of the tasks which end the soonest:
+            # add preload on output arcs and increment the actual phase of the tasks.
+            event_time = None
+            while end_events and event_time is None:
+                event_time = heapq.heappop(end_events)
+                event_times.remove(event_time)
+                ended = end_tasks.pop(event_time, ())
+                woken = wake_tasks.pop(event_time, ())
+                if not ended and not woken and event_time not in check_times:
+                    event_time = None  # only outdated events at this time
+            if event_time is not None:
+                self.time_tick = event_time  # Increment the total time tick
+                check_times.discard(event_time)
+                if end_heap:
+                    end_batches(self.time_tick)
+                for t in ended:
+                    phase = phases[t]
+                    if batches.pop(t, None) is None:  # else the ends of the batch are already done
+                        for a in out_arcs[out_offsets[t]:out_offsets[t + 1]]:
+                            tokens[a] += prods[prod_offsets[a] + phase]
+                        self.arcExe += out_offsets[t + 1] - out_offsets[t]
+                    for a in out_arcs[out_offsets[t]:out_offsets[t + 1]]:
+                        candidates.add(arc_target[a])
+                    for a in bounded_in_arcs[bounded_in_offsets[t]:bounded_in_offsets[t + 1]]:
+                        space[a] += cons[cons_offsets[a] + phase]
+                        candidates.add(arc_source[a])
+                    phase += 1
+                    if phase_offsets[t] + phase == phase_ends[t]:
+                        phase = first_phases[t]
+                    phases[t] = phase
+                    currently_executed.remove(t)
+                    candidates.add(t)
+                candidates.update(woken)
+
+            # Step Two over ? If all task have been executed enought the symbolic exe is successful
+            if step_two and progress[0] == task_count:
+                terminate = True
+
             # If nothing append the initial marking is wrong:-(
             if task_execute == 0:
                 logging.debug("No task executed:-/, iteration: " + str(i) + "Arcs exe: " + str(
                     self.arcExe) + "number of exe: " + str(num_task_exe))
-                return -1
+                self.steps = i + 1
+                if trace is not None:
+                    trace.dead_lock(self.time_tick, tokens, range(task_count))
+                return
+            if trace is not None and i % trace.sample_steps == 0:
+                trace.sample(self.time_tick, tokens)
             i += 1
+        self.steps = i
         fin = time.time()
         logging.info("Symbolic execution succeed in " + str(fin - debut) + "s, with " + str(i) + " iterations")
-        if get_start_time:
-            return self.start_time
-        return 0  # Exe successful
+        if trace is not None:
+            trace.sample(self.time_tick, tokens)
+        self.result = 0
+
+    # Save the state of the execution at the beginning of a step in the file checkpoint
+    # (written in a temporary file first, so that an interruption never leaves a partial snapshot).
+    # execution is the tuple of the local state of __run.
+    def __save_state(self, checkpoint, nb_ite, record, execution):
+        state = {"graph": self.__fingerprint(), "nb_ite": nb_ite, "get_start_time": record,
+                 "time_tick": self.time_tick, "arcExe": self.arcExe, "tokens": self.tokens, "phases": self.phases,
+                 "space": self.space,
+                 "currently_executed": self.currently_executed, "end_events": self.end_events,
+                 "end_tasks": self.end_tasks, "execution": execution}
+        if record:
+            state["start_time"] = self.start_time
+        with open(checkpoint + ".tmp", "wb") as open_file:
+            cPickle.dump(state, open_file, cPickle.HIGHEST_PROTOCOL)
+        if os.name == "nt" and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        os.rename(checkpoint + ".tmp", checkpoint)
+        logging.info("Symbolic execution saved in " + checkpoint + " at the iteration " + str(execution[5]))
+
+    # Return True if every value of marking is greater than or equal to the one of old_marking.
+    @staticmethod
+    def __covers(marking, old_marking):
+        for value, old_value in izip(marking, old_marking):
+            if value < old_value:
+                return False
+        return True
+
+    # A hash of the compiled tables, a snapshot is only resumed on the dataflow it was taken on.
+    def __fingerprint(self):
+        return hash((tuple(self.frozen.tasks), tuple(self.frozen.arcs), tuple(self.frozen.initial_markings),
+                     tuple(self.frozen.get_repetition_factor(task) for task in self.frozen.tasks),
+                     tuple(self.__durations), tuple(self.__prods), tuple(self.__cons), tuple(self.__needs),
+                     tuple(self.__capacities)))
+
+    # Generate the firings (start time, task index, 0) of the ranges of executions of the batches
+    # started by a step, in the order of their start times.
+    @staticmethod
+    def __batch_firings(started_ranges):
+        if len(started_ranges) == 1:
+            return SymbolicExe.__range_firings(*started_ranges[0])
+        return heapq.merge(*[SymbolicExe.__range_firings(*started_range) for started_range in started_ranges])
+
+    @staticmethod
+    def __range_firings(first, duration, started, last, t):
+        for j in xrange(started, last + 1):
+            yield first + j * duration, t, 0
+
+    # Find the periodic regime of the self-timed execution (every task starts as soon as it can,
+    # without auto-concurrency) by hashing its states.
+    # Return (throughput, transient, critical_tasks):
+    #   throughput is the exact number of graph iterations per time unit (a Fraction, 0 if the execution dead locks,
+    #   float("inf") if the periodic regime takes no time, i.e. the durations of its phases are all zero),
+    #   transient is the time at which the periodic regime starts (or at which the execution dead locks),
+    #   critical_tasks is the sorted list of the tasks on the critical cycles of the periodic regime.
+    # The period of the graph (1 / throughput) is never greater than the one of its 1-periodic schedule.
+    # Raise RuntimeError if no periodic regime is found in max_steps steps, e.g. when the tokens of an arc
+    # grow without bound (Dataflow.get_throughput handles the graphs which are not strongly connected).
+    def get_throughput(self, max_steps=1000000):
+        self.__raz()
+        task_count = len(self.frozen.tasks)
+        if task_count == 0:
+            return Fraction(0), 0, []
+        ref_phase = self.__first_phases[0]
+
+        # 1 - Find two steps with the same state where the first task starts its first periodic phase.
+        # The states of the periodic regime are all different in one period so they are one period apart.
+        states = {}
+        last_time = 0
+        for step, (time_tick, executed_task, exe_counts) in enumerate(self.__self_timed()):
+            last_time = time_tick
+            if step >= max_steps:
+                raise RuntimeError("No periodic regime found in " + str(max_steps) + " steps")
+            if 0 in executed_task and self.phases[0] == ref_phase:
+                state = self.__state()
+                if state in states:
+                    start_step, start_time, start_counts = states[state]
+                    break
+                states[state] = step, time_tick, list(exe_counts)
+        else:
+            logging.info("The self-timed execution is dead lock at time " + str(last_time))
+            return Fraction(0), last_time, []
+        del states
+        period_steps = step - start_step
+        period = Fraction(time_tick) - Fraction(start_time)
+        iterations = None
+        for t in xrange(task_count):
+            phase_count = self.__phase_ends[t] - self.__phase_offsets[t] - self.__first_phases[t]
+            task_iterations = Fraction(exe_counts[t] - start_counts[t],
+                                       self.frozen.get_repetition_factor(self.frozen.tasks[t]) * phase_count)
+            if iterations is None or task_iterations < iterations:
+                iterations = task_iterations
+
+        # 2 - The regime starts at the first step whose state is the one of the step one period later.
+        transient_step, transient = self.__transient(period_steps)
+
+        # 3 - Follow the dependencies of the executions of the second period of the regime.
+        critical_tasks = self.__critical_tasks(transient_step, period_steps)
+        logging.info("Periodic regime from time " + str(transient) + ", period " + str(period) + " for " +
+                     str(iterations) + " iterations")
+        if period == 0:
+            return float("inf"), transient, critical_tasks
+        return iterations / period, transient, critical_tasks
+
+    # Self-timed execution: generate (time, started task indexes, execution counts) after the starts of each step.
+    # The tokens, phases and running tasks are the ones of the execution (self.tokens...).
+    # The executions are numbered in start order. When track is True, self.causes gives for each task started
+    # (execution, cause) where cause is the (execution, task) whose end allowed it to start: the producer
+    # of an input arc just filled, the consumer of a bounded output arc just freed, itself when it was only
+    # waiting for its previous execution, None at the beginning.
+    def __self_timed(self, track=False):
+        self.__raz()
+        tokens = self.tokens
+        phases = self.phases
+        in_offsets, in_arcs = self.__in_offsets, self.__in_arcs
+        out_offsets, out_arcs = self.__out_offsets, self.__out_arcs
+        arc_source, arc_target = self.frozen.arc_source, self.frozen.arc_target
+        cons_offsets, cons, needs = self.__cons_offsets, self.__cons, self.__needs
+        prod_offsets, prods = self.__prod_offsets, self.__prods
+        phase_offsets, durations = self.__phase_offsets, self.__durations
+        first_phases, phase_ends = self.__first_phases, self.__phase_ends
+        end_events = self.end_events
+        end_tasks = self.end_tasks
+        currently_executed = self.currently_executed
+        space = self.space
+        bounded_in_offsets, bounded_in_arcs = self.__bounded_in_offsets, self.__bounded_in_arcs
+        bounded_out_offsets, bounded_out_arcs = self.__bounded_out_offsets, self.__bounded_out_arcs
+
+        task_count = len(self.frozen.tasks)
+        exe_counts = [0] * task_count
+        running = [None] * task_count  # the number of the current execution of each task
+        last_end = [None] * task_count  # (end time, number) of the last execution ended of each task
+        received = {}  # arc index -> (time, tokens produced at this time)
+        released = {}  # bounded arc index -> (time, room freed at this time)
+        execution = 0
+        candidates = set(xrange(task_count))
+        while candidates or end_events:
+            executed_task = []
+            self.causes = []
+            for t in sorted(candidates):
+                if t in currently_executed:
+                    continue
+                phase = phases[t]
+                for a in in_arcs[in_offsets[t]:in_offsets[t + 1]]:
+                    if tokens[a] < needs[cons_offsets[a] + phase]:
+                        break
+                else:
+                    for a in bounded_out_arcs[bounded_out_offsets[t]:bounded_out_offsets[t + 1]]:
+                        if space[a] < prods[prod_offsets[a] + phase]:
+                            break
+                    else:
+                        executed_task.append(t)
+            candidates = set()
+
+            for t in executed_task:
+                phase = phases[t]
+                if track:  # before the tokens of its input arcs are consumed
+                    self.causes.append((execution, self.__cause(t, received, released, last_end)))
+                for a in in_arcs[in_offsets[t]:in_offsets[t + 1]]:
+                    tokens[a] -= cons[cons_offsets[a] + phase]
+                for a in bounded_out_arcs[bounded_out_offsets[t]:bounded_out_offsets[t + 1]]:
+                    space[a] -= prods[prod_offsets[a] + phase]
+                exe_counts[t] += 1
+                running[t] = execution
+                execution += 1
+                currently_executed.add(t)
+                end_time = self.time_tick + durations[phase_offsets[t] + phase]
+                if end_time in end_tasks:
+                    end_tasks[end_time].append(t)
+                else:
+                    end_tasks[end_time] = [t]
+                    heapq.heappush(end_events, end_time)
+            yield self.time_tick, executed_task, exe_counts
+
+            if end_events:
+                self.time_tick = heapq.heappop(end_events)
+                for t in end_tasks.pop(self.time_tick):
+                    phase = phases[t]
+                    for a in out_arcs[out_offsets[t]:out_offsets[t + 1]]:
+                        produced = prods[prod_offsets[a] + phase]
+                        tokens[a] += produced
+                        if track:
+                            if a in received and received[a][0] == self.time_tick:
+                                produced += received[a][1]
+                            received[a] = (self.time_tick, produced)
+                        candidates.add(arc_target[a])
+                    for a in bounded_in_arcs[bounded_in_offsets[t]:bounded_in_offsets[t + 1]]:
+                        freed = cons[cons_offsets[a] + phase]
+                        space[a] += freed
+                        if track:
+                            if a in released and released[a][0] == self.time_tick:
+                                freed += released[a][1]
+                            released[a] = (self.time_tick, freed)
+                        candidates.add(arc_source[a])
+                    phase += 1
+                    if phase_offsets[t] + phase == phase_ends[t]:
+                        phase = first_phases[t]
+                    phases[t] = phase
+                    currently_executed.remove(t)
+                    last_end[t] = (self.time_tick, running[t])
+                    candidates.add(t)
+
+    # Return the (execution, task) whose end allowed the task t to start at the current time (see __self_timed).
+    def __cause(self, t, received, released, last_end):
+        phase = self.phases[t]
+        for a in self.__in_arcs[self.__in_offsets[t]:self.__in_offsets[t + 1]]:
+            if a in received and received[a][0] == self.time_tick:
+                if self.tokens[a] - received[a][1] < self.__needs[self.__cons_offsets[a] + phase]:
+                    source = self.frozen.arc_source[a]
+                    return last_end[source][1], source
+        for a in self.__bounded_out_arcs[self.__bounded_out_offsets[t]:self.__bounded_out_offsets[t + 1]]:
+            if a in released and released[a][0] == self.time_tick:  # the consumer freed the room just now
+                if self.space[a] - released[a][1] < self.__prods[self.__prod_offsets[a] + phase]:
+                    target = self.frozen.arc_target[a]
+                    return last_end[target][1], target
+        if last_end[t] is not None and last_end[t][0] == self.time_tick:
+            return last_end[t][1], t
+        return None
+
+    # Return the state of the execution: the tokens, the room of the bounded arcs, the phases
+    # and the time left of the running tasks.
+    def __state(self):
+        time_left = []
+        for end_time, tasks in self.end_tasks.iteritems():
+            for t in tasks:
+                time_left.append((t, end_time - self.time_tick))
+        time_left.sort()
+        return tuple(self.tokens), tuple(self.space), tuple(self.phases), tuple(time_left)
+
+    # Return (step, time) of the first step of the periodic regime of the self-timed execution:
+    # the first step whose state is the one period_steps steps later (two executions run side by side).
+    def __transient(self, period_steps):
+        ahead = SymbolicExe(self.frozen, self.capacities)
+        ahead_steps = ahead.__self_timed()
+        for _ in xrange(period_steps):
+            next(ahead_steps)
+        for step, (time_tick, _, _) in enumerate(self.__self_timed()):
+            next(ahead_steps)
+            if self.__state() == ahead.__state():
+                return step, time_tick
+
+    # Return the sorted list of the tasks on the cycles of the dependencies (see __self_timed)
+    # between the executions of two periods of the regime which starts at regime_step.
+    # The dependencies of the second period toward the first one are moved one period later.
+    def __critical_tasks(self, regime_step, period_steps):
+        executions = {}  # execution -> (task, rank of the execution of the task in its period, period)
+        counts = [[0] * len(self.frozen.tasks), [0] * len(self.frozen.tasks)]
+        causes = {}  # execution of the second period -> (task, rank) of its cause
+        for step, (_, executed_task, _) in enumerate(self.__self_timed(track=True)):
+            if step >= regime_step + 2 * period_steps:
+                break
+            if step < regime_step:
+                continue
+            period = (step - regime_step) / period_steps
+            for t, (execution, cause) in zip(executed_task, self.causes):
+                executions[execution] = (t, counts[period][t], period)
+                if period == 1 and cause is not None and cause[0] in executions:
+                    cause_task, cause_rank, _ = executions[cause[0]]
+                    causes[(t, counts[period][t])] = (cause_task, cause_rank)
+                counts[period][t] += 1
+
+        critical_tasks = set()
+        visited = {}
+        for start in causes:
+            path = []
+            node = start
+            while node in causes and node not in visited:
+                visited[node] = start
+                path.append(node)
+                node = causes[node]
+            if node in visited and visited[node] == start:  # a new cycle
+                for cycle_node in path[path.index(node):]:
+                    critical_tasks.add(self.frozen.tasks[cycle_node[0]])
+        return sorted(critical_tasks)
 
     # Use at the beginning of every execution.
     # Initialized preload and phases.
-    # Phases are negative when the graph has initialized phases.
     def __raz(self):
+        if self.frozen is None or self.frozen is not self.dataflow.freeze():
+            self.__compile()
         self.arcExe = 0
         self.time_tick = 0
-        self.currently_executed = []
-        self.tick_left = {}
-
-        self.M0 = {}
-        for arc in self.dataflow.get_arc_list():
-            self.M0[arc] = self.dataflow.get_initial_marking(arc)
-
-        self.currentPhase = {}
+        self.currently_executed.clear()
+        del self.end_events[:]
+        self.end_tasks.clear()
+
+        self.tokens = list(self.frozen.initial_markings)
+        self.phases = [0] * len(self.frozen.tasks)
+        self.space = [0] * len(self.tokens)
+        for a in self.__bounded_arcs:
+            self.space[a] = self.__capacities[a] - self.tokens[a]
+            if self.space[a] < 0:
+                raise ValueError("The initial marking of the arc " + str(self.frozen.arcs[a]) +
+                                 " is greater than its capacity")
         for task in self.dataflow.get_task_list():
-            self.currentPhase[task] = 0
             if self.dataflow.is_sdf:
                 self.start_time[task] = []
             if self.dataflow.is_csdf:
                 for phase in xrange(self.dataflow.get_phase_count(task)):
                     self.start_time[(task, phase)] = []
-            if self.dataflow.is_pcg:
-                self.currentPhase[task] = -self.dataflow.get_ini_phase_count(task)
-
-    # Start the execution of a task: delete preload from input arcs
-    def __task_start_exe(self, task):
-        for inArc in self.dataflow.get_arc_list(target=task):
-            self.M0[inArc] -= self.__get_token_del(inArc)
-            if self.M0[inArc] < 0:
-                return -1
-            self.arcExe += 1
-        return 0
-
-    # End the execution of a task: add preload on output arc
-    # and increment the actual phase of the task
-    def __task_end_exe(self, task):
-        for outArc in self.dataflow.get_arc_list(source=task):
-            self.M0[outArc] += self.__get_token_created(outArc)
-            self.arcExe += 1
-
-        self.currentPhase[task] += 1
-        if self.dataflow.is_sdf:
-            self.currentPhase[task] = 0
-        else:
-            if self.currentPhase[task] == self.dataflow.get_phase_count(task):
-                self.currentPhase[task] = 0
-
-        return 0
-
-    # Return True if the task is executable (ie input arcs have enough initial marking)
-    def __is_executable(self, task):
-        for inArc in self.dataflow.get_arc_list(target=task):
-            if self.M0[inArc] < self.__get_token_need(inArc):
-                return False
-        return True
-
-    # Return the amount of data create on an arc depending of his production and the actual phase of the source
-    def __get_token_created(self, out_arc):
-        task = self.dataflow.get_source(out_arc)
-        cur_phase = self.currentPhase[task]
-        if cur_phase < 0:
-            return self.dataflow.get_ini_prod_rate_list(out_arc)[self.dataflow.get_ini_phase_count(task) + cur_phase]
-        else:
-            if self.dataflow.is_sdf:
-                return self.dataflow.get_prod_rate(out_arc)
-            else:
-                return self.dataflow.get_prod_rate_list(out_arc)[cur_phase]
-
-    # Return the amount of data del on an input arc when the target is execute.
-    def __get_token_del(self, in_arc):
-        task = self.dataflow.get_target(in_arc)
-        cur_phase = self.currentPhase[task]
 
-        if cur_phase < 0:
-            return self.dataflow.get_ini_cons_rate_list(in_arc)[self.dataflow.get_ini_phase_count(task) + cur_phase]
+    # Fill the tables read by the execution from the snapshot of the dataflow.
+    # The phases of the task t are numbered from 0 to phase_ends[t] - phase_offsets[t] - 1
+    # (the initialization phases of a PCG then its periodic phases), after its last phase
+    # the task goes back to its first periodic phase first_phases[t].
+    # The duration of the phase p of t is durations[phase_offsets[t] + p].
+    # The input arcs of t are in_arcs[in_offsets[t]:in_offsets[t + 1]] (out_arcs for its output arcs).
+    # For the phase p of its target, the arc a loses cons[cons_offsets[a] + p] tokens
+    # and needs needs[cons_offsets[a] + p] tokens (the threshold of a PCG);
+    # it receives prods[prod_offsets[a] + p] tokens for the phase p of its source.
+    def __compile(self):
+        frozen = self.dataflow.freeze()
+        self.frozen = frozen
+        task_count = len(frozen.tasks)
+        arc_count = len(frozen.arcs)
+        if frozen.is_pcg:
+            ini_phase_counts = frozen.ini_phase_counts
+            ini_durations = frozen.ini_phase_duration_lists
+            ini_prods = frozen.ini_prod_rate_lists
+            ini_cons = frozen.ini_cons_rate_lists
+            ini_needs = frozen.ini_threshold_lists
+            needs = frozen.threshold_lists
         else:
-            if self.dataflow.is_sdf:
-                return self.dataflow.get_cons_rate(in_arc)
-            else:
-                return self.dataflow.get_cons_rate_list(in_arc)[cur_phase]
+            ini_phase_counts = [0] * task_count
+            ini_durations = [[]] * task_count
+            ini_prods = ini_cons = ini_needs = [[]] * arc_count
+            needs = frozen.cons_rate_lists
+
+        self.__first_phases = list(ini_phase_counts)
+        self.__phase_offsets = []
+        self.__phase_ends = []
+        self.__durations = []
+        for t in xrange(task_count):
+            self.__phase_offsets.append(len(self.__durations))
+            self.__durations.extend(ini_durations[t])
+            self.__durations.extend(frozen.phase_duration_lists[t])
+            self.__phase_ends.append(len(self.__durations))
+
+        self.__prod_offsets, self.__prods = [], []
+        self.__cons_offsets, self.__cons, self.__needs = [], [], []
+        for a in xrange(arc_count):
+            self.__prod_offsets.append(len(self.__prods))
+            self.__prods.extend(ini_prods[a])
+            self.__prods.extend(frozen.prod_rate_lists[a])
+            self.__cons_offsets.append(len(self.__cons))
+            self.__cons.extend(ini_cons[a])
+            self.__cons.extend(frozen.cons_rate_lists[a])
+            self.__needs.extend(ini_needs[a])
+            self.__needs.extend(needs[a])
+
+        self.__in_offsets, self.__in_arcs = self.__arc_ranges(frozen.arc_target, task_count)
+        self.__out_offsets, self.__out_arcs = self.__arc_ranges(frozen.arc_source, task_count)
+
+        self.__capacities = [-1] * arc_count  # -1 for the unbounded arcs
+        for arc, capacity in self.capacities.iteritems():
+            if arc not in frozen.arc_index:
+                raise ValueError("Unknown arc " + str(arc))
+            if capacity is not None:
+                self.__capacities[frozen.arc_index[arc]] = capacity
+        self.__bounded_arcs = [a for a in xrange(arc_count) if self.__capacities[a] >= 0]
+        self.__bounded_in_offsets, self.__bounded_in_arcs = self.__arc_ranges(frozen.arc_target, task_count,
+                                                                              self.__bounded_arcs)
+        self.__bounded_out_offsets, self.__bounded_out_arcs = self.__arc_ranges(frozen.arc_source, task_count,
+                                                                                self.__bounded_arcs)
+
+    # Return (offsets, arcs) where arcs[offsets[t]:offsets[t + 1]] are the arc indexes a with arc_tasks[a] == t
+    # (among the arc indexes selected, all of them by default).
+    @staticmethod
+    def __arc_ranges(arc_tasks, task_count, selected=None):
+        if selected is None:
+            selected = xrange(len(arc_tasks))
+        offsets = [0] * (task_count + 1)
+        for a in selected:
+            offsets[arc_tasks[a] + 1] += 1
+        for t in xrange(task_count):
+            offsets[t + 1] += offsets[t]
+        arcs = [0] * offsets[task_count]
+        position = offsets[:-1]
+        for a in selected:
+            t = arc_tasks[a]
+            arcs[position[t]] = a
+            position[t] += 1
+        return offsets, arcs
 
     # return the data needed by an arc to execute the current phase of the target.
-    def __get_token_need(self, in_arc):
-        task = self.dataflow.get_target(in_arc)
-        cur_phase = self.currentPhase[task]
-
-        if self.dataflow.is_pcg:
-            if cur_phase < 0:
-                data_need = self.dataflow.get_ini_threshold_list(in_arc)[
-                    self.dataflow.get_ini_phase_count(task) + cur_phase]
-            else:
-                data_need = self.dataflow.get_threshold_list(in_arc)[cur_phase]
-        else:
-            return self.__get_token_del(in_arc)
-        return data_need
-
-    def __get_duration(self, task):
-        if self.dataflow.is_sdf:
-            return self.dataflow.get_task_duration(task)
-        if self.dataflow.is_pcg and self.currentPhase[task] < 0:
-            phase = self.dataflow.get_ini_phase_count(task) + self.currentPhase[task]
-            return self.dataflow.get_ini_phase_duration_list(task)[phase]
-        if self.dataflow.is_csdf:
-            return self.dataflow.get_phase_duration_list(task)[self.currentPhase[task]]
+    def __get_token_need(self, a):
+        return self.__needs[self.__cons_offsets[a] + self.phases[self.frozen.arc_target[a]]]
+
+    # Return the phase of a task as numbered by the dataflow (negative for an initialization phase).
+    def __get_phase(self, t):
+        return self.phases[t] - self.__first_phases[t]
 
     ########################################################################
     #                       Printing fonctions                             #
     ########################################################################
     # Print the actual amount of each bds (arcs)
     def print_buffer(self):
-        for arc in self.dataflow.get_arc_list():
-            print str(arc) + " M0: " + str(self.M0[arc])
+        for a, arc in enumerate(self.frozen.arcs):
+            print str(arc) + " M0: " + str(self.tokens[a])
         print "------------------------------"
 
     # Print all arc which are blocking the graph. If all task are impacted, the graph is not alive.
     def print_blocking_task(self):
-        for task in self.dataflow.get_task_list():
-            if not self.__is_executable(task):
-                for inArc in self.dataflow.get_arc_list(target=task):
-                    if self.M0[inArc] < self.__get_token_need(inArc):
-                        print "BLOCKING ARC: " + str(inArc) + " phase: " + str(self.currentPhase[task]) + " need: " \
-                              + str(self.__get_token_need(inArc)) + " bds: " + str(self.M0[inArc]) + " STEP: " \
-                              + str(self.dataflow.get_gcd(inArc))
+        for t in xrange(len(self.frozen.tasks)):
+            for a in self.__in_arcs[self.__in_offsets[t]:self.__in_offsets[t + 1]]:
+                if self.tokens[a] < self.__get_token_need(a):
+                    print "BLOCKING ARC: " + str(self.frozen.arcs[a]) + " phase: " + str(self.__get_phase(t)) \
+                          + " need: " + str(self.__get_token_need(a)) + " bds: " + str(self.tokens[a]) + " STEP: " \
+                          + str(self.frozen.gcds[a])
 
     # Print all task that can be executed. If None, the graph is not alive.
     def print_no_blocking_task(self):
-        for task in self.dataflow.get_task_list():
-            for inArc in self.dataflow.get_arc_list(target=task):
-                if self.M0[inArc] > self.__get_token_need(inArc):
-                    print "NO BLOCKING ARC: " + str(inArc) + " phase: " + str(self.currentPhase[task]) + " need: " \
-                          + str(self.__get_token_need(inArc)) + " bds: " + str(self.M0[inArc]) + " STEP: " \
-                          + str(self.dataflow.get_gcd(inArc))
+        for t in xrange(len(self.frozen.tasks)):
+            for a in self.__in_arcs[self.__in_offsets[t]:self.__in_offsets[t + 1]]:
+                if self.tokens[a] > self.__get_token_need(a):
+                    print "NO BLOCKING ARC: " + str(self.frozen.arcs[a]) + " phase: " + str(self.__get_phase(t)) \
+                          + " need: " + str(self.__get_token_need(a)) + " bds: " + str(self.tokens[a]) + " STEP: " \
+                          + str(self.frozen.gcds[a])
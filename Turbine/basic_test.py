@@ -1,10 +1,15 @@
 import logging
 import os
+import sys
 
 from generation.generate import generate
 from file_parser.sdf3_parser import write_sdf3_file, read_sdf3_file
 from file_parser.turbine_parser import write_tur_file, read_tur_file
 from param.parameters import Parameters
+from Turbine.algorithms.execution_trace import ExecutionTrace
+from Turbine.algorithms.period_computation import ComputePeriod, PeriodAnalyzer
+from Turbine.algorithms.symbolic_exe import SymbolicExe
+from Turbine.graph_classe.sdf import SDF as SDFGraph
 
 
 def try_function(function, args):
@@ -27,6 +32,108 @@ def try_property(prop):
         return ret
 
 
+def check_batch_start_time(dataflow):
+    """The start times and the dead lock of SymbolicExe are the same with and without the batches of executions.
+    """
+    batched = SymbolicExe(dataflow.freeze())
+    one_by_one = SymbolicExe(dataflow.freeze())
+    one_by_one.batch_min = sys.maxint
+    if batched.get_start_time(2) != one_by_one.get_start_time(2):
+        raise AssertionError("The start times of the batches differ")
+    if SymbolicExe(dataflow.freeze()).execute() != one_by_one.execute():
+        raise AssertionError("The dead lock of the batches differs")
+
+
+def batch_sdf(initial_marking):
+    """A SDF cycle t0 -> t1 -> t2 -> t0 whose tasks t1 and t2 have a repetition factor of 1000.
+    """
+    dataflow = SDFGraph("batch_SDF")
+    tasks = dataflow.add_tasks(3, durations=[5, 1, 2])
+    dataflow.add_arcs([tasks[0], tasks[1], tasks[2]], [tasks[1], tasks[2], tasks[0]], [1000, 1, 1], [1, 1, 1000],
+                      [0, 0, initial_marking])
+    dataflow.compute_repetition_vector()
+    return dataflow
+
+
+class InterruptedExecution(Exception):
+    pass
+
+
+class InterruptingTrace(ExecutionTrace):
+    """Interrupt the symbolic execution after steps steps.
+    """
+
+    def __init__(self, steps):
+        ExecutionTrace.__init__(self, sample_steps=1)
+        self.steps = steps
+
+    def sample(self, time_tick, tokens):
+        if self.steps == 0:
+            raise InterruptedExecution()
+        self.steps -= 1
+        ExecutionTrace.sample(self, time_tick, tokens)
+
+
+def check_resume(dataflow):
+    """A symbolic execution interrupted then resumed from its checkpoint gives the start times of an
+    uninterrupted one.
+    """
+    interrupted = SymbolicExe(dataflow.freeze())
+    interrupted.trace = InterruptingTrace(2)
+    try:
+        interrupted.execute(True, 2, "resume.ckpt", 0)
+    except InterruptedExecution:
+        pass
+    else:
+        raise AssertionError("The execution was not interrupted")
+    try:
+        resumed = SymbolicExe(dataflow.freeze()).resume("resume.ckpt", 0)
+    finally:
+        os.remove("resume.ckpt")
+    if resumed != SymbolicExe(dataflow.freeze()).get_start_time(2):
+        raise AssertionError("The start times of the resumed execution differ")
+
+
+def check_cycle_ratio(dataflow):
+    """The period of the maximum cycle ratio is at most the one of the LP (GLPK may stop at a suboptimal basis)
+    and the start times of both methods satisfy the constraints of their period.
+    """
+    lp_period, lp_start_time = dataflow.get_period(start_time=True)
+    mcr_period, mcr_start_time = dataflow.get_period(start_time=True, method="MCR")
+    if mcr_period > lp_period * (1 + 1e-6):
+        raise AssertionError("The period of the maximum cycle ratio is greater than the one of the LP")
+    normalized = dataflow
+    if not dataflow.is_normalized:
+        normalized = dataflow.copy()
+        normalized.normalized()
+    period = ComputePeriod(normalized.freeze())
+    if not period.check_schedule(lp_period, lp_start_time):
+        raise AssertionError("The start times of the LP do not satisfy the constraints")
+    if not period.check_schedule(mcr_period, mcr_start_time):
+        raise AssertionError("The start times of the maximum cycle ratio do not satisfy the constraints")
+
+
+def check_period_analyzer(dataflow):
+    """The period of PeriodAnalyzer is the one of get_period after each change of the initial markings
+    (the markings of the dataflow are restored).
+    """
+    arcs = dataflow.get_arc_list()[:3]
+    markings = [dataflow.get_initial_marking(arc) for arc in arcs]
+    steps = [(arc, dataflow.get_gcd(arc)) for arc in arcs] + [(arcs[0], -dataflow.get_gcd(arcs[0]))]
+    analyzer = PeriodAnalyzer(dataflow)
+    try:
+        for arc, step in [(None, 0)] + steps:
+            if arc is not None:
+                dataflow.set_initial_marking(arc, dataflow.get_initial_marking(arc) + step)
+            period = dataflow.get_period()
+            if abs(analyzer.get_period() - period) > 1e-6 * period:
+                raise AssertionError("The period of PeriodAnalyzer differs from the one of get_period")
+    finally:
+        analyzer.close()
+        for arc, marking in zip(arcs, markings):
+            dataflow.set_initial_marking(arc, marking)
+
+
 print "Starting basic test !"
 
 print ""
@@ -57,6 +164,14 @@ print "Un-normalized SDF",
 try_function(SDF.un_normalized, [])
 print "Normalized SDF",
 try_function(SDF.normalized, [])
+print "Cyclic SDF generation with the compact backend",
+c_param.set_backend("compact")
+SDF_compact = try_function(generate, ("Test_of_SDFG", c_param))
+c_param.set_backend("networkx")
+print "Compute symbolic execution on a compact SDF",
+try_property(SDF_compact.is_dead_lock)
+print "Analyse the connected components of a SDF",
+try_function(SDF_compact.analyse_components, [("repetition_vector", "dead_lock"), 2])
 
 print "SC1 on a SDF",
 try_function(SDF.compute_initial_marking, ("SC1", False, None, None))
@@ -72,8 +187,20 @@ print "SC1_MIP_k on a SDF",
 try_function(SDF.compute_initial_marking, ("SC1_MIP", False, None, 1))
 print "Computing period on a SDF",
 try_function(SDF.get_period, [])
+print "Compare the period of the maximum cycle ratio on a SDF",
+try_function(check_cycle_ratio, [SDF])
+print "Compute the period of a SDF while its initial markings change",
+try_function(check_period_analyzer, [SDF])
 print "Compute symbolic execution on a SDF",
 try_property(SDF.is_dead_lock)
+print "Compute the throughput of a SDF",
+try_function(SDF.get_throughput, [])
+print "Compare the batched symbolic execution of a SDF",
+try_function(check_batch_start_time, [batch_sdf(1000)])
+print "Compare the batched symbolic execution of a dead locked SDF",
+try_function(check_batch_start_time, [batch_sdf(999)])
+print "Resume the symbolic execution of a SDF",
+try_function(check_resume, [SDF])
 
 print ""
 
@@ -116,8 +243,14 @@ print "SC2_MIP on a CSDF",
 try_function(CSDF.compute_initial_marking, ("SC2_MIP", False, None, None))
 print "SC1_MIP_k on a CSDF",
 try_function(CSDF.compute_initial_marking, ("SC1_MIP", False, None, 1))
+print "Compare the period of the maximum cycle ratio on a CSDF",
+try_function(check_cycle_ratio, [CSDF])
+print "Compute the period of a CSDF while its initial markings change",
+try_function(check_period_analyzer, [CSDF])
 print "Compute symbolic execution on a CSDF",
 try_property(CSDF.is_dead_lock)
+print "Resume the symbolic execution of a CSDF",
+try_function(check_resume, [CSDF])
 
 print ""
 
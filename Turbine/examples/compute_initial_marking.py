@@ -20,7 +20,8 @@ dataflow.compute_initial_marking()  # Compute the minimal initial marking
 # The first one is more efficient on SDF and the second one is more efficient on CSDF and PCG.
 # You can force them with the argument solver_str="SC1" or solver_str="SC2"
 # solver_str=None is to avoid solving the initial marking.
-# solver_str="SC1_MIP" use the solver Gurobi and gives better result than SC1 and SC2 but it cannot handle big graphs
+# solver_str="SC1_MIP" solves SC1 with integer markings and gives better result than SC1 and SC2 but it cannot handle
+# big graphs. The argument lp_backend="GLPK", "HiGHS" or "Gurobi" chooses the solver ("Auto": the fastest installed).
 print dataflow
 print "Is dead lock:", dataflow.is_dead_lock  # Verify if the dataflow is live (Use symbolic execution: can be long on
 # big graphs)
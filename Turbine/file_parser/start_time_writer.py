@@ -0,0 +1,53 @@
+"""
+Stream the firings of the ASAP schedule of a dataflow (see SymbolicExe.iter_start_time) to a file
+as they are computed, so that long schedules are exported in constant memory.
+
+The CSV file has the header line "time,task,phase,iteration" then one line per firing.
+The binary file is a sequence of records of RECORD.size bytes (little-endian):
+start time (double), task (int64), phase (int32), iteration (int64).
+"""
+import csv
+import struct
+
+from Turbine.algorithms.symbolic_exe import SymbolicExe
+
+RECORD = struct.Struct("<dqiq")
+CSV_HEADER = ("time", "task", "phase", "iteration")
+
+
+def write_start_time_file(dataflow, filename, nb_ite=1, binary=False):
+    """Write the firings of the ASAP schedule of the dataflow computed by SymbolicExe.get_start_time(nb_ite)
+    in the order of their start times.
+
+    :type binary: bool, write binary records instead of CSV lines.
+    :return : the number of firings written, or -1 if the execution dead locks
+    (the firings which start before the dead lock is detected are written).
+    """
+    se = SymbolicExe(dataflow)
+    count = 0
+    with open(filename, "wb") as open_file:
+        if binary:
+            pack = RECORD.pack
+            for firing in se.iter_start_time(nb_ite):
+                open_file.write(pack(*firing))
+                count += 1
+        else:
+            writer = csv.writer(open_file)
+            writer.writerow(CSV_HEADER)
+            for firing in se.iter_start_time(nb_ite):
+                writer.writerow(firing)
+                count += 1
+    if se.result == -1:
+        return -1
+    return count
+
+
+def read_start_time_file(filename):
+    """Generate the firings (time, task, phase, iteration) of a binary file of write_start_time_file.
+    """
+    with open(filename, "rb") as open_file:
+        while True:
+            record = open_file.read(RECORD.size)
+            if len(record) < RECORD.size:
+                return
+            yield RECORD.unpack(record)
@@ -43,100 +43,99 @@ def write_tur_file(dataflow, filename):
     open_file.close()
 
 
-def read_tur_file(filename):
+def read_tur_file(filename, backend="networkx"):
     open_file = open(filename, "r")
     name, dataflow_type = __readline(open_file).replace("\n", "").split(" ")
     if dataflow_type == "SDF" or dataflow_type == "SDFG":
-        dataflow = SDF(name)
+        dataflow = SDF(name, backend=backend)
     elif dataflow_type == "CSDF" or dataflow_type == "CSDFG":
-        dataflow = CSDF(name)
+        dataflow = CSDF(name, backend=backend)
     elif dataflow_type == "PCG":
-        dataflow = PCG(name)
+        dataflow = PCG(name, backend=backend)
 
     task_nb, arc_nb = __readline(open_file).split(" ")
+    task_names = []
+    repetition_factors = []
+    duration_lists = []
+    ini_duration_lists = []
     for i in xrange(int(task_nb)):
         line = __readline(open_file).replace("\n", "")
         task_name, repetition_factor, str_duration = line.split(" ")
-        task = dataflow.add_task(task_name)
-        dataflow.set_repetition_factor(task, int(repetition_factor))
+        task_names.append(task_name)
+        repetition_factors.append(int(repetition_factor))
+        ini_duration_list = []
         if ";" in str_duration:
             str_ini_duration, str_duration = str_duration.split(";")
             ini_duration_list = [float(i) for i in str_ini_duration.split(",")]
-            dataflow.set_ini_phase_count(task, len(ini_duration_list))
-            dataflow.set_ini_phase_duration_list(task, ini_duration_list)
-
-        duration_list = [float(i) for i in str_duration.split(",")]
-        if isinstance(dataflow, SDF):
-            dataflow.set_task_duration(task, duration_list[0])
-        if isinstance(dataflow, CSDF):
-            dataflow.set_phase_count(task, len(duration_list))
-            dataflow.set_phase_duration_list(task, duration_list)
-
+        ini_duration_lists.append(ini_duration_list)
+        duration_lists.append([float(i) for i in str_duration.split(",")])
+
+    if isinstance(dataflow, PCG):
+        tasks = dataflow.add_tasks(len(task_names), task_names, duration_lists, ini_duration_lists)
+    elif isinstance(dataflow, CSDF):
+        tasks = dataflow.add_tasks(len(task_names), task_names, duration_lists)
+    else:
+        tasks = dataflow.add_tasks(len(task_names), task_names, [duration_list[0] for duration_list in duration_lists])
+    for task, repetition_factor in zip(tasks, repetition_factors):
+        dataflow.set_repetition_factor(task, repetition_factor)
+
+    sources, targets, m0_list = [], [], []
+    prod_lists, cons_lists, threshold_lists = [], [], []
+    ini_prod_lists, ini_cons_lists, ini_threshold_lists = [], [], []
     for i in xrange(int(arc_nb)):
         line = __readline(open_file).replace("\n", "")
         str_arc, str_m0, str_prod, str_cons = line.split(" ")
         source = dataflow.get_task_by_name(str_arc.split(",")[0][1:])
         target = dataflow.get_task_by_name(str_arc.split(",")[1][:-1])
-        m0 = int(str_m0)
-        arc = dataflow.add_arc(source, target)
-        dataflow.set_initial_marking(arc, m0)
-
-        if "PCG" in dataflow_type:
-            if dataflow.get_ini_phase_count(source) == 0:
-                dataflow.set_ini_prod_rate_list(arc, [])
-            if dataflow.get_ini_phase_count(target) == 0:
-                dataflow.set_ini_cons_rate_list(arc, [])
-                dataflow.set_ini_threshold_list(arc, [])
+        sources.append(source)
+        targets.append(target)
+        m0_list.append(int(str_m0))
 
+        prod_ini = [1] * len(ini_duration_lists[source])
         if ";" in str_prod:
             str_prod_ini, str_prod = str_prod.split(";")
             prod_ini = [int(i) for i in str_prod_ini.split(",")]
-            dataflow.set_ini_prod_rate_list(arc, prod_ini)
-
-        prod = [int(i) for i in str_prod.split(",")]
-        if isinstance(dataflow, SDF):
-            dataflow.set_prod_rate(arc, prod[0])
-        if isinstance(dataflow, CSDF):
-            dataflow.set_prod_rate_list(arc, prod)
+        ini_prod_lists.append(prod_ini)
+        prod_lists.append([int(i) for i in str_prod.split(",")])
 
+        cons_ini = [1] * len(ini_duration_lists[target])
+        ini_threshold = cons_ini
         if ";" in str_cons:
             str_cons_ini, str_cons = str_cons.split(";")
-            str_cons_ini = str_cons_ini.split(",")
-            cons_ini = []
-            ini_threshold = []
-            for value in str_cons_ini:
-                if ":" in value:
-                    value, threshold = value.split(":")
-                    ini_threshold.append(int(threshold))
-                else:
-                    ini_threshold.append(int(value))
-                cons_ini.append(int(value))
-
-            dataflow.set_ini_cons_rate_list(arc, cons_ini)
-            if isinstance(dataflow, PCG):
-                dataflow.set_ini_threshold_list(arc, ini_threshold)
-
-        str_cons = str_cons.split(",")
-        cons = []
-        threshold = []
-        for value in str_cons:
-            if ":" in value:
-                value, threshold_str = value.split(":")
-                threshold.append(int(threshold_str))
-            else:
-                threshold.append(int(value))
-            cons.append(int(value))
-
-        if isinstance(dataflow, SDF):
-            dataflow.set_cons_rate(arc, cons[0])
-        if isinstance(dataflow, CSDF):
-            dataflow.set_cons_rate_list(arc, cons)
-        if isinstance(dataflow, PCG):
-            dataflow.set_threshold_list(arc, threshold)
-
+            cons_ini, ini_threshold = __read_cons(str_cons_ini)
+        ini_cons_lists.append(cons_ini)
+        ini_threshold_lists.append(ini_threshold)
+        cons, threshold = __read_cons(str_cons)
+        cons_lists.append(cons)
+        threshold_lists.append(threshold)
+
+    if isinstance(dataflow, PCG):
+        dataflow.add_arcs(sources, targets, prod_lists, cons_lists, m0_list,
+                          ini_prod_lists, ini_cons_lists, threshold_lists, ini_threshold_lists)
+    elif isinstance(dataflow, CSDF):
+        dataflow.add_arcs(sources, targets, prod_lists, cons_lists, m0_list)
+    else:
+        dataflow.add_arcs(sources, targets, [prod[0] for prod in prod_lists], [cons[0] for cons in cons_lists],
+                          m0_list)
     return dataflow
 
 
+def __read_cons(str_cons):
+    """:return : the consumption list and the threshold list of a string like 3:4,6
+    (when the threshold is equal to its consumption, it is not display).
+    """
+    cons = []
+    threshold = []
+    for value in str_cons.split(","):
+        if ":" in value:
+            value, threshold_str = value.split(":")
+            threshold.append(int(threshold_str))
+        else:
+            threshold.append(int(value))
+        cons.append(int(value))
+    return cons, threshold
+
+
 def __readline(open_file):
     line = open_file.readline()
     while "#" in line:
@@ -29,7 +29,8 @@ def generate(dataflow_name="generated_graph", c_param=None, nx_graph=None):
     compute_initial_marking(dataflow,
                             solver_str=c_param.get_solver(),
                             solver_verbose=c_param.is_solver_verbose(),
-                            lp_filename=c_param.get_lp_filenam())
+                            lp_filename=c_param.get_lp_filenam(),
+                            lp_backend=c_param.get_lp_backend())
     if not c_param.is_normalized():
         dataflow.un_normalized()
     logging.info("Generating done : " + str(time() - start) + "s")
@@ -13,11 +13,11 @@ def generate_dataflow(dataflow_name, c_param, nx_graph=None):
     """Step 1
     """
     if c_param.get_dataflow_type() == "SDF":
-        dataflow = SDF(dataflow_name)
+        dataflow = SDF(dataflow_name, backend=c_param.get_backend())
     if c_param.get_dataflow_type() == "CSDF":
-        dataflow = CSDF(dataflow_name)
+        dataflow = CSDF(dataflow_name, backend=c_param.get_backend())
     if c_param.get_dataflow_type() == "PCG":
-        dataflow = PCG(dataflow_name)
+        dataflow = PCG(dataflow_name, backend=c_param.get_backend())
     if nx_graph is None:
         if c_param.is_acyclic():
             # Generate a connected acyclic graph
@@ -29,10 +29,9 @@ def generate_dataflow(dataflow_name, c_param, nx_graph=None):
             __generate_arcs(dataflow, c_param, task_degree)  # Add arcs
         return dataflow
     else:
-        for node in nx_graph.nodes_iter():
-            dataflow.add_task(name=node)
-        for edge in nx_graph.edges_iter():
-            dataflow.add_arc(source=edge[0], target=edge[1])
+        dataflow.add_tasks(nx_graph.number_of_nodes(), names=nx_graph.nodes())
+        edges = nx_graph.edges()
+        dataflow.add_arcs([edge[0] for edge in edges], [edge[1] for edge in edges])
         return dataflow
 
 
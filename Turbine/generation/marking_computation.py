@@ -1,16 +1,38 @@
 import logging
+import os
+from multiprocessing import Pool, cpu_count
 
 from Turbine.algorithms.solve_SC1 import SolverSC1
 from Turbine.algorithms.solve_SC1_Kc import SolverSC1Kc
 from Turbine.algorithms.solve_SC2 import SolverSC2
 
+SOLVERS = ("Auto", "SC1", "SC2", "SC1_MIP", "SC2_MIP", "None")
+
 
 ########################################################################
 #                           generate preload                           #
 ########################################################################
-def compute_initial_marking(dataflow, solver_str="Auto", solver_verbose=False, lp_filename=None, period=None):
+def compute_initial_marking(dataflow, solver_str="Auto", solver_verbose=False, lp_filename=None, period=None,
+                            lp_backend=None, processes=1, bound_pairs=False, decompose=False):
     """Step 3
+
+    The LP (or the MIP for SC1_MIP and SC2_MIP) is solved by lp_backend (see lp_backend.get_backend).
+    If bound_pairs is True, SC1 replaces the constraints of the pairs of phases of an arc by bounds (see SolverSC1):
+    the LP is smaller with the same optimum, but the markings of the arcs may differ when several optima exist.
+
+    By default a single LP is solved for the whole graph. If decompose is True: the arcs between the strongly
+    connected components of the graph are not on a cycle, they need no initial marking (the schedule of a component
+    can be delayed after the ones before it, so neither the liveness nor the period constrain them). An LP is solved
+    for each component of several tasks, with its own arcs only (the LP of the component k is written in lp_filename
+    with the suffix _k when there are several LPs, no LP is solved for an acyclic graph), in a pool of processes
+    if processes is greater than 1 (None for the number of cpu). The graph stays live, but the markings of the arcs
+    differ from the ones of the single LP: the arcs between the components have no marking.
     """
+    if solver_str not in SOLVERS and solver_str is not None:
+        raise RuntimeError("Wrong solver argument: no solver called.")
+    if solver_str == "SC2_MIP" and period is not None:
+        raise RuntimeError("SC2_MIP with period constraints is not implemented yet.")
+
     coef_vector = None
     if not dataflow.is_normalized:
         coef_vector = dataflow.normalized()
@@ -19,48 +41,91 @@ def compute_initial_marking(dataflow, solver_str="Auto", solver_verbose=False, l
     if solver_str == "None" or solver_str is None:
         return
 
-    elif solver_str == "Auto":
+    components = [dataflow.get_task_list()]
+    if decompose:
+        components = [tasks for tasks in dataflow.get_strongly_connected_components() if len(tasks) > 1]
+    if len(components) == 1 and len(components[0]) == dataflow.get_task_count():  # a single LP
+        __solve(dataflow.freeze(), solver_str, solver_verbose, lp_filename, period, lp_backend, bound_pairs)
+    else:
+        jobs = []
+        arc_maps = []
+        for k, tasks in enumerate(components):
+            subgraph, arc_map = dataflow.subgraph(tasks)
+            component_lp_filename = lp_filename
+            if lp_filename is not None and len(components) > 1:
+                root, extension = os.path.splitext(lp_filename)
+                component_lp_filename = root + "_" + str(k) + extension
+            jobs.append((subgraph, solver_str, solver_verbose, component_lp_filename, period, lp_backend,
+                         bound_pairs))
+            arc_maps.append(arc_map)
+        logging.info("Generating initial marking of " + str(len(jobs)) + " strongly connected components")
+
+        if processes is None:
+            processes = cpu_count()
+        if processes == 1 or len(jobs) <= 1:
+            sub_markings = map(_solve_component, jobs)
+        else:
+            pool = Pool(processes)
+            try:
+                sub_markings = pool.map(_solve_component, jobs, chunksize=max(1, len(jobs) / (4 * processes)))
+            finally:
+                pool.close()
+                pool.join()
+
+        for arc_map, sub_marking in zip(arc_maps, sub_markings):
+            for sub_arc, initial_marking in sub_marking.iteritems():
+                dataflow.set_initial_marking(arc_map[sub_arc], initial_marking)
+
+    m0tot = __calc_reentrant(dataflow)
+    logging.info("Mem tot (reentrant): " + str(m0tot))
+
+    if coef_vector is not None:
+        dataflow.un_normalized(coef_vector)
+
+
+def _solve_component(job):
+    """Worker: compute the initial marking of the subgraph of a strongly connected component.
+
+    :return : dict arc of the subgraph -> initial marking.
+    """
+    subgraph, solver_str, solver_verbose, lp_filename, period, lp_backend, bound_pairs = job
+    __solve(subgraph.freeze(), solver_str, solver_verbose, lp_filename, period, lp_backend, bound_pairs)
+    return dict((arc, subgraph.get_initial_marking(arc)) for arc in subgraph.get_arc_list())
+
+
+def __solve(frozen, solver_str, solver_verbose, lp_filename, period, lp_backend, bound_pairs):
+    # The LP solvers only read the graph and set the initial markings
+    if solver_str == "Auto":
         if period is not None:
-            solver = SolverSC1Kc(dataflow, float(period), solver_verbose, lp_filename)
+            solver = SolverSC1Kc(frozen, float(period), solver_verbose, lp_filename, lp_backend,
+                                 bound_pairs=bound_pairs)
             logging.info("choose solver SC1 Kc")
-        elif __cs2_row_count(dataflow) < __sc1_row_count(dataflow):
-            solver = SolverSC2(dataflow, solver_verbose, lp_filename)
+        elif __cs2_row_count(frozen) < __sc1_row_count(frozen):
+            solver = SolverSC2(frozen, solver_verbose, lp_filename, lp_backend)
             logging.info("choose solver SC2")
         else:
-            solver = SolverSC1(dataflow, solver_verbose, lp_filename)
+            solver = SolverSC1(frozen, solver_verbose, lp_filename, lp_backend, bound_pairs=bound_pairs)
             logging.info("choose solver SC1")
 
     elif solver_str == "SC2":
-        solver = SolverSC2(dataflow, solver_verbose, lp_filename)
+        solver = SolverSC2(frozen, solver_verbose, lp_filename, lp_backend)
     elif solver_str == "SC1":
-        solver = SolverSC1(dataflow, solver_verbose, lp_filename)
+        solver = SolverSC1(frozen, solver_verbose, lp_filename, lp_backend, bound_pairs=bound_pairs)
         if period is not None:
-            solver = SolverSC1Kc(dataflow, period, solver_verbose, lp_filename)
+            solver = SolverSC1Kc(frozen, period, solver_verbose, lp_filename, lp_backend, bound_pairs=bound_pairs)
 
     elif solver_str == "SC1_MIP":
-        from Turbine.algorithms.solve_SC1_Gurobi_MIP import SolveSC1GuMIP
-        from Turbine.algorithms.solve_SC1_Gurobi_MIP_Kc import SolveSC1GuMIPKc
-        solver = SolveSC1GuMIP(dataflow, solver_verbose, lp_filename)
-        if period is not None:
-            solver = SolveSC1GuMIPKc(dataflow, period, solver_verbose, lp_filename)
-    elif solver_str == "SC2_MIP":
-        from Turbine.algorithms.solve_SC2_Gurobi_MIP import SolveSC2GuMIP
-        solver = SolveSC2GuMIP(dataflow, solver_verbose, lp_filename)
+        solver = SolverSC1(frozen, solver_verbose, lp_filename, lp_backend, mip=True, bound_pairs=bound_pairs)
         if period is not None:
-            raise RuntimeError("SC2_MIP with period constraints is not implemented yet.")
-    else:
-        raise RuntimeError("Wrong solver argument: no solver called.")
+            solver = SolverSC1Kc(frozen, period, solver_verbose, lp_filename, lp_backend, mip=True,
+                                 bound_pairs=bound_pairs)
+    else:  # SC2_MIP
+        solver = SolverSC2(frozen, solver_verbose, lp_filename, lp_backend, mip=True)
 
     logging.info("Generating initial marking")
     solver.compute_initial_marking()
-
-    m0tot = __calc_reentrant(dataflow)
-    logging.info("Mem tot (reentrant): " + str(m0tot))
     del solver
 
-    if coef_vector is not None:
-        dataflow.un_normalized(coef_vector)
-
 
 def __cs2_row_count(dataflow):
     f_row_count = dataflow.get_arc_count()
@@ -1,7 +1,16 @@
 from fractions import gcd
 
-from Turbine.graph_classe.dataflow import Dataflow
+from Turbine.graph_classe.dataflow import Dataflow, as_list, graph_property
 from Turbine.algorithms.period_computation import ComputePeriod
+from Turbine.algorithms.rv import InconsistentDataflowError
+
+
+def prefix_sum(rate_list):
+    """:return : the list [0, r0, r0+r1, ..., sum(rate_list)]."""
+    prefix = [0]
+    for rate in rate_list:
+        prefix.append(prefix[-1] + rate)
+    return prefix
 
 
 class CSDF(Dataflow):
@@ -14,13 +23,19 @@ class CSDF(Dataflow):
     # -------------------------Arc-----------------------------------------#
     _CONST_ARC_CONS_RATE_LIST = "cL"
     _CONST_ARC_PROD_RATE_LIST = "pL"
+    # Prefix sums of the rate lists ([0, r0, r0+r1, ..., sum]) and gcd of both sums,
+    # kept up to date by set_cons_rate_list and set_prod_rate_list
+    _CONST_ARC_CONS_RATE_PREFIX = "cPre"
+    _CONST_ARC_PROD_RATE_PREFIX = "pPre"
+    _CONST_ARC_RATE_SUM_GCD = "sGcd"
 
-    def __init__(self, name=""):
+    def __init__(self, name="", backend="networkx"):
         """
 
             :type name: basestring
+            :type backend: str ("networkx" or "compact")
             """
-        super(CSDF, self).__init__(name)
+        super(CSDF, self).__init__(name, backend)
 
     def __str__(self):
         ret = super(CSDF, self).__str__()
@@ -71,6 +86,24 @@ class CSDF(Dataflow):
         self.set_phase_count(new_task, 1)
         return new_task
 
+    def add_tasks(self, count, names=None, phase_duration_lists=None):
+        """Add count tasks in one pass.
+
+        :type count: int
+        :type names: list of str (default "t" + id of the task).
+        :type phase_duration_lists: list of lists (or a 2D numpy array) of phase durations (default [1]).
+        :return : the list of the new tasks.
+        """
+        if phase_duration_lists is None:
+            phase_duration_lists = [[1] for _ in xrange(count)]
+        else:
+            phase_duration_lists = [as_list(duration_list) for duration_list in phase_duration_lists]
+        if len(phase_duration_lists) != count:
+            raise ValueError("The length of the phase duration lists does not match with the number of tasks")
+        tasks = super(CSDF, self).add_tasks(count, names)
+        self._set_task_attributes(tasks, phase_duration_lists, self._CONST_PHASE_DURATION_LIST)
+        return tasks
+
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~GETTER of tasks~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def get_phase_count(self, task):
@@ -100,7 +133,7 @@ class CSDF(Dataflow):
         except KeyError:
             pass
 
-        self.nxg.node[task][self._CONST_PHASE_DURATION_LIST] = [1] * phase_count
+        self._set_task_attribute(task, [1] * phase_count, self._CONST_PHASE_DURATION_LIST)
 
         for arc in self.get_arc_list(target=task):
             self.set_cons_rate_list(arc, [1] * phase_count)
@@ -117,7 +150,7 @@ class CSDF(Dataflow):
         :type phase_duration_list : list the list of phase duration of the task (integer).
         """
         self.__verify_length(task, len(phase_duration_list))
-        self.nxg.node[task][self._CONST_PHASE_DURATION_LIST] = phase_duration_list
+        self._set_task_attribute(task, phase_duration_list, self._CONST_PHASE_DURATION_LIST)
 
     def __verify_length(self, task, length_list):
         """Compare the length of a list and the phase number of a task.
@@ -153,6 +186,43 @@ class CSDF(Dataflow):
         self.__calc_gcd(arc)
         return arc
 
+    def add_arcs(self, sources, targets, prod_rate_lists=None, cons_rate_lists=None, initial_markings=None):
+        """Add one arc for each pair (sources[i], targets[i]) in one pass.
+
+        :type prod_rate_lists: list of lists of integers (default [1] * phase count of the source).
+        :type cons_rate_lists: list of lists of integers (default [1] * phase count of the target).
+        :type initial_markings: list or numpy array of integers (default 0).
+        :return : the list of the new arcs (source, target, key).
+        """
+        sources = as_list(sources)
+        targets = as_list(targets)
+        prod_rate_lists = self._bulk_rate_lists(sources, prod_rate_lists, self.get_phase_count)
+        cons_rate_lists = self._bulk_rate_lists(targets, cons_rate_lists, self.get_phase_count)
+        arcs = super(CSDF, self).add_arcs(sources, targets, initial_markings)
+        self._set_arc_attributes(arcs, prod_rate_lists, self._CONST_ARC_PROD_RATE_LIST)
+        self._set_arc_attributes(arcs, cons_rate_lists, self._CONST_ARC_CONS_RATE_LIST)
+        self._set_arc_attributes(arcs, [reduce(gcd, cons_rate_list) for cons_rate_list in cons_rate_lists],
+                                 self._CONST_ARC_GCD)
+        prod_prefix_lists = [prefix_sum(prod_rate_list) for prod_rate_list in prod_rate_lists]
+        cons_prefix_lists = [prefix_sum(cons_rate_list) for cons_rate_list in cons_rate_lists]
+        self._set_arc_attributes(arcs, prod_prefix_lists, self._CONST_ARC_PROD_RATE_PREFIX)
+        self._set_arc_attributes(arcs, cons_prefix_lists, self._CONST_ARC_CONS_RATE_PREFIX)
+        self._set_arc_attributes(arcs, [gcd(prod_prefix[-1], cons_prefix[-1]) for prod_prefix, cons_prefix
+                                        in zip(prod_prefix_lists, cons_prefix_lists)], self._CONST_ARC_RATE_SUM_GCD)
+        return arcs
+
+    @staticmethod
+    def _bulk_rate_lists(tasks, rate_lists, get_count):
+        """:return : rate_lists as lists of integers, or the default lists [1] * get_count(task),
+        one per task of tasks (the sources or the targets of the new arcs).
+        """
+        if rate_lists is None:
+            return [[1] * get_count(task) for task in tasks]
+        rate_lists = [as_list(rate_list) for rate_list in rate_lists]
+        if len(rate_lists) != len(tasks):
+            raise ValueError("The length of the rate lists does not match with the number of arcs")
+        return rate_lists
+
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~GETTER of arcs~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def get_cons_rate_list(self, arc):
@@ -161,6 +231,27 @@ class CSDF(Dataflow):
     def get_prod_rate_list(self, arc):
         return self._get_arc_attribute(arc, self._CONST_ARC_PROD_RATE_LIST)
 
+    def get_cons_rate_prefix_sum(self, arc):
+        """:return : the list [0, c0, c0+c1, ..., sum(cons_rate_list)] (do not modify it).
+        """
+        return self._get_arc_attribute(arc, self._CONST_ARC_CONS_RATE_PREFIX)
+
+    def get_prod_rate_prefix_sum(self, arc):
+        """:return : the list [0, p0, p0+p1, ..., sum(prod_rate_list)] (do not modify it).
+        """
+        return self._get_arc_attribute(arc, self._CONST_ARC_PROD_RATE_PREFIX)
+
+    def get_cons_rate_sum(self, arc):
+        return self._get_arc_attribute(arc, self._CONST_ARC_CONS_RATE_PREFIX)[-1]
+
+    def get_prod_rate_sum(self, arc):
+        return self._get_arc_attribute(arc, self._CONST_ARC_PROD_RATE_PREFIX)[-1]
+
+    def get_rate_sum_gcd(self, arc):
+        """:return : the gcd between the sum of the production rates and the sum of the consumption rates.
+        """
+        return self._get_arc_attribute(arc, self._CONST_ARC_RATE_SUM_GCD)
+
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~SETTER of arcs~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def set_cons_rate_list(self, arc, cons_rate_list):
@@ -174,7 +265,10 @@ class CSDF(Dataflow):
         :type cons_rate_list: list of integer
         """
         self._set_arc_attribute(arc, cons_rate_list, self._CONST_ARC_CONS_RATE_LIST)
+        self._set_arc_attribute(arc, prefix_sum(cons_rate_list), self._CONST_ARC_CONS_RATE_PREFIX)
+        self._repetition_vector_changed(arc[:2])
         self.__calc_gcd(arc)
+        self.__calc_rate_sum_gcd(arc)
 
     def set_prod_rate_list(self, arc, prod_rate_list):
         """Set the consumption list of an arc.
@@ -187,7 +281,10 @@ class CSDF(Dataflow):
         :type prod_rate_list: list of integer
         """
         self._set_arc_attribute(arc, prod_rate_list, self._CONST_ARC_PROD_RATE_LIST)
+        self._set_arc_attribute(arc, prefix_sum(prod_rate_list), self._CONST_ARC_PROD_RATE_PREFIX)
+        self._repetition_vector_changed(arc[:2])
         self.__calc_gcd(arc)
+        self.__calc_rate_sum_gcd(arc)
 
     def __calc_gcd(self, arc):
         """Calculate the GCD between the consumption weight list and the
@@ -206,6 +303,15 @@ class CSDF(Dataflow):
         except KeyError:
             pass
 
+    def __calc_rate_sum_gcd(self, arc):
+        """Calculate the GCD between the sum of the production rates and the sum of the consumption rates.
+        """
+        try:
+            gcd_v = gcd(self.get_prod_rate_sum(arc), self.get_cons_rate_sum(arc))
+            self._set_arc_attribute(arc, gcd_v, self._CONST_ARC_RATE_SUM_GCD)
+        except KeyError:
+            pass
+
     ########################################################################
     #                           GETTER for the parser                      #
     ########################################################################
@@ -247,14 +353,14 @@ class CSDF(Dataflow):
         result = str([float(i) for i in self.get_phase_duration_list(task)])[1:-1]
         return result.replace(" ", "")
 
-    def get_period(self, start_time=False):
-        coef_vector = None
-        if not self.is_normalized:
-            coef_vector = self.normalized()
-        pc = ComputePeriod(self, lp_filename=None)
+    def get_period(self, start_time=False, method="LP", lp_backend=None):
+        dataflow = self
+        if not self.is_normalized:  # Normalize a copy, the graph itself is left untouched
+            dataflow = self.copy()
+            dataflow.normalized()
+        # "LP" (solved by lp_backend, GLPK by default) or "MCR"
+        pc = ComputePeriod(dataflow.freeze(), lp_filename=None, method=method, lp_backend=lp_backend)
         ret = pc.compute_period()
-        if coef_vector is not None:
-            self.un_normalized(coef_vector)
         if start_time:
             return ret
         return ret[0]
@@ -262,28 +368,22 @@ class CSDF(Dataflow):
     ########################################################################
     #                        PROPERTIES graph                              #
     ########################################################################
-    @property
+    @graph_property
     def is_consistent(self):
         """Return True if the csdf is consistent.
         """
+        try:
+            self.update_repetition_vector()
+        except InconsistentDataflowError:
+            return False
         for arc in self.get_arc_list():
             source_w = sum(self.get_prod_rate_list(arc)) * self.get_repetition_factor(self.get_source(arc))
             target_w = sum(self.get_cons_rate_list(arc)) * self.get_repetition_factor(self.get_target(arc))
             if source_w != target_w:
-                print arc, source_w, target_w
-                print "source", sum(self.get_prod_rate_list(arc)), self.get_repetition_factor(self.get_source(arc))
-                print "target", sum(self.get_cons_rate_list(arc)), self.get_repetition_factor(self.get_target(arc))
-                arc = (41, 0, 0)
-                source_w = sum(self.get_prod_rate_list(arc)) * self.get_repetition_factor(self.get_source(arc))
-                target_w = sum(self.get_cons_rate_list(arc)) * self.get_repetition_factor(self.get_target(arc))
-                print arc, source_w, target_w
-                print "source", sum(self.get_prod_rate_list(arc)), self.get_repetition_factor(self.get_source(arc))
-                print "target", sum(self.get_cons_rate_list(arc)), self.get_repetition_factor(self.get_target(arc))
-
                 return False
         return True
 
-    @property
+    @graph_property
     def is_normalized(self):
         """:return : True if the graph is a normalized
         (i.e. if every adjacent weights of a task (prod or cons) are equal).
@@ -292,6 +392,8 @@ class CSDF(Dataflow):
             try:
                 weight = sum(self.get_prod_rate_list(self.get_arc_list(source=task)[0]))
             except IndexError:
+                if not self.get_arc_list(target=task):  # an isolated task
+                    continue
                 weight = sum(self.get_cons_rate_list(self.get_arc_list(target=task)[0]))
             for arc in self.get_arc_list(source=task):
                 if sum(self.get_prod_rate_list(arc)) != weight:
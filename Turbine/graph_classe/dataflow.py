@@ -1,11 +1,47 @@
 import logging
+from collections import deque
+from functools import wraps
 
 import networkx as nx
 
+from Turbine.algorithms.component_analysis import ANALYSES, analyse_components
 from Turbine.algorithms.normalized import normalized_dataflow, un_normalized_dataflow
-from Turbine.algorithms.rv import compute_rep_vect
+from Turbine.algorithms.rv import InconsistentDataflowError, compute_component_rep_vect
 from Turbine.algorithms.symbolic_exe import SymbolicExe
 from Turbine.generation.marking_computation import compute_initial_marking
+from Turbine.graph_classe.frozen_dataflow import FrozenDataflow
+from Turbine.graph_classe.graph_store import CompactGraphStore, NxGraphStore
+
+
+def graph_property(method):
+    """Read-only property cached until the next modification of the graph.
+
+    The value is stored with the version of the graph (Dataflow._version) it was computed for,
+    every setter and every add/rm of tasks and arcs bump this version.
+    """
+    cache_name = "_cache_" + method.__name__
+
+    @wraps(method)
+    def getter(self):
+        try:
+            version, value = self.__dict__[cache_name]
+            if version == self._version:
+                return value
+        except KeyError:
+            pass
+        value = method(self)
+        self.__dict__[cache_name] = (self._version, value)
+        return value
+
+    return property(getter)
+
+
+def as_list(values):
+    """:return : a python list from a sequence or a numpy array."""
+    try:
+        return values.tolist()
+    except AttributeError:
+        return list(values)
 
 
 class Dataflow(object):
@@ -26,18 +62,36 @@ class Dataflow(object):
     _CONST_ARC_CONS_PORT_NAME = "cPN"
     _CONST_ARC_PROD_PORT_NAME = "pPN"
 
-    def __init__(self, name=""):
+    def __init__(self, name="", backend="networkx"):
         """
 
         :type name: basestring
+        :type backend: str, the storage of tasks and arcs: "networkx" (a networkx MultiDiGraph, default)
+        or "compact" (dense integer ids and arrays, several times smaller for large graphs).
         """
         self.name = name
-        self.nxg = nx.MultiDiGraph(name=name)
+        self.backend = backend
+        if backend == "networkx":
+            self._store = NxGraphStore(name)
+        elif backend == "compact":
+            self._store = CompactGraphStore(int_arc_attributes={self._CONST_ARC_PRELOAD: 0,
+                                                                self._CONST_ARC_TOKEN_SIZE: 1,
+                                                                self._CONST_ARC_GCD: 1})
+        else:
+            raise ValueError("Unknown backend: " + str(backend))
         self.task_key = 0
         self.arc_key = 0
+        self._version = 0  # Bumped by every modification of the graph (see graph_property)
 
         self.taskByName = {}
         self.arcByName = {}
+        # (source, target) -> keys of the arcs from source to target,
+        # built on the first lookup by pair then maintained by add_arc(s)/rm_arc/rm_task
+        self._arcs_by_pair = None
+        self._frozen = None  # Last snapshot returned by freeze()
+        # Tasks whose connected component must be solved again before reading a repetition factor,
+        # None until compute_repetition_vector is called (see update_repetition_vector)
+        self._rv_dirty = None
 
     def __str__(self):
         ret = "Name: " + str(self.name) + "\n"
@@ -64,6 +118,19 @@ class Dataflow(object):
     def set_name(self, name):
         self.name = name
 
+    def get_backend(self):
+        """:return : the storage backend of the graph ("networkx" or "compact").
+        """
+        return self.backend
+
+    @property
+    def nxg(self):
+        """The networkx MultiDiGraph of the dataflow.
+        With the compact backend it is a read-only snapshot built on demand: modifying it raises a NetworkXError,
+        modify the dataflow instead.
+        """
+        return self._store.to_networkx()
+
     def draw(self):
         nx.draw(self.nxg)
         import matplotlib.pyplot as plt
@@ -96,11 +163,41 @@ class Dataflow(object):
         self.task_key += 1
         self.taskByName[name] = new_task
 
-        self.nxg.add_node(new_task)
+        self._store.add_task(new_task)
+        self._version += 1
+        self._repetition_vector_changed((new_task,))
         self.set_task_name(new_task, name)
 
         return new_task
 
+    def add_tasks(self, count, names=None):
+        """Add count tasks in one pass.
+
+        Parameters
+        ----------
+        :type count: int
+        :type names: list of str (default "t" + id of the task).
+
+        :return : the list of the new tasks.
+        """
+        tasks = range(self.task_key, self.task_key + count)
+        if names is None:
+            names = ["t" + str(task) for task in tasks]
+        else:
+            names = as_list(names)
+            self.__verify_bulk_length(count, names)
+        task_by_name = dict(zip(names, tasks))
+        if len(task_by_name) != count or any(name in self.taskByName for name in names):
+            raise ValueError("Name already used by another task")
+
+        self.task_key += count
+        self.taskByName.update(task_by_name)
+        self._store.add_tasks(tasks)
+        self._store.set_task_attributes(tasks, self._CONST_TASK_NAME, names)
+        self._version += 1
+        self._repetition_vector_changed(tasks)
+        return tasks
+
     def rm_task(self, task):
         """Remove a task in the graph and all adjacent arcs.
 
@@ -108,7 +205,14 @@ class Dataflow(object):
         ----------
         task : the id of the task.
         """
-        self.nxg.remove_node(task)
+        if self._arcs_by_pair is not None:
+            for arc in self._store.get_in_arc_list(task) + self._store.get_out_arc_list(task):
+                self.__unindex_arc(arc)
+        if self._rv_dirty is not None:  # The component of the task may be split
+            self._repetition_vector_changed(self._store.get_successors(task) + self._store.get_predecessors(task))
+            self._rv_dirty.discard(task)
+        self._store.rm_task(task)
+        self._version += 1
 
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~GETTER of tasks~~~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -124,7 +228,7 @@ class Dataflow(object):
     def get_task_list(self):
         """Return the list of task of the graph.
         """
-        return self.nxg.nodes()
+        return self._store.get_task_list()
 
     def get_task_name(self, task):
         """:return : the name of a task.
@@ -133,7 +237,7 @@ class Dataflow(object):
         ----------
         :param task: the specific task
         """
-        return self.nxg.node[task][self._CONST_TASK_NAME]
+        return self._store.get_task_attribute(task, self._CONST_TASK_NAME)
 
     @staticmethod
     def get_source(arc):
@@ -171,7 +275,7 @@ class Dataflow(object):
         ----------
         A list a successors.
         """
-        return self.nxg.successors(task)
+        return self._store.get_successors(task)
 
     def get_predecessors(self, task):
         """:return : predecessors of a task.
@@ -180,7 +284,7 @@ class Dataflow(object):
         ----------
         A list a predecessors.
         """
-        return self.nxg.predecessors(task)
+        return self._store.get_predecessors(task)
 
     def get_input_degree(self, task):
         """:return : the input degree of a task.
@@ -189,7 +293,7 @@ class Dataflow(object):
         ----------
         An integer.
         """
-        return self.nxg.in_degree(task)
+        return self._store.get_input_degree(task)
 
     def get_output_degree(self, task):
         """:return : the output degree of a task.
@@ -198,7 +302,7 @@ class Dataflow(object):
         ----------
         An integer.
         """
-        return self.nxg.out_degree(task)
+        return self._store.get_output_degree(task)
 
     def get_repetition_factor(self, task):
         """:return : the repetition factor of a task.
@@ -207,7 +311,9 @@ class Dataflow(object):
         ----------
         An integer.
         """
-        return self.nxg.node[task][self._CONST_TASK_REPETITION_FACTOR]
+        if self._rv_dirty:
+            self.update_repetition_vector()
+        return self._store.get_task_attribute(task, self._CONST_TASK_REPETITION_FACTOR)
 
     def _get_task_attribute(self, task, attrib_name):
         """Get the arc attribute with the attribute name attribName.
@@ -222,7 +328,7 @@ class Dataflow(object):
         the attribute asked.
         """
         try:
-            return self.nxg.node[task][attrib_name]
+            return self._store.get_task_attribute(task, attrib_name)
         except:
             raise KeyError("Attribute " + attrib_name + " of task ref " + str(task) + " not found")
 
@@ -236,7 +342,8 @@ class Dataflow(object):
         task : the task targeted.
         name : the name of the task.
         """
-        self.nxg.node[task][self._CONST_TASK_NAME] = name
+        self._store.set_task_attribute(task, self._CONST_TASK_NAME, name)
+        self._version += 1
         return name
 
     def set_repetition_factor(self, task, repetition_factor):
@@ -247,7 +354,8 @@ class Dataflow(object):
         task : the task targeted.
         repetitionFactor : the new repetition factor (integer).
         """
-        self.nxg.node[task][self._CONST_TASK_REPETITION_FACTOR] = repetition_factor
+        self._store.set_task_attribute(task, self._CONST_TASK_REPETITION_FACTOR, repetition_factor)
+        self._version += 1
 
     def _set_task_attribute(self, task, attrib, attrib_name):
         """Get the arc attribute with the attribute name attribName.
@@ -261,7 +369,13 @@ class Dataflow(object):
         -------
         the attribute asked.
         """
-        self.nxg.node[task][attrib_name] = attrib
+        self._store.set_task_attribute(task, attrib_name, attrib)
+        self._version += 1
+
+    def _set_task_attributes(self, tasks, attribs, attrib_name):
+        """Set the attribute attrib_name of several tasks (same order as tasks)."""
+        self._store.set_task_attributes(tasks, attrib_name, attribs)
+        self._version += 1
 
     ########################################################################
     #                           add/modify arcs                            #
@@ -280,22 +394,79 @@ class Dataflow(object):
         the tuple (source,target, key).
         """
 
-        self.nxg.add_edge(source, target)
-        key = self.nxg.edge[source][target].items()[-1][0]
-        arc = (source, target, key)
+        arc = self._store.add_arc(source, target)
+        self.arc_key += 1
+        if self._arcs_by_pair is not None:
+            self._arcs_by_pair.setdefault((source, target), []).append(arc[2])
+        self._version += 1
+        self._repetition_vector_changed((source, target))
 
         self.set_initial_marking(arc, 0)
         self.set_token_size(arc, 1)
+        # Port names and arc name are not stored until they are set (see their getters)
+
+        return arc  # return the tuple (source, target, key)
 
-        self.set_cons_port_name(arc, "cons" + str(source) + "" + str(target) + "" + str(key))
-        self.set_prod_port_name(arc, "prod" + str(source) + "" + str(target) + "" + str(key))
+    def add_arcs(self, sources, targets, initial_markings=None):
+        """Add one arc for each pair (sources[i], targets[i]) in one pass.
 
-        arc_name = "a" + str(self.arc_key)
-        self.arc_key += 1
+        Parameters
+        ----------
+        :type sources: list or numpy array of tasks.
+        :type targets: list or numpy array of tasks.
+        :type initial_markings: list or numpy array of integers (default 0).
 
-        self.set_arc_name(arc, arc_name)
+        :return : the list of the new arcs (source, target, key).
+        """
+        sources = as_list(sources)
+        targets = as_list(targets)
+        arc_nb = len(sources)
+        self.__verify_bulk_length(arc_nb, targets)
+        if initial_markings is None:
+            initial_markings = [0] * arc_nb
+        else:
+            initial_markings = as_list(initial_markings)
+            self.__verify_bulk_length(arc_nb, initial_markings)
+
+        arcs = self._store.add_arcs(sources, targets)
+        self.arc_key += arc_nb
+        if self._arcs_by_pair is not None:
+            self.__index_arcs(arcs)
+        self._store.set_arc_attributes(arcs, self._CONST_ARC_PRELOAD, initial_markings)
+        self._store.set_arc_attributes(arcs, self._CONST_ARC_TOKEN_SIZE, [1] * arc_nb)
+        self._version += 1
+        self._repetition_vector_changed(sources)
+        return arcs
+
+    def __index_arcs(self, arcs):
+        arcs_by_pair = self._arcs_by_pair
+        for source, target, key in arcs:
+            try:
+                arcs_by_pair[(source, target)].append(key)
+            except KeyError:
+                arcs_by_pair[(source, target)] = [key]
+
+    def __unindex_arc(self, arc):
+        pair = (arc[0], arc[1])
+        keys = self._arcs_by_pair.get(pair)
+        if keys is not None and arc[2] in keys:
+            keys.remove(arc[2])
+            if not keys:
+                del self._arcs_by_pair[pair]
+
+    def _get_arcs_by_pair(self):
+        """:return : the dict (source, target) -> list of arc keys (built on the first call).
+        """
+        if self._arcs_by_pair is None:
+            self._arcs_by_pair = {}
+            self.__index_arcs(self._store.get_arc_list())
+        return self._arcs_by_pair
 
-        return arc  # return the tuple (source, target, key)
+    @staticmethod
+    def __verify_bulk_length(count, values):
+        if len(values) != count:
+            raise ValueError("The length of the list (" + str(len(values)) +
+                             ") does not match with the number of elements (" + str(count) + ")")
 
     def rm_arc(self, arc):
         """Remove an edge (arc of the graph.
@@ -304,7 +475,11 @@ class Dataflow(object):
         ----------
         arc : the arc to remove.
         """
-        self.nxg.remove_edge(arc[0], arc[1], arc[2])
+        self._store.rm_arc(arc)
+        if self._arcs_by_pair is not None:
+            self.__unindex_arc(arc)
+        self._version += 1
+        self._repetition_vector_changed(arc[:2])
 
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~GETTER of arcs~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
@@ -329,7 +504,10 @@ class Dataflow(object):
         arc : tuple (source, destination) or (source, destination, name)
             (default name=lowest unused integer).
         """
-        return self._get_arc_attribute(arc, self._CONST_ARC_NAME)
+        try:
+            return self._get_arc_attribute(arc, self._CONST_ARC_NAME)
+        except KeyError:
+            return "a" + str(self._store.get_arc_index(arc))
 
     def get_arc_list(self, source=None, target=None):
         """:return : an arc according to parameters filled.
@@ -348,14 +526,14 @@ class Dataflow(object):
 
         """
         if source is None and target is not None:  # target is filled, the method returns all input arcs of the target
-            return self.nxg.in_edges(target, keys=True)
+            return self._store.get_in_arc_list(target)
         if source is not None and target is None:  # source is filled, the method returns all output arcs of the source
-            return self.nxg.out_edges(source, keys=True)
+            return self._store.get_out_arc_list(source)
         if source is None and target is None:  # Nothing is filled, the method return all arcs of the graph
-            return self.nxg.edges(keys=True)
+            return self._store.get_arc_list()
         # Both source and target are filled, the method return all arcs
         # with the source has a source and the target has a target.
-        return [x for x in self.nxg.in_edges(target, keys=True) if self.get_source(x) == source]
+        return [(source, target, key) for key in self._get_arcs_by_pair().get((source, target), ())]
 
     def get_initial_marking(self, arc):
         """:return : the initial marking of an arc.
@@ -395,7 +573,11 @@ class Dataflow(object):
         arc : tuple (source, destination) or (source, destination, name)
             (default name=lowest unused integer).
         """
-        return self._get_arc_attribute(arc, self._CONST_ARC_CONS_PORT_NAME)
+        try:
+            return self._get_arc_attribute(arc, self._CONST_ARC_CONS_PORT_NAME)
+        except KeyError:
+            self._store.get_arc_index(arc)  # Raise a KeyError if the arc does not exist
+            return "cons" + str(arc[0]) + str(arc[1]) + str(arc[2])
 
     def get_prod_port_name(self, arc):
         """:return : the production port name of an arc. This is used only for sdf3 files.
@@ -405,7 +587,11 @@ class Dataflow(object):
         arc : tuple (source, destination) or (source, destination, name)
             (default name=lowest unused integer).
         """
-        return self._get_arc_attribute(arc, self._CONST_ARC_PROD_PORT_NAME)
+        try:
+            return self._get_arc_attribute(arc, self._CONST_ARC_PROD_PORT_NAME)
+        except KeyError:
+            self._store.get_arc_index(arc)  # Raise a KeyError if the arc does not exist
+            return "prod" + str(arc[0]) + str(arc[1]) + str(arc[2])
 
     def get_gcd(self, arc):
         return self._get_arc_attribute(arc, self._CONST_ARC_GCD)
@@ -423,7 +609,7 @@ class Dataflow(object):
         the attribute asked.
         """
         try:
-            return self.nxg[arc[0]][arc[1]][arc[2]][attrib_name]
+            return self._store.get_arc_attribute(arc, attrib_name)
         except:
             raise KeyError("Attribute " + attrib_name + " of arc ref " + str(arc) + " not found")
 
@@ -505,7 +691,13 @@ class Dataflow(object):
         attrib : (integer) the value of the attribute.
         attribName : (string) the attribute name.
         """
-        self.nxg[arc[0]][arc[1]][arc[2]][attrib_name] = attrib
+        self._store.set_arc_attribute(arc, attrib_name, attrib)
+        self._version += 1
+
+    def _set_arc_attributes(self, arcs, attribs, attrib_name):
+        """Set the attribute attrib_name of several arcs (same order as arcs)."""
+        self._store.set_arc_attributes(arcs, attrib_name, attribs)
+        self._version += 1
 
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~PROPERTIES of arcs~~~~~~~~~~~~~~~~~~~~~~~ #
@@ -527,12 +719,12 @@ class Dataflow(object):
     def get_task_count(self):
         """:return : the number of task of the graph.
         """
-        return self.nxg.number_of_nodes()
+        return self._store.get_task_count()
 
     def get_arc_count(self):
         """:return : the number of arc of the graph.
         """
-        return self.nxg.number_of_edges()
+        return self._store.get_arc_count()
 
     def get_name(self):
         """:return : the name of the graph.
@@ -555,7 +747,8 @@ class Dataflow(object):
     ########################################################################
     #                        Graph Transformations                         #
     ########################################################################
-    def compute_initial_marking(self, solver_str="Auto", solver_verbose=False, lp_filename=None, period=None):
+    def compute_initial_marking(self, solver_str="Auto", solver_verbose=False, lp_filename=None, period=None,
+                                lp_backend=None, processes=1, bound_pairs=False, decompose=False):
         """Generate the initial marking of the graph such that it's became alive.
         Initial marking computation is handle by GLPK (freeware) a linear solver or GUROBI (free for university).
 
@@ -567,12 +760,77 @@ class Dataflow(object):
         :type solver_verbose: bool, if True the terminal will show GLPK informations.
         :type lp_filename: str, if not None, the solver will write the linear program used to compute initial marking.
         :type period: int,
+        :type lp_backend: str, the LP solver: "GLPK", "HiGHS", "Gurobi" or "Auto" for the fastest one installed
+        (GLPK by default, see algorithms.lp_backend). SC1_MIP and SC2_MIP solve the MIP by this solver.
+        :type processes: int, if decompose is True the LPs of the components are solved in a pool of this number
+        of processes (None for the number of cpu).
+        :type bound_pairs: bool, if True SC1 replaces the constraints of the pairs of phases of an arc by bounds:
+        a smaller LP with the same optimum, the markings of the arcs may differ when several optima exist.
+        :type decompose: bool, if True an LP is solved for each strongly connected component of the graph (the arcs
+        between them need no initial marking): smaller LPs, but the markings of the arcs differ from the ones of
+        the LP of the whole graph.
         """
         compute_initial_marking(self, solver_str=solver_str, solver_verbose=solver_verbose,
-                                lp_filename=lp_filename, period=period)
+                                lp_filename=lp_filename, period=period, lp_backend=lp_backend, processes=processes,
+                                bound_pairs=bound_pairs, decompose=decompose)
+
+    def analyse_components(self, analyses=ANALYSES, processes=None, solver_str="Auto"):
+        """Run the analyses (repetition vector, initial marking, dead lock and period) on each weakly connected
+        component of the graph in a pool of processes, the repetition factors and initial markings computed
+        are set in the graph (see algorithms.component_analysis.analyse_components).
+
+        :return : the list of the results of each component.
+        """
+        return analyse_components(self, analyses=analyses, processes=processes, solver_str=solver_str)
 
     def compute_repetition_vector(self):
-        return compute_rep_vect(self)
+        """Compute the repetition factor of every task, then keep them up to date: after a change of rates
+        or of arcs, only the connected components concerned are solved again (see update_repetition_vector).
+
+        :return : the list of repetition factors (in the order of get_task_list())
+        or False if the graph is not consistent (the unbalanced cycle is logged). The inconsistent component
+        stays to be solved: is_consistent is False and reading its repetition factors raises
+        InconsistentDataflowError until its rates are fixed.
+        """
+        self._rv_dirty = set(self.get_task_list())
+        try:
+            self.update_repetition_vector()
+        except InconsistentDataflowError as error:
+            logging.error(str(error))
+            return False
+        return [self.get_repetition_factor(task) for task in self.get_task_list()]
+
+    def update_repetition_vector(self):
+        """Solve again the connected components modified since the repetition factors were computed
+        (nothing is done before the first call of compute_repetition_vector).
+
+        :raise InconsistentDataflowError: if the rates of a modified component are not balanced,
+        the error gives the unbalanced cycle. It is raised again, by every read of a repetition factor,
+        until the rates of the component are fixed.
+        """
+        if not self._rv_dirty:
+            return
+        dirty = self._rv_dirty
+        self._rv_dirty = set()
+        while dirty:
+            task = dirty.pop()
+            try:
+                repetition_vector = compute_component_rep_vect(self, task)
+            except InconsistentDataflowError:
+                dirty.add(task)
+                self._rv_dirty = dirty
+                self._version += 1
+                raise
+            self._store.set_task_attributes(repetition_vector.keys(), self._CONST_TASK_REPETITION_FACTOR,
+                                            repetition_vector.values())
+            dirty.difference_update(repetition_vector)
+        self._version += 1
+
+    def _repetition_vector_changed(self, tasks):
+        """Mark the components of tasks to be solved again (if the repetition factors are kept up to date).
+        """
+        if self._rv_dirty is not None:
+            self._rv_dirty.update(tasks)
 
     def normalized(self, vect=None):
         return normalized_dataflow(self, coef_vector=vect)
@@ -580,6 +838,30 @@ class Dataflow(object):
     def un_normalized(self, coef_vector=None):
         return un_normalized_dataflow(self, coef_vector=coef_vector)
 
+    def copy(self):
+        """Return a clone of the graph (same tasks, arcs and attributes) that can be modified
+        without modifying this graph. Attribute values are shared until they are set again:
+        with the compact backend the whole store is copy-on-write.
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        clone._store = self._store.copy()
+        clone.taskByName = dict(self.taskByName)
+        clone.arcByName = dict(self.arcByName)
+        clone._arcs_by_pair = None
+        clone._frozen = None
+        if self._rv_dirty is not None:
+            clone._rv_dirty = set(self._rv_dirty)
+        return clone
+
+    def freeze(self):
+        """Return a read-only snapshot of the graph (see FrozenDataflow) that the analysis algorithms accept
+        in place of the graph. The snapshot is reused until the graph is modified.
+        """
+        if self._frozen is None or self._frozen.version != self._version:
+            self._frozen = FrozenDataflow(self)
+        return self._frozen
+
     def del_initial_marking(self):
         """Set all initial marking to zero.
         """
@@ -589,18 +871,120 @@ class Dataflow(object):
     ########################################################################
     #                        PROPERTIES graph                              #
     ########################################################################
-    @property
+    def get_connected_components(self):
+        """:return : the list of the weakly connected components of the graph (each one a list of tasks).
+        """
+        components = []
+        visited = set()
+        for task in self.get_task_list():
+            if task in visited:
+                continue
+            visited.add(task)
+            component = [task]
+            queue = deque([task])
+            while queue:
+                current = queue.popleft()
+                for neighbor in self._store.get_successors(current) + self._store.get_predecessors(current):
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        component.append(neighbor)
+                        queue.append(neighbor)
+            components.append(component)
+        return components
+
+    def get_strongly_connected_components(self):
+        """:return : the list of the strongly connected components of the graph (each one a list of tasks),
+        in reverse topological order (Tarjan's algorithm).
+        """
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        components = []
+        for root in self.get_task_list():
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            path = [(root, iter(self._store.get_successors(root)))]
+            while path:
+                task, successors = path[-1]
+                for successor in successors:
+                    if successor not in index:
+                        index[successor] = low[successor] = len(index)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        path.append((successor, iter(self._store.get_successors(successor))))
+                        break
+                    if successor in on_stack:
+                        low[task] = min(low[task], index[successor])
+                else:
+                    path.pop()
+                    if path:
+                        parent = path[-1][0]
+                        low[parent] = min(low[parent], low[task])
+                    if low[task] == index[task]:
+                        component = []
+                        member = None
+                        while member != task:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                        components.append(component)
+        return components
+
+    def subgraph(self, tasks):
+        """Build a new graph (same type and backend) with the tasks and the arcs between them.
+        The task i of the new graph is tasks[i], names, durations, rates, initial markings and
+        repetition factors are copied.
+
+        :return : the new graph and the dict arc of the new graph -> arc of this graph.
+        """
+        task_rank = dict((task, rank) for rank, task in enumerate(tasks))
+        arcs = [arc for task in tasks for arc in self.get_arc_list(source=task) if arc[1] in task_rank]
+        sources = [task_rank[arc[0]] for arc in arcs]
+        targets = [task_rank[arc[1]] for arc in arcs]
+        names = [self.get_task_name(task) for task in tasks]
+        initial_markings = [self.get_initial_marking(arc) for arc in arcs]
+
+        graph = self.__class__(self.name, backend=self.backend)
+        if self.is_pcg:
+            graph.add_tasks(len(tasks), names, [self.get_phase_duration_list(task) for task in tasks],
+                            [self.get_ini_phase_duration_list(task) for task in tasks])
+            sub_arcs = graph.add_arcs(sources, targets, [self.get_prod_rate_list(arc) for arc in arcs],
+                                      [self.get_cons_rate_list(arc) for arc in arcs], initial_markings,
+                                      [self.get_ini_prod_rate_list(arc) for arc in arcs],
+                                      [self.get_ini_cons_rate_list(arc) for arc in arcs],
+                                      [self.get_threshold_list(arc) for arc in arcs],
+                                      [self.get_ini_threshold_list(arc) for arc in arcs])
+        elif self.is_csdf:
+            graph.add_tasks(len(tasks), names, [self.get_phase_duration_list(task) for task in tasks])
+            sub_arcs = graph.add_arcs(sources, targets, [self.get_prod_rate_list(arc) for arc in arcs],
+                                      [self.get_cons_rate_list(arc) for arc in arcs], initial_markings)
+        else:
+            graph.add_tasks(len(tasks), names, [self.get_task_duration(task) for task in tasks])
+            sub_arcs = graph.add_arcs(sources, targets, [self.get_prod_rate(arc) for arc in arcs],
+                                      [self.get_cons_rate(arc) for arc in arcs], initial_markings)
+        graph._set_arc_attributes(sub_arcs, [self.get_token_size(arc) for arc in arcs], self._CONST_ARC_TOKEN_SIZE)
+        try:
+            graph._set_task_attributes(range(len(tasks)), [self.get_repetition_factor(task) for task in tasks],
+                                       self._CONST_TASK_REPETITION_FACTOR)
+        except (KeyError, InconsistentDataflowError):  # Repetition factors not computed or inconsistent component
+            pass
+        return graph, dict(zip(sub_arcs, arcs))
+
+    @graph_property
     def is_multi_graph(self):
         """:return : True if the graph is a multi-graph
         (i.e. if there exist two arc from a task to another).
         """
-        for arc in self.get_arc_list():
-            source, target = self.get_source(arc), self.get_target(arc)
-            if len(self.get_arc_list(source=source, target=target)) > 1:
+        for keys in self._get_arcs_by_pair().itervalues():
+            if len(keys) > 1:
                 return True
         return False
 
-    @property
+    @graph_property
     def is_reentrant(self):
         """:return : True if the graph is re-entrant
         (i.e. if there is at least one arc such as the source and the target are the same task)
@@ -610,38 +994,63 @@ class Dataflow(object):
                 return True
         return False
 
-    @property
+    @graph_property
     def is_cyclic(self):
         """:return : True if the graph has cycle (reentrant arcs are not considerate as cycle).
         """
         if self.is_reentrant:
             return True
-        return not nx.is_directed_acyclic_graph(self.nxg)
+        return not self._store.is_directed_acyclic()
         # return max(len(cc) for cc in nx.strongly_connected_components(self.nxg)) > 1
 
-    @property
+    @graph_property
     def is_bounded(self):
         """
 
         :return: True if for every arc its backward (back pressure) arc exist
         """
-        for arc in self.get_arc_list():
-            task1 = self.get_source(arc)
-            task2 = self.get_target(arc)
-            l1 = len(self.get_arc_list(source=task1, target=task2))
-            l2 = len(self.get_arc_list(source=task2, target=task1))
-            if l1 == 1 and l2 == 0:
-                return False
-            if l2 == 1 and l1 == 0:
+        arcs_by_pair = self._get_arcs_by_pair()
+        for (task1, task2), keys in arcs_by_pair.iteritems():
+            if len(keys) == 1 and (task2, task1) not in arcs_by_pair:
                 return False
         return True
 
+    def get_throughput(self, capacities=None):
+        """Find the periodic regime of the self-timed execution of the graph (see SymbolicExe.get_throughput).
+
+        When the graph is not strongly connected, the tokens of the arcs between its strongly connected
+        components can grow without bound: the throughput is then the minimum of the throughputs
+        of its components executed alone, the transient and the critical tasks are those of the slowest ones.
+
+        :type capacities: dict arc -> capacity of the bounded arcs (see SymbolicExe), the graph is then
+        executed as a whole.
+        :return : (throughput, transient, critical_tasks) the exact number of graph iterations per time unit
+        (a Fraction, float("inf") when the phases of the regime have no duration), the time at which
+        the periodic regime starts and the sorted list of the critical tasks.
+        """
+        if capacities:
+            return SymbolicExe(self.freeze(), capacities).get_throughput()
+        components = self.get_strongly_connected_components()
+        if len(components) <= 1:
+            return SymbolicExe(self.freeze()).get_throughput()
+        throughput = None
+        for tasks in components:
+            subgraph, _ = self.subgraph(tasks)
+            sub_throughput, sub_transient, sub_critical_tasks = SymbolicExe(subgraph.freeze()).get_throughput()
+            sub_critical_tasks = [tasks[task] for task in sub_critical_tasks]
+            if throughput is None or sub_throughput < throughput:
+                throughput, transient, critical_tasks = sub_throughput, sub_transient, sub_critical_tasks
+            elif sub_throughput == throughput:
+                transient = max(transient, sub_transient)
+                critical_tasks.extend(sub_critical_tasks)
+        return throughput, transient, sorted(critical_tasks)
+
     @property
     def is_dead_lock(self):
         """
         :return: True if the dataflow is dead lock
         """
-        se = SymbolicExe(self)
+        se = SymbolicExe(self.freeze())
         if se.execute() == 0:
             return False
         return True
@@ -0,0 +1,353 @@
+from array import array
+from fractions import gcd
+from functools import wraps
+
+from Turbine.algorithms.rv import InconsistentDataflowError
+
+
+def snapshot_property(method):
+    """Read-only property of the snapshot, computed on the first access then kept
+    (the snapshot can not be modified).
+    """
+    cache_name = "_cache_" + method.__name__
+
+    @wraps(method)
+    def getter(self):
+        try:
+            return self.__dict__[cache_name]
+        except KeyError:
+            value = self.__dict__[cache_name] = method(self)
+            return value
+
+    return property(getter)
+
+
+class FrozenDataflow(object):
+    """Read-only snapshot of a dataflow returned by Dataflow.freeze().
+
+    The snapshot has the same getters as the dataflow it comes from, so the analysis algorithms
+    (compute_rep_vect, SymbolicExe, ComputePeriod, SolverSC1, SolverSC2) accept it in place of the graph,
+    but every value is read from lists filled once instead of from the graph store.
+
+    Tasks and arcs are numbered by contiguous indexes (their rank in get_task_list() and get_arc_list()):
+    arc_source and arc_target give the task index of both ends of each arc,
+    in_arcs and out_arcs the input and output arcs of each task.
+    The graph properties (is_cyclic, is_bounded...) are computed from the snapshot on their first access.
+
+    The graph structure and the rates can not be modified. The initial markings and the repetition factors,
+    which are the results of the analyses, are written back to the original dataflow.
+    """
+
+    def __init__(self, dataflow):
+        """
+
+        :type dataflow: Dataflow
+        """
+        self.dataflow = dataflow
+        self.name = dataflow.get_name()
+        self.__type = dataflow.get_dataflow_type()
+        self.is_sdf = dataflow.is_sdf
+        self.is_csdf = dataflow.is_csdf
+        self.is_pcg = dataflow.is_pcg
+
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~Tasks~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+        self.tasks = list(dataflow.get_task_list())
+        self.task_index = dict((task, i) for i, task in enumerate(self.tasks))
+        self.task_names = [dataflow.get_task_name(task) for task in self.tasks]
+        self.repetition_factors = [self.__get_or_none(dataflow.get_repetition_factor, task) for task in self.tasks]
+
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~Arcs~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
+        self.arcs = list(dataflow.get_arc_list())
+        self.arc_index = dict((arc, i) for i, arc in enumerate(self.arcs))
+        task_index = self.task_index
+        self.arc_source = array("l", [task_index[arc[0]] for arc in self.arcs])
+        self.arc_target = array("l", [task_index[arc[1]] for arc in self.arcs])
+        self.in_arcs = [[] for _ in self.tasks]
+        self.out_arcs = [[] for _ in self.tasks]
+        self.__arcs_by_pair = {}
+        for arc, source, target in zip(self.arcs, self.arc_source, self.arc_target):
+            self.out_arcs[source].append(arc)
+            self.in_arcs[target].append(arc)
+            self.__arcs_by_pair.setdefault((arc[0], arc[1]), []).append(arc)
+        self.initial_markings = [dataflow.get_initial_marking(arc) for arc in self.arcs]
+        self.token_sizes = [dataflow.get_token_size(arc) for arc in self.arcs]
+        self.gcds = [dataflow.get_gcd(arc) for arc in self.arcs]
+
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~Phases and rates~~~~~~~~~~~~~~~~~~~~~ #
+        if self.is_sdf:
+            self.durations = [dataflow.get_task_duration(task) for task in self.tasks]
+            self.phase_duration_lists = [[duration] for duration in self.durations]
+            self.prod_rate_lists = [[dataflow.get_prod_rate(arc)] for arc in self.arcs]
+            self.cons_rate_lists = [[dataflow.get_cons_rate(arc)] for arc in self.arcs]
+            self.prod_prefix_sums = [[0, rate_list[0]] for rate_list in self.prod_rate_lists]
+            self.cons_prefix_sums = [[0, rate_list[0]] for rate_list in self.cons_rate_lists]
+        else:
+            self.phase_duration_lists = [dataflow.get_phase_duration_list(task) for task in self.tasks]
+            self.prod_rate_lists = [dataflow.get_prod_rate_list(arc) for arc in self.arcs]
+            self.cons_rate_lists = [dataflow.get_cons_rate_list(arc) for arc in self.arcs]
+            self.prod_prefix_sums = [dataflow.get_prod_rate_prefix_sum(arc) for arc in self.arcs]
+            self.cons_prefix_sums = [dataflow.get_cons_rate_prefix_sum(arc) for arc in self.arcs]
+        self.phase_counts = array("l", [len(duration_list) for duration_list in self.phase_duration_lists])
+
+        if self.is_pcg:
+            self.ini_phase_duration_lists = [dataflow.get_ini_phase_duration_list(task) for task in self.tasks]
+            self.ini_prod_rate_lists = [dataflow.get_ini_prod_rate_list(arc) for arc in self.arcs]
+            self.ini_cons_rate_lists = [dataflow.get_ini_cons_rate_list(arc) for arc in self.arcs]
+            self.threshold_lists = [dataflow.get_threshold_list(arc) for arc in self.arcs]
+            self.ini_threshold_lists = [dataflow.get_ini_threshold_list(arc) for arc in self.arcs]
+            self.ini_phase_counts = array("l", [len(duration_list) for duration_list in self.ini_phase_duration_lists])
+        # Read at the end: reading the repetition factors may update them (see Dataflow.update_repetition_vector)
+        self.version = dataflow._version
+
+    def __str__(self):
+        return "Frozen " + self.__type + ": " + str(self.name) + " (" + str(len(self.tasks)) + " tasks, " + str(
+            len(self.arcs)) + " arcs)"
+
+    @staticmethod
+    def __get_or_none(getter, key):
+        try:
+            return getter(key)
+        except (KeyError, InconsistentDataflowError):  # Not computed or inconsistent component
+            return None
+
+    def freeze(self):
+        return self
+
+    def get_dataflow_type(self):
+        return self.__type
+
+    def get_name(self):
+        return self.name
+
+    ########################################################################
+    #                           Tasks                                      #
+    ########################################################################
+    def get_task_list(self):
+        return self.tasks
+
+    def get_task_count(self):
+        return len(self.tasks)
+
+    def get_task_name(self, task):
+        return self.task_names[self.task_index[task]]
+
+    def get_successors(self, task):
+        """:return : the successors of the task, once each even on a multi-graph (as networkx).
+        """
+        return self.__unique([arc[1] for arc in self.out_arcs[self.task_index[task]]])
+
+    def get_predecessors(self, task):
+        """:return : the predecessors of the task, once each even on a multi-graph (as networkx).
+        """
+        return self.__unique([arc[0] for arc in self.in_arcs[self.task_index[task]]])
+
+    @staticmethod
+    def __unique(tasks):
+        seen = set()
+        return [task for task in tasks if not (task in seen or seen.add(task))]
+
+    def get_input_degree(self, task):
+        return len(self.in_arcs[self.task_index[task]])
+
+    def get_output_degree(self, task):
+        return len(self.out_arcs[self.task_index[task]])
+
+    def get_repetition_factor(self, task):
+        repetition_factor = self.repetition_factors[self.task_index[task]]
+        if repetition_factor is None:
+            raise KeyError(task)
+        return repetition_factor
+
+    def get_task_duration(self, task):
+        return self.durations[self.task_index[task]]
+
+    def get_phase_count(self, task):
+        return self.phase_counts[self.task_index[task]]
+
+    def get_phase_duration_list(self, task):
+        return self.phase_duration_lists[self.task_index[task]]
+
+    def get_ini_phase_count(self, task):
+        return self.ini_phase_counts[self.task_index[task]]
+
+    def get_ini_phase_duration_list(self, task):
+        return self.ini_phase_duration_lists[self.task_index[task]]
+
+    def set_repetition_factor(self, task, repetition_factor):
+        """Set the repetition factor of a task in the snapshot and in the original dataflow.
+        """
+        self.__check_version()
+        self.dataflow.set_repetition_factor(task, repetition_factor)
+        self.repetition_factors[self.task_index[task]] = repetition_factor
+        self.version = self.dataflow._version
+
+    ########################################################################
+    #                           Arcs                                       #
+    ########################################################################
+    @staticmethod
+    def get_source(arc):
+        return arc[0]
+
+    @staticmethod
+    def get_target(arc):
+        return arc[1]
+
+    def get_arc_list(self, source=None, target=None):
+        """:return : all arcs, the output arcs of the source, the input arcs of the target
+        or the arcs from the source to the target (do not modify the list).
+        """
+        if source is None and target is not None:
+            return self.in_arcs[self.task_index[target]]
+        if source is not None and target is None:
+            return self.out_arcs[self.task_index[source]]
+        if source is None and target is None:
+            return self.arcs
+        return self.__arcs_by_pair.get((source, target), [])
+
+    def get_arc_count(self):
+        return len(self.arcs)
+
+    def is_arc_reentrant(self, arc):
+        return arc[0] == arc[1]
+
+    def get_initial_marking(self, arc):
+        return self.initial_markings[self.arc_index[arc]]
+
+    def get_token_size(self, arc):
+        return self.token_sizes[self.arc_index[arc]]
+
+    def get_initial_marking_size(self, arc):
+        arc_index = self.arc_index[arc]
+        return self.initial_markings[arc_index] * self.token_sizes[arc_index]
+
+    def get_gcd(self, arc):
+        return self.gcds[self.arc_index[arc]]
+
+    def get_prod_rate(self, arc):
+        return self.prod_rate_lists[self.arc_index[arc]][0]
+
+    def get_cons_rate(self, arc):
+        return self.cons_rate_lists[self.arc_index[arc]][0]
+
+    def get_prod_rate_list(self, arc):
+        return self.prod_rate_lists[self.arc_index[arc]]
+
+    def get_cons_rate_list(self, arc):
+        return self.cons_rate_lists[self.arc_index[arc]]
+
+    def get_prod_rate_prefix_sum(self, arc):
+        return self.prod_prefix_sums[self.arc_index[arc]]
+
+    def get_cons_rate_prefix_sum(self, arc):
+        return self.cons_prefix_sums[self.arc_index[arc]]
+
+    def get_prod_rate_sum(self, arc):
+        return self.prod_prefix_sums[self.arc_index[arc]][-1]
+
+    def get_cons_rate_sum(self, arc):
+        return self.cons_prefix_sums[self.arc_index[arc]][-1]
+
+    def get_rate_sum_gcd(self, arc):
+        arc_index = self.arc_index[arc]
+        return gcd(self.prod_prefix_sums[arc_index][-1], self.cons_prefix_sums[arc_index][-1])
+
+    def get_ini_prod_rate_list(self, arc):
+        return self.ini_prod_rate_lists[self.arc_index[arc]]
+
+    def get_ini_cons_rate_list(self, arc):
+        return self.ini_cons_rate_lists[self.arc_index[arc]]
+
+    def get_threshold_list(self, arc):
+        return self.threshold_lists[self.arc_index[arc]]
+
+    def get_ini_threshold_list(self, arc):
+        return self.ini_threshold_lists[self.arc_index[arc]]
+
+    def get_tot_initial_marking(self):
+        return sum(self.initial_markings)
+
+    def set_initial_marking(self, arc, initial_marking):
+        """Set the initial marking of an arc in the snapshot and in the original dataflow.
+        """
+        self.__check_version()
+        self.dataflow.set_initial_marking(arc, initial_marking)
+        self.initial_markings[self.arc_index[arc]] = initial_marking
+        self.version = self.dataflow._version
+
+    def __check_version(self):
+        if self.version != self.dataflow._version:
+            raise RuntimeError("The dataflow has been modified since it was frozen")
+
+    ########################################################################
+    #                        PROPERTIES graph                              #
+    ########################################################################
+    @snapshot_property
+    def is_multi_graph(self):
+        """:return : True if the graph is a multi-graph
+        (i.e. if there exist two arc from a task to another).
+        """
+        return any(len(arcs) > 1 for arcs in self.__arcs_by_pair.itervalues())
+
+    @snapshot_property
+    def is_reentrant(self):
+        """:return : True if the graph is re-entrant
+        (i.e. if there is at least one arc such as the source and the target are the same task)
+        """
+        return any(source == target for source, target in zip(self.arc_source, self.arc_target))
+
+    @snapshot_property
+    def is_cyclic(self):
+        """:return : True if the graph has cycle (reentrant arcs are not considerate as cycle).
+        """
+        if self.is_reentrant:
+            return True
+        # Kahn's algorithm on the task indexes
+        in_degrees = [len(arcs) for arcs in self.in_arcs]
+        ready = [t for t in xrange(len(self.tasks)) if in_degrees[t] == 0]
+        visited = 0
+        while ready:
+            t = ready.pop()
+            visited += 1
+            for arc in self.out_arcs[t]:
+                target = self.task_index[arc[1]]
+                in_degrees[target] -= 1
+                if in_degrees[target] == 0:
+                    ready.append(target)
+        return visited != len(self.tasks)
+
+    @snapshot_property
+    def is_bounded(self):
+        """:return: True if for every arc its backward (back pressure) arc exist
+        """
+        arcs_by_pair = self.__arcs_by_pair
+        for (task1, task2), arcs in arcs_by_pair.iteritems():
+            if len(arcs) == 1 and (task2, task1) not in arcs_by_pair:
+                return False
+        return True
+
+    @snapshot_property
+    def is_normalized(self):
+        """:return : True if the graph is a normalized
+        (i.e. if every adjacent weights of a task (prod or cons) are equal).
+        """
+        for t in xrange(len(self.tasks)):
+            weights = [self.prod_prefix_sums[self.arc_index[arc]][-1] for arc in self.out_arcs[t]]
+            weights += [self.cons_prefix_sums[self.arc_index[arc]][-1] for arc in self.in_arcs[t]]
+            if weights and weights.count(weights[0]) != len(weights):
+                return False
+        return True
+
+    @property
+    def is_consistent(self):
+        """:return True if the repetition factors balance the production and the consumption of every arc
+        (False if a repetition factor is not known, e.g. the one of a task of an inconsistent component).
+        """
+        repetition_factors = self.repetition_factors
+        if None in repetition_factors:
+            return False
+        for arc_index in xrange(len(self.arcs)):
+            source_w = self.prod_prefix_sums[arc_index][-1] * repetition_factors[self.arc_source[arc_index]]
+            target_w = self.cons_prefix_sums[arc_index][-1] * repetition_factors[self.arc_target[arc_index]]
+            if source_w != target_w:
+                return False
+        return True
@@ -0,0 +1,561 @@
+from array import array
+from itertools import izip
+
+import networkx as nx
+import numpy
+
+
+class NxGraphStore(object):
+    """Store tasks and arcs of a dataflow in a networkx MultiDiGraph (default backend).
+
+    Every task and arc attribute lives in the networkx attribute dicts.
+    """
+    __CONST_ARC_INDEX = "aIdx"
+
+    def __init__(self, name=""):
+        """
+
+        :type name: basestring
+        """
+        self.nxg = nx.MultiDiGraph(name=name)
+        self.__arc_index = 0  # Number of arcs created
+
+    ########################################################################
+    #                           tasks                                      #
+    ########################################################################
+    def add_task(self, task):
+        self.nxg.add_node(task)
+
+    def add_tasks(self, tasks):
+        self.nxg.add_nodes_from(tasks)
+
+    def rm_task(self, task):
+        self.nxg.remove_node(task)
+
+    def get_task_list(self):
+        return self.nxg.nodes()
+
+    def get_task_count(self):
+        return self.nxg.number_of_nodes()
+
+    def get_successors(self, task):
+        return self.nxg.successors(task)
+
+    def get_predecessors(self, task):
+        return self.nxg.predecessors(task)
+
+    def get_input_degree(self, task):
+        return self.nxg.in_degree(task)
+
+    def get_output_degree(self, task):
+        return self.nxg.out_degree(task)
+
+    def get_task_attribute(self, task, attrib_name):
+        return self.nxg.node[task][attrib_name]
+
+    def set_task_attribute(self, task, attrib_name, attrib):
+        self.nxg.node[task][attrib_name] = attrib
+
+    def set_task_attributes(self, tasks, attrib_name, attribs):
+        node = self.nxg.node
+        for task, attrib in izip(tasks, attribs):
+            node[task][attrib_name] = attrib
+
+    ########################################################################
+    #                           arcs                                       #
+    ########################################################################
+    def add_arc(self, source, target):
+        """:return : the tuple (source, target, key) of the new arc, the key is the lowest unused
+        integer between source and target (as networkx does).
+        """
+        try:
+            key_dict = self.nxg.succ[source][target]
+        except KeyError:
+            key = 0
+        else:
+            key = len(key_dict)
+            while key in key_dict:
+                key += 1
+        self.nxg.add_edge(source, target, key=key, attr_dict={self.__CONST_ARC_INDEX: self.__arc_index})
+        self.__arc_index += 1
+        return source, target, key
+
+    def add_arcs(self, sources, targets):
+        """:return : the list of the new arcs (source, target, key).
+        """
+        return [self.add_arc(source, target) for source, target in izip(sources, targets)]
+
+    def rm_arc(self, arc):
+        self.nxg.remove_edge(arc[0], arc[1], arc[2])
+
+    def get_arc_list(self):
+        return self.nxg.edges(keys=True)
+
+    def get_in_arc_list(self, task):
+        return self.nxg.in_edges(task, keys=True)
+
+    def get_out_arc_list(self, task):
+        return self.nxg.out_edges(task, keys=True)
+
+    def get_arc_count(self):
+        return self.nxg.number_of_edges()
+
+    def get_arc_attribute(self, arc, attrib_name):
+        return self.nxg[arc[0]][arc[1]][arc[2]][attrib_name]
+
+    def set_arc_attribute(self, arc, attrib_name, attrib):
+        self.nxg[arc[0]][arc[1]][arc[2]][attrib_name] = attrib
+
+    def set_arc_attributes(self, arcs, attrib_name, attribs):
+        succ = self.nxg.succ
+        for arc, attrib in izip(arcs, attribs):
+            succ[arc[0]][arc[1]][arc[2]][attrib_name] = attrib
+
+    def get_arc_index(self, arc):
+        """:return : the number of arcs created before this one.
+        """
+        return self.nxg.succ[arc[0]][arc[1]][arc[2]][self.__CONST_ARC_INDEX]
+
+    ########################################################################
+    #                           graph                                      #
+    ########################################################################
+    def is_directed_acyclic(self):
+        return nx.is_directed_acyclic_graph(self.nxg)
+
+    def to_networkx(self):
+        return self.nxg
+
+    def copy(self):
+        """:return : a new store with the same tasks and arcs (same keys).
+        The attribute dicts are copied, their values are shared (setters replace values, they never modify them).
+        """
+        clone = NxGraphStore.__new__(NxGraphStore)
+        clone.nxg = nx.MultiDiGraph()
+        clone.nxg.graph.update(self.nxg.graph)
+        clone.nxg.add_nodes_from(self.nxg.nodes_iter(data=True))
+        clone.nxg.add_edges_from(self.nxg.edges_iter(keys=True, data=True))
+        clone.__arc_index = self.__arc_index
+        return clone
+
+
+class CompactGraphStore(object):
+    """Store tasks and arcs of a dataflow as dense integer ids (compact backend).
+
+    Arcs are kept in parallel arrays (source, target) indexed by their id, the key of an arc
+    tuple (source, target, key) is its id. Integer attributes declared at the creation of the store
+    (initial marking, token size, gcd...) are kept in typed arrays, the others in one list per
+    attribute. In and out adjacencies are CSR arrays (offsets + arc ids sorted by task) rebuilt
+    lazily: arcs added since the last build are kept in small per-task lists until the next build.
+    """
+
+    def __init__(self, int_arc_attributes=None):
+        """
+
+        :type int_arc_attributes: dict attribute name -> default value of the integer arc attributes.
+        """
+        self.__task_alive = bytearray()
+        self.__task_count = 0
+        self.__task_attributes = {}  # attribute name -> list indexed by task (None when not set)
+
+        self.__arc_source = array('l')
+        self.__arc_target = array('l')
+        self.__arc_alive = bytearray()
+        self.__arc_count = 0
+        self.__arc_attributes = {}  # attribute name -> array or list indexed by arc id (None when not set)
+        self.__int_arc_defaults = {}
+        if int_arc_attributes is not None:
+            for attrib_name, default in int_arc_attributes.items():
+                self.__int_arc_defaults[attrib_name] = default
+                self.__arc_attributes[attrib_name] = array('l')
+
+        # CSR adjacency (valid for arcs with an id lower than self.__csr_arc_end)
+        self.__csr_arc_end = 0
+        self.__out_ptr = [0]
+        self.__out_arcs = []
+        self.__in_ptr = [0]
+        self.__in_arcs = []
+        # Arcs added since the last CSR build
+        self.__pending_out = {}
+        self.__pending_in = {}
+        self.__dead_arc_count = 0  # removed arcs (their ids are never reused)
+        self.__dead_since_build = 0  # removed arcs still referenced by the CSR arrays
+        # Copy-on-write (see copy()): attribute columns and arc arrays shared with a clone,
+        # each one is copied by the first modification
+        self.__shared_task_columns = set()
+        self.__shared_arc_columns = set()
+        self.__shared_structure = False
+
+    ########################################################################
+    #                           tasks                                      #
+    ########################################################################
+    def add_task(self, task):
+        if task < len(self.__task_alive):
+            if self.__task_alive[task]:
+                return
+        self.__own_structure()
+        if task >= len(self.__task_alive):
+            self.__task_alive.extend(bytearray(task + 1 - len(self.__task_alive)))
+        self.__task_alive[task] = 1
+        self.__task_count += 1
+
+    def add_tasks(self, tasks):
+        for task in tasks:
+            self.add_task(task)
+
+    def rm_task(self, task):
+        self.__check_task(task)
+        for arc in self.get_in_arc_list(task) + self.get_out_arc_list(task):
+            if self.__arc_alive[arc[2]]:
+                self.rm_arc(arc)
+        self.__own_structure()
+        self.__task_alive[task] = 0
+        self.__task_count -= 1
+        for attrib_name, column in self.__task_attributes.items():
+            if task < len(column):
+                self.__task_column(attrib_name)[task] = None
+
+    def get_task_list(self):
+        if self.__task_count == len(self.__task_alive):
+            return range(self.__task_count)
+        return [task for task in xrange(len(self.__task_alive)) if self.__task_alive[task]]
+
+    def get_task_count(self):
+        return self.__task_count
+
+    def get_successors(self, task):
+        successors = []
+        seen = set()
+        for arc in self.get_out_arc_list(task):
+            if arc[1] not in seen:
+                seen.add(arc[1])
+                successors.append(arc[1])
+        return successors
+
+    def get_predecessors(self, task):
+        predecessors = []
+        seen = set()
+        for arc in self.get_in_arc_list(task):
+            if arc[0] not in seen:
+                seen.add(arc[0])
+                predecessors.append(arc[0])
+        return predecessors
+
+    def get_input_degree(self, task):
+        return len(self.__in_arc_ids(task))
+
+    def get_output_degree(self, task):
+        return len(self.__out_arc_ids(task))
+
+    def get_task_attribute(self, task, attrib_name):
+        try:
+            value = self.__task_attributes[attrib_name][task]
+        except IndexError:
+            value = None
+        if value is None or not self.__task_alive[task]:
+            raise KeyError(attrib_name)
+        return value
+
+    def set_task_attribute(self, task, attrib_name, attrib):
+        self.__check_task(task)
+        column = self.__task_column(attrib_name)
+        if task >= len(column):
+            column.extend([None] * (len(self.__task_alive) - len(column)))
+        column[task] = attrib
+
+    def set_task_attributes(self, tasks, attrib_name, attribs):
+        for task in tasks:
+            self.__check_task(task)
+        column = self.__task_column(attrib_name)
+        column.extend([None] * (len(self.__task_alive) - len(column)))
+        for task, attrib in izip(tasks, attribs):
+            column[task] = attrib
+
+    def __task_column(self, attrib_name):
+        """:return : the column of a task attribute, owned by this store (ready to be modified).
+        """
+        try:
+            column = self.__task_attributes[attrib_name]
+        except KeyError:
+            column = self.__task_attributes[attrib_name] = []
+        if attrib_name in self.__shared_task_columns:
+            self.__shared_task_columns.discard(attrib_name)
+            column = self.__task_attributes[attrib_name] = column[:]
+        return column
+
+    def __check_task(self, task):
+        if task >= len(self.__task_alive) or task < 0 or not self.__task_alive[task]:
+            raise KeyError("Task " + str(task) + " not in the graph")
+
+    ########################################################################
+    #                           arcs                                       #
+    ########################################################################
+    def add_arc(self, source, target):
+        """:return : the tuple (source, target, key) of the new arc, the key is the id of the arc.
+        """
+        self.__check_task(source)
+        self.__check_task(target)
+        self.__own_structure()
+        arc_id = len(self.__arc_source)
+        self.__arc_source.append(source)
+        self.__arc_target.append(target)
+        self.__arc_alive.append(1)
+        self.__arc_count += 1
+        for attrib_name, default in self.__int_arc_defaults.items():
+            self.__arc_column(attrib_name).append(default)
+
+        self.__pending_out.setdefault(source, []).append(arc_id)
+        self.__pending_in.setdefault(target, []).append(arc_id)
+        return source, target, arc_id
+
+    def add_arcs(self, sources, targets):
+        """:return : the list of the new arcs (source, target, key), keys are consecutive ids.
+        """
+        for task in set(sources).union(targets):
+            self.__check_task(task)
+        self.__own_structure()
+        first_id = len(self.__arc_source)
+        arc_nb = len(sources)
+        self.__arc_source.extend(sources)
+        self.__arc_target.extend(targets)
+        self.__arc_alive.extend(bytearray([1]) * arc_nb)
+        self.__arc_count += arc_nb
+        for attrib_name, default in self.__int_arc_defaults.items():
+            self.__arc_column(attrib_name).extend(array('l', [default]) * arc_nb)
+
+        arc_ids = xrange(first_id, first_id + arc_nb)
+        if not self.__need_rebuild():  # Otherwise the next query rebuilds the CSR arrays from scratch
+            for source, target, arc_id in izip(sources, targets, arc_ids):
+                self.__pending_out.setdefault(source, []).append(arc_id)
+                self.__pending_in.setdefault(target, []).append(arc_id)
+        return zip(sources, targets, arc_ids)
+
+    def rm_arc(self, arc):
+        arc_id = self.__check_arc(arc)
+        self.__own_structure()
+        self.__arc_alive[arc_id] = 0
+        self.__arc_count -= 1
+        self.__dead_arc_count += 1
+        self.__dead_since_build += 1
+        for attrib_name, column in self.__arc_attributes.items():
+            if attrib_name not in self.__int_arc_defaults and arc_id < len(column):
+                self.__arc_column(attrib_name)[arc_id] = None
+
+    def get_arc_list(self):
+        arc_count = len(self.__arc_source)
+        if self.__dead_arc_count == 0:
+            return zip(self.__arc_source, self.__arc_target, xrange(arc_count))
+        alive = self.__arc_alive
+        return [(self.__arc_source[a], self.__arc_target[a], a) for a in xrange(arc_count) if alive[a]]
+
+    def get_in_arc_list(self, task):
+        source = self.__arc_source
+        return [(source[a], task, a) for a in self.__in_arc_ids(task)]
+
+    def get_out_arc_list(self, task):
+        target = self.__arc_target
+        return [(task, target[a], a) for a in self.__out_arc_ids(task)]
+
+    def get_arc_count(self):
+        return self.__arc_count
+
+    def get_arc_attribute(self, arc, attrib_name):
+        arc_id = arc[2]
+        try:
+            value = self.__arc_attributes[attrib_name][arc_id]
+        except IndexError:
+            value = None
+        if value is None or not self.__arc_alive[arc_id]:
+            raise KeyError(attrib_name)
+        return value
+
+    def set_arc_attribute(self, arc, attrib_name, attrib):
+        arc_id = self.__check_arc(arc)
+        if attrib_name in self.__int_arc_defaults:
+            self.__check_int(attrib_name, (attrib,))
+        column = self.__arc_column(attrib_name)
+        if arc_id >= len(column):
+            column.extend([None] * (len(self.__arc_source) - len(column)))
+        column[arc_id] = attrib
+
+    def set_arc_attributes(self, arcs, attrib_name, attribs):
+        arc_ids = [arc[2] for arc in arcs]
+        column = self.__arc_column(attrib_name)
+        column.extend([None] * (len(self.__arc_source) - len(column)))
+        if not arc_ids:
+            return
+        if attrib_name in self.__int_arc_defaults:
+            self.__check_int(attrib_name, attribs)
+        first_id = arc_ids[0]
+        end_id = first_id + len(arc_ids)
+        if arc_ids == range(first_id, end_id) and 0 <= first_id and end_id <= len(self.__arc_alive) \
+                and self.__arc_alive.find(b"\x00", first_id, end_id) == -1:
+            # Consecutive arcs (arcs just added in bulk): one slice assignment
+            if attrib_name in self.__int_arc_defaults:
+                column[first_id:end_id] = array('l', attribs)
+            else:
+                column[first_id:end_id] = list(attribs)
+            return
+        for arc, attrib in izip(arcs, attribs):
+            column[self.__check_arc(arc)] = attrib
+
+    def get_arc_index(self, arc):
+        """:return : the number of arcs created before this one (its id).
+        """
+        return self.__check_arc(arc)
+
+    def __arc_column(self, attrib_name):
+        """:return : the column of an arc attribute, owned by this store (ready to be modified).
+        """
+        try:
+            column = self.__arc_attributes[attrib_name]
+        except KeyError:
+            column = self.__arc_attributes[attrib_name] = []
+        if attrib_name in self.__shared_arc_columns:
+            self.__shared_arc_columns.discard(attrib_name)
+            column = self.__arc_attributes[attrib_name] = column[:]
+        return column
+
+    @staticmethod
+    def __check_int(attrib_name, attribs):
+        """Integer attributes are stored in arrays of C longs: reject any other value with a clear error.
+        """
+        for attrib in attribs:
+            if not isinstance(attrib, (int, long)):
+                raise TypeError("The arc attribute " + str(attrib_name) +
+                                " of the compact backend must be an integer, got " + repr(attrib))
+
+    def __check_arc(self, arc):
+        arc_id = arc[2]
+        if arc_id >= len(self.__arc_alive) or arc_id < 0 or not self.__arc_alive[arc_id]:
+            raise KeyError("Arc " + str(arc) + " not in the graph")
+        return arc_id
+
+    ########################################################################
+    #                           adjacency                                  #
+    ########################################################################
+    def __out_arc_ids(self, task):
+        self.__check_adjacency()
+        arc_ids = self.__out_arcs[self.__out_ptr[task]:self.__out_ptr[task + 1]] \
+            if task + 1 < len(self.__out_ptr) else []
+        if task in self.__pending_out:
+            arc_ids += self.__pending_out[task]
+        if self.__dead_since_build > 0:
+            alive = self.__arc_alive
+            arc_ids = [a for a in arc_ids if alive[a]]
+        return arc_ids
+
+    def __in_arc_ids(self, task):
+        self.__check_adjacency()
+        arc_ids = self.__in_arcs[self.__in_ptr[task]:self.__in_ptr[task + 1]] \
+            if task + 1 < len(self.__in_ptr) else []
+        if task in self.__pending_in:
+            arc_ids += self.__pending_in[task]
+        if self.__dead_since_build > 0:
+            alive = self.__arc_alive
+            arc_ids = [a for a in arc_ids if alive[a]]
+        return arc_ids
+
+    def __check_adjacency(self):
+        """Rebuild the CSR arrays when the arcs added (or removed) since the last build
+        outnumber the arcs already indexed. This keeps the amortized cost of add_arc constant.
+        """
+        if self.__need_rebuild():
+            self.__build_adjacency()
+
+    def __need_rebuild(self):
+        not_indexed = len(self.__arc_source) - self.__csr_arc_end + self.__dead_since_build
+        return not_indexed > max(1024, self.__csr_arc_end)
+
+    def __build_adjacency(self):
+        task_range = len(self.__task_alive)
+        arc_end = len(self.__arc_source)
+        if arc_end == 0:
+            self.__out_ptr, self.__out_arcs = [0] * (task_range + 1), []
+            self.__in_ptr, self.__in_arcs = [0] * (task_range + 1), []
+        else:
+            source = numpy.frombuffer(self.__arc_source, dtype=numpy.int_)
+            target = numpy.frombuffer(self.__arc_target, dtype=numpy.int_)
+            alive_ids = numpy.nonzero(numpy.frombuffer(self.__arc_alive, dtype=numpy.uint8))[0]
+            self.__out_ptr, self.__out_arcs = self.__csr(source, alive_ids, task_range)
+            self.__in_ptr, self.__in_arcs = self.__csr(target, alive_ids, task_range)
+
+        self.__csr_arc_end = arc_end
+        self.__pending_out = {}
+        self.__pending_in = {}
+        self.__dead_since_build = 0
+
+    @staticmethod
+    def __csr(tasks, alive_ids, task_range):
+        order = alive_ids[numpy.argsort(tasks[alive_ids], kind='mergesort')]
+        ptr = numpy.zeros(task_range + 1, dtype=numpy.int_)
+        numpy.cumsum(numpy.bincount(tasks[alive_ids], minlength=task_range), out=ptr[1:])
+        return ptr.tolist(), order.tolist()
+
+    ########################################################################
+    #                           graph                                      #
+    ########################################################################
+    def is_directed_acyclic(self):
+        """Kahn's algorithm on the adjacency arrays (a reentrant arc is a cycle)."""
+        in_degree = {}
+        ready = []
+        for task in self.get_task_list():
+            in_degree[task] = self.get_input_degree(task)
+            if in_degree[task] == 0:
+                ready.append(task)
+        visited = 0
+        while ready:
+            task = ready.pop()
+            visited += 1
+            for arc_id in self.__out_arc_ids(task):
+                target = self.__arc_target[arc_id]
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    ready.append(target)
+        return visited == self.__task_count
+
+    def to_networkx(self):
+        """:return : a read-only networkx MultiDiGraph copy of the store (attributes included).
+        The copy is frozen (see networkx.freeze): modifying it raises a NetworkXError
+        instead of silently losing the change.
+        """
+        nxg = nx.MultiDiGraph()
+        for task in self.get_task_list():
+            nxg.add_node(task)
+            for attrib_name, column in self.__task_attributes.items():
+                if task < len(column) and column[task] is not None:
+                    nxg.node[task][attrib_name] = column[task]
+        for arc in self.get_arc_list():
+            attributes = {}
+            for attrib_name, column in self.__arc_attributes.items():
+                if arc[2] < len(column) and column[arc[2]] is not None:
+                    attributes[attrib_name] = column[arc[2]]
+            nxg.add_edge(arc[0], arc[1], key=arc[2], attr_dict=attributes)
+        return nx.freeze(nxg)
+
+    def copy(self):
+        """:return : a copy-on-write clone of the store.
+        Both stores share their arrays and attribute columns: an array or a column is copied
+        by the first modification, on either side, so a clone costs nothing until it is modified.
+        """
+        clone = CompactGraphStore.__new__(CompactGraphStore)
+        clone.__dict__.update(self.__dict__)
+        clone.__task_attributes = dict(self.__task_attributes)
+        clone.__arc_attributes = dict(self.__arc_attributes)
+        self.__shared_task_columns = set(self.__task_attributes)
+        self.__shared_arc_columns = set(self.__arc_attributes)
+        clone.__shared_task_columns = set(self.__task_attributes)
+        clone.__shared_arc_columns = set(self.__arc_attributes)
+        self.__shared_structure = clone.__shared_structure = True
+        return clone
+
+    def __own_structure(self):
+        """Copy the task and arc arrays shared with a clone before modifying them.
+        """
+        if self.__shared_structure:
+            self.__task_alive = bytearray(self.__task_alive)
+            self.__arc_source = self.__arc_source[:]
+            self.__arc_target = self.__arc_target[:]
+            self.__arc_alive = bytearray(self.__arc_alive)
+            self.__pending_out = dict((task, arc_ids[:]) for task, arc_ids in self.__pending_out.iteritems())
+            self.__pending_in = dict((task, arc_ids[:]) for task, arc_ids in self.__pending_in.iteritems())
+            self.__shared_structure = False
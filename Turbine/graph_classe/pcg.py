@@ -1,6 +1,7 @@
 from fractions import gcd
 
 from Turbine.graph_classe.csdf import CSDF
+from Turbine.graph_classe.dataflow import as_list
 
 
 class PCG(CSDF):
@@ -17,12 +18,13 @@ class PCG(CSDF):
     __CONST_ARC_THRESHOLD_LIST = "thrL"
     __CONST_ARC_INI_THRESHOLD_LIST = "iniThrL"
 
-    def __init__(self, name=""):
+    def __init__(self, name="", backend="networkx"):
         """
 
         :type name: basestring
+        :type backend: str ("networkx" or "compact")
         """
-        super(PCG, self).__init__(name=name)
+        super(PCG, self).__init__(name=name, backend=backend)
 
     def __eq__(self, other):
         for arc in self.get_arc_list():
@@ -63,6 +65,22 @@ class PCG(CSDF):
         self.set_ini_phase_count(new_task, 0)
         return new_task
 
+    def add_tasks(self, count, names=None, phase_duration_lists=None, ini_phase_duration_lists=None):
+        """Add count tasks in one pass.
+
+        :type ini_phase_duration_lists: list of lists of initial phase durations (default []).
+        :return : the list of the new tasks.
+        """
+        if ini_phase_duration_lists is None:
+            ini_phase_duration_lists = [[] for _ in xrange(count)]
+        else:
+            ini_phase_duration_lists = [as_list(duration_list) for duration_list in ini_phase_duration_lists]
+        if len(ini_phase_duration_lists) != count:
+            raise ValueError("The length of the initial phase duration lists does not match with the number of tasks")
+        tasks = super(PCG, self).add_tasks(count, names, phase_duration_lists)
+        self._set_task_attributes(tasks, ini_phase_duration_lists, self.__CONST_INI_PHASE_DURATION_LIST)
+        return tasks
+
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~GETTER of tasks~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def get_ini_phase_count(self, task):
@@ -92,7 +110,7 @@ class PCG(CSDF):
         except KeyError:
             pass
 
-        self.nxg.node[task][self.__CONST_INI_PHASE_DURATION_LIST] = [1] * ini_phase_count
+        self._set_task_attribute(task, [1] * ini_phase_count, self.__CONST_INI_PHASE_DURATION_LIST)
 
         for arc in self.get_arc_list(target=task):
             self.set_ini_cons_rate_list(arc, [1] * ini_phase_count)
@@ -145,6 +163,40 @@ class PCG(CSDF):
         self.set_ini_prod_rate_list(arc, [1]*source_ipc)
         return arc
 
+    def add_arcs(self, sources, targets, prod_rate_lists=None, cons_rate_lists=None, initial_markings=None,
+                 ini_prod_rate_lists=None, ini_cons_rate_lists=None, threshold_lists=None, ini_threshold_lists=None):
+        """Add one arc for each pair (sources[i], targets[i]) in one pass.
+
+        :type ini_prod_rate_lists: list of lists (default [1] * initial phase count of the source).
+        :type ini_cons_rate_lists: list of lists (default [1] * initial phase count of the target).
+        :type threshold_lists: list of lists (default the consumption lists).
+        :type ini_threshold_lists: list of lists (default the initial consumption lists).
+        :return : the list of the new arcs (source, target, key).
+        """
+        # Every list is checked before the arcs are added
+        sources = as_list(sources)
+        targets = as_list(targets)
+        prod_rate_lists = self._bulk_rate_lists(sources, prod_rate_lists, self.get_phase_count)
+        cons_rate_lists = self._bulk_rate_lists(targets, cons_rate_lists, self.get_phase_count)
+        ini_prod_rate_lists = self._bulk_rate_lists(sources, ini_prod_rate_lists, self.get_ini_phase_count)
+        ini_cons_rate_lists = self._bulk_rate_lists(targets, ini_cons_rate_lists, self.get_ini_phase_count)
+        if threshold_lists is None:
+            threshold_lists = cons_rate_lists
+        threshold_lists = self._bulk_rate_lists(targets, threshold_lists, self.get_phase_count)
+        if ini_threshold_lists is None:
+            ini_threshold_lists = ini_cons_rate_lists
+        ini_threshold_lists = self._bulk_rate_lists(targets, ini_threshold_lists, self.get_ini_phase_count)
+        arcs = super(PCG, self).add_arcs(sources, targets, prod_rate_lists, cons_rate_lists, initial_markings)
+
+        self._set_arc_attributes(arcs, ini_prod_rate_lists, self.__CONST_ARC_INI_PROD_RATE_LIST)
+        self._set_arc_attributes(arcs, ini_cons_rate_lists, self.__CONST_ARC_INI_CONS_RATE_LIST)
+        self._set_arc_attributes(arcs, threshold_lists, self.__CONST_ARC_THRESHOLD_LIST)
+        self._set_arc_attributes(arcs, ini_threshold_lists, self.__CONST_ARC_INI_THRESHOLD_LIST)
+        gcd_list = [reduce(gcd, cons_rate_lists[i] + ini_cons_rate_lists[i] + ini_prod_rate_lists[i] +
+                           threshold_lists[i] + ini_threshold_lists[i]) for i in xrange(len(arcs))]
+        self._set_arc_attributes(arcs, gcd_list, self._CONST_ARC_GCD)
+        return arcs
+
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~GETTER of arcs~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def get_ini_cons_rate_list(self, arc):
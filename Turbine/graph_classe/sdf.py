@@ -1,6 +1,7 @@
 from fractions import gcd
-from Turbine.graph_classe.dataflow import Dataflow
+from Turbine.graph_classe.dataflow import Dataflow, as_list, graph_property
 from Turbine.algorithms.period_computation import ComputePeriod
+from Turbine.algorithms.rv import InconsistentDataflowError
 
 
 class SDF(Dataflow):
@@ -14,12 +15,13 @@ class SDF(Dataflow):
     __CONST_ARC_CONS_RATE = "consw"
     __CONST_ARC_PROD_RATE = "prodw"
 
-    def __init__(self, name=""):
+    def __init__(self, name="", backend="networkx"):
         """
 
         :type name: str
+        :type backend: str ("networkx" or "compact")
         """
-        super(SDF, self).__init__(name=name)
+        super(SDF, self).__init__(name=name, backend=backend)
 
     def __str__(self):
         ret = super(SDF, self).__str__()
@@ -67,6 +69,21 @@ class SDF(Dataflow):
         self.set_task_duration(task, 1)
         return task
 
+    def add_tasks(self, count, names=None, durations=None):
+        """Add count tasks in one pass.
+
+        :type count: int
+        :type names: list of str (default "t" + id of the task).
+        :type durations: list or numpy array (default 1).
+        :return : the list of the new tasks.
+        """
+        durations = [1] * count if durations is None else as_list(durations)
+        if len(durations) != count:
+            raise ValueError("The length of the duration list does not match with the number of tasks")
+        tasks = super(SDF, self).add_tasks(count, names)
+        self._set_task_attributes(tasks, durations, self.__CONST_TASK_DURATION)
+        return tasks
+
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~GETTER of tasks~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def get_task_duration(self, task):
@@ -95,6 +112,25 @@ class SDF(Dataflow):
         self.set_prod_rate(arc, 1)
         return arc
 
+    def add_arcs(self, sources, targets, prod_rates=None, cons_rates=None, initial_markings=None):
+        """Add one arc for each pair (sources[i], targets[i]) in one pass.
+
+        :type prod_rates: list or numpy array of integers (default 1).
+        :type cons_rates: list or numpy array of integers (default 1).
+        :type initial_markings: list or numpy array of integers (default 0).
+        :return : the list of the new arcs (source, target, key).
+        """
+        arc_nb = len(sources)
+        prod_rates = [1] * arc_nb if prod_rates is None else as_list(prod_rates)
+        cons_rates = [1] * arc_nb if cons_rates is None else as_list(cons_rates)
+        if len(prod_rates) != arc_nb or len(cons_rates) != arc_nb:
+            raise ValueError("The length of the rate lists does not match with the number of arcs")
+        arcs = super(SDF, self).add_arcs(sources, targets, initial_markings)
+        self._set_arc_attributes(arcs, prod_rates, self.__CONST_ARC_PROD_RATE)
+        self._set_arc_attributes(arcs, cons_rates, self.__CONST_ARC_CONS_RATE)
+        self._set_arc_attributes(arcs, map(gcd, cons_rates, prod_rates), self._CONST_ARC_GCD)
+        return arcs
+
     ########################################################################
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~GETTER of arcs~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def get_cons_rate(self, arc):
@@ -116,6 +152,7 @@ class SDF(Dataflow):
         :type cons_rate: int
         """
         self._set_arc_attribute(arc, cons_rate, self.__CONST_ARC_CONS_RATE)
+        self._repetition_vector_changed(arc[:2])
         self.__calc_gcd(arc)
 
     def set_prod_rate(self, arc, prod_rate):
@@ -129,6 +166,7 @@ class SDF(Dataflow):
         :type prod_rate: int
         """
         self._set_arc_attribute(arc, prod_rate, self.__CONST_ARC_PROD_RATE)
+        self._repetition_vector_changed(arc[:2])
         self.__calc_gcd(arc)
 
     def __calc_gcd(self, arc):
@@ -180,14 +218,14 @@ class SDF(Dataflow):
         """
         return str(self.get_task_duration(task))
 
-    def get_period(self, start_time=False):
-        coef_vector = None
-        if not self.is_normalized:
-            coef_vector = self.normalized()
-        pc = ComputePeriod(self)
+    def get_period(self, start_time=False, method="LP", lp_backend=None):
+        dataflow = self
+        if not self.is_normalized:  # Normalize a copy, the graph itself is left untouched
+            dataflow = self.copy()
+            dataflow.normalized()
+        # "LP" (solved by lp_backend, GLPK by default) or "MCR" (max cycle ratio)
+        pc = ComputePeriod(dataflow.freeze(), method=method, lp_backend=lp_backend)
         ret = pc.compute_period()
-        if coef_vector is not None:
-            self.un_normalized(coef_vector)
         if start_time:
             return ret
         return ret[0]
@@ -195,10 +233,14 @@ class SDF(Dataflow):
     ########################################################################
     #                        PROPERTIES graph                              #
     ########################################################################
-    @property
+    @graph_property
     def is_consistent(self):
         """:return True if the sdf is consistent.
         """
+        try:
+            self.update_repetition_vector()
+        except InconsistentDataflowError:
+            return False
         for arc in self.get_arc_list():
             source_w = self.get_prod_rate(arc) * self.get_repetition_factor(self.get_source(arc))
             target_w = self.get_cons_rate(arc) * self.get_repetition_factor(self.get_target(arc))
@@ -206,7 +248,7 @@ class SDF(Dataflow):
                 return False
         return True
 
-    @property
+    @graph_property
     def is_normalized(self):
         """:return : True if the graph is a normalized
         (i.e. if every adjacent weights of a task (prod or cons) are equal).
@@ -215,6 +257,8 @@ class SDF(Dataflow):
             try:
                 weight = self.get_prod_rate(self.get_arc_list(source=task)[0])
             except IndexError:
+                if not self.get_arc_list(target=task):  # an isolated task
+                    continue
                 weight = self.get_cons_rate(self.get_arc_list(target=task)[0])
 
             for arc in self.get_arc_list(source=task):
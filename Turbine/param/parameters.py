@@ -54,9 +54,14 @@ class Parameters:
         # True generate an acyclic dataflow
         self.__ACYCLIC = False
 
+        # Storage of the generated dataflow: "networkx" or "compact"
+        self.__BACKEND = "networkx"
+
         # ~~~~~~~~~~~~~~~~~~~~PRELOAD~SOLVER~~~~~~~~~~~~~~~~~~~~~~~~~~ #
         # Select the initial marking's solver
         self.__SOLVER = "Auto"
+        # Select the LP solver: "GLPK", "HiGHS", "Gurobi", "Auto" or None (GLPK)
+        self.__LP_BACKEND = None
         
         # ~~~~~~~~~~~~~~~~~~~~PRINT~OPTIONS~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
         self.__VERBOSE_SOLVER = False
@@ -192,6 +197,14 @@ class Parameters:
         """
         self.__ACYCLIC = bool(value)
 
+    def set_backend(self, value):
+        """Set the storage backend of the generated dataflow: "networkx" or "compact"
+        default: "networkx"
+        """
+        if value not in ("networkx", "compact"):
+            raise Exception("Wrong value: the backend must be \"networkx\" or \"compact\"")
+        self.__BACKEND = str(value)
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~PRELOAD~SOLVER~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def set_solver(self, value):
         """Permit to choose between two solver for generate initial marking (from two sufficient conditions):
@@ -200,6 +213,15 @@ class Parameters:
         """        
         self.__SOLVER = str(value)
 
+    def set_lp_backend(self, value):
+        """Choose the LP solver of the initial marking: "GLPK", "HiGHS", "Gurobi",
+        "Auto" (the fastest one installed) or None (GLPK), see algorithms.lp_backend.
+        default: None
+        """
+        if value is not None and value not in ("GLPK", "HiGHS", "Gurobi", "Auto"):
+            raise Exception("Wrong value: the LP backend must be \"GLPK\", \"HiGHS\", \"Gurobi\", \"Auto\" or None")
+        self.__LP_BACKEND = value
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~PRINT~OPTIONS~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def set_logging_level(self, value):
         """Set the logging level of the generator
@@ -307,6 +329,11 @@ class Parameters:
         """
         return self.__ACYCLIC
 
+    def get_backend(self):
+        """Return the storage backend of the generated dataflow.
+        """
+        return self.__BACKEND
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~PRELOAD~SOLVER~~~~~~~~~~~~~~~~~~~~~~~~~~ #
     def get_solver(self):
         """Returns the solver choose in parameters.
@@ -314,6 +341,11 @@ class Parameters:
         """
         return self.__SOLVER
 
+    def get_lp_backend(self):
+        """Returns the LP solver choose in parameters.
+        """
+        return self.__LP_BACKEND
+
     # ~~~~~~~~~~~~~~~~~~~~~~~~~PRINT~OPTIONS~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~ #
 
     def is_solver_verbose(self):